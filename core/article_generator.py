@@ -0,0 +1,202 @@
+from typing import List, Dict, Tuple, Iterable, Optional, Any
+from core.utils import find_files, db_pool
+from core.completion_cache import CompletionCache
+from core.content_store import content_hook
+from core.metrics import metrics
+from core.profiling import profiler
+import os
+import tempfile
+
+
+def record_usage(usage, model: str) -> None:
+    metrics.inc('tokens_total', usage.prompt_tokens, model=model, kind='prompt')
+    metrics.inc('tokens_total', usage.completion_tokens, model=model, kind='completion')
+
+
+def find_source_file(output_path: str, video_id: str) -> str:
+    '''
+    優先使用 Whisper 轉錄的文字檔，沒有則使用清洗後的字幕檔 (只找檔案，content store 見 load_source)。
+    '''
+    input_path_sub = output_path + '/adress_subtitles'
+    input_path_tra = output_path + '/transcriptions'
+    use_file = find_files(input_path_tra, [video_id, '.txt'])
+    use_file = use_file if len(use_file) == 1 else find_files(input_path_sub, [video_id, '.txt'])
+    if not use_file:
+        raise FileNotFoundError(f"No transcription or subtitle found for video ID {video_id}.")
+    return use_file[0]
+
+
+def load_source(output_path: str, video_id: str) -> Tuple[Optional[str], str]:
+    '''
+    讀取生成文章用的文字，逐字稿優先，回傳 (檔案路徑, 文字)。
+    --content_store 時先查 content store (路徑為 None)，沒有才讀舊版檔案。
+    '''
+    for kind in ['transcription', 'subtitle']:
+        text = content_hook.load(video_id, kind)
+        if text:
+            return None, text
+    use_file = find_source_file(output_path, video_id)
+    with open(use_file, 'r', encoding='utf-8') as f:
+        return use_file, f.read()
+
+
+def build_article_message(output_path: str, video_id: str) -> Tuple[str, List[Dict[str, str]]]:
+    '''
+    回傳 (source text, chat completion messages)
+    '''
+    from CopyCraftAPI.utils import GetAPIMessage
+    use_file, text = load_source(output_path, video_id)
+    if use_file is not None:
+        return text, GetAPIMessage(path=use_file, article_type='blog', role='Angel investor').combine_messages()
+    # GetAPIMessage 只接受檔案路徑，內容在 content store 時寫到暫存檔
+    fd, path = tempfile.mkstemp(suffix='.txt')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return text, GetAPIMessage(path=path, article_type='blog', role='Angel investor').combine_messages()
+    finally:
+        os.remove(path)
+
+
+class ArticleGenerator:
+    '''
+    以 streaming 方式生成文章，邊收 token 邊寫入 output/article/{id}.txt.part，
+    完成後 rename 成 {id}.txt 並更新 has_generated_article，中途失敗不影響已完成的文章。
+    --content_store 時文章在完成後才存進 content store，不寫出檔案；讀取請用 read_article。
+    '''
+    def __init__(self, output_dir: str = 'output/', model: str = 'gpt-3.5-turbo', max_tokens: int = 2000,
+                 client: Optional[Any] = None, cache: Optional[CompletionCache] = None, dedup: Optional[Any] = None) -> None:
+        self.output_dir = output_dir
+        self.model = model
+        self.max_tokens = max_tokens
+        if client is None:
+            from openai import OpenAI
+            client = OpenAI()
+        self.client = client
+        self.cache = cache
+        # core.dedup.DedupIndex，近似重複的影片直接沿用既有文章
+        self.dedup = dedup
+
+    def article_path(self, video_id: str) -> str:
+        return os.path.join(self.output_dir, 'article', video_id + '.txt')
+
+    def has_article(self, video_id: str) -> bool:
+        stored = content_hook.stat(video_id, 'article')
+        if stored is not None:
+            return stored[0] > 0
+        return os.path.exists(self.article_path(video_id))
+
+    def read_article(self, video_id: str) -> Optional[str]:
+        text = content_hook.load(video_id, 'article')
+        if text is not None:
+            return text
+        if not os.path.exists(self.article_path(video_id)):
+            return None
+        with open(self.article_path(video_id), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def write_article(self, video_id: str, chunks: Iterable[str]) -> str:
+        '''
+        回傳文章路徑；--content_store 時不寫出檔案，路徑只是文章的名稱。
+        '''
+        output_path = self.article_path(video_id)
+        if content_hook.store_enabled:
+            # 全部收到後才寫入，中途失敗不會留下不完整的文章
+            text = f"{video_id}: " + ''.join(chunks) + "\n"
+            content_hook.save(video_id, 'article', text, output_path)
+            print(f'Save the article to the content store as {os.path.basename(output_path)}')
+            return output_path
+        tmp_path = output_path + '.part'
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                file.write(f"{video_id}: ")
+                for chunk in chunks:
+                    file.write(chunk)
+                    file.flush()
+                file.write("\n")
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        print(f'Save the article to {output_path}')
+        if content_hook.enabled:
+            with open(output_path, 'r', encoding='utf-8') as file:
+                content_hook.persist(video_id, 'article', file.read(), os.path.basename(output_path))
+        return output_path
+
+    def stream_completion(self, messages: List[Dict[str, str]]) -> Iterable[str]:
+        with metrics.span('chat_completion'):
+            response = self.client.chat.completions.create(model=self.model, messages=messages,
+                                                           max_tokens=self.max_tokens, stream=True,
+                                                           stream_options={'include_usage': True})
+            for chunk in response:
+                # 最後一個 chunk 只帶 usage，沒有 choices
+                if getattr(chunk, 'usage', None):
+                    record_usage(chunk.usage, self.model)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    def generate(self, video_id: str, force: bool = False) -> str:
+        '''
+        force=True (--force article) 時重新生成，不沿用近似重複影片的文章。
+        '''
+        with profiler.stage('generate'):
+            return self._generate(video_id, force)
+
+    def _generate(self, video_id: str, force: bool = False) -> str:
+        if self.dedup:
+            output_path = self.reuse_duplicate(video_id, reuse=not force)
+            if output_path:
+                return output_path
+        transcript, messages = build_article_message(self.output_dir, video_id)
+
+        key = None
+        if self.cache:
+            key = CompletionCache.make_key(transcript, messages, self.model, self.max_tokens)
+            cached = self.cache.get(key)
+            if cached is not None:
+                print(f'Use cached completion for {video_id}')
+                metrics.inc('completion_cache_hits_total')
+                output_path = self.write_article(video_id, [cached])
+                self.update_state(video_id, 'Done')
+                return output_path
+
+        content = []
+        def collect():
+            for text in self.stream_completion(messages):
+                content.append(text)
+                yield text
+        output_path = self.write_article(video_id, collect())
+        if self.cache:
+            self.cache.set(key, ''.join(content), model=self.model)
+        self.update_state(video_id, 'Done')
+        return output_path
+
+    def reuse_duplicate(self, video_id: str, reuse: bool = True) -> Optional[str]:
+        '''
+        記錄 video_id 的 MinHash signature；與已有文章的影片幾乎相同時複製該文章，回傳文章路徑。
+        reuse=False 時只記錄 signature，不沿用其他影片的文章。
+        '''
+        _, transcript = load_source(self.output_dir, video_id)
+        signature = self.dedup.signature(transcript)
+        duplicate = None
+        if reuse:
+            duplicate = self.dedup.find_duplicate(video_id, transcript, signature=signature, accept=self.has_article)
+        self.dedup.add(video_id, transcript, duplicate_of=duplicate, signature=signature)
+        if duplicate is None:
+            return None
+        article = self.read_article(duplicate)
+        # 文章開頭為 "{video_id}: "，換成目前的影片
+        prefix = f"{duplicate}: "
+        article = article[len(prefix):] if article.startswith(prefix) else article
+        output_path = self.write_article(video_id, [article.rstrip('\n')])
+        metrics.inc('duplicate_articles_total')
+        self.update_state(video_id, 'Done')
+        return output_path
+
+    def update_state(self, video_id: str, value: str) -> None:
+        db = db_pool.connect(os.path.join(self.output_dir, 'yt_info.db'))
+        db.update_value(video_id, 'has_generated_article', value)
+        db.close()
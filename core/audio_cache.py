@@ -0,0 +1,125 @@
+import glob
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+
+class AudioCache:
+    '''
+    管理 output/mp3/ 的大小，以 DB 的 audio_cache 表記錄每個 mp3 的大小與最後使用時間，
+    淘汰時不需要掃描資料夾。總大小超過 max_bytes 時依 last_access 刪除最舊的檔案 (LRU)，
+    等待或正在轉錄的檔案會被 pin 住，不會被刪除。
+
+    pinned 是計數，同一部影片可以被多個 worker 同時 pin。
+    假設同一個 output 資料夾同時只有一個 process 在使用，開啟時會清除上次中斷留下的 pin。
+
+    Example:
+        cache = AudioCache('output/yt_info.db', max_bytes=2 * 1024 ** 3)
+        cache.add('g0RWoZnOANM', 'output/mp3/g0RWoZnOANM.mp3', pin=True)
+        ...  # transcribe
+        cache.unpin('g0RWoZnOANM')
+        cache.evict()
+    '''
+    def __init__(self, db_path: str = 'output/yt_info.db', max_bytes: int = 2 * 1024 ** 3,
+                 audio_dir: Optional[str] = None) -> None:
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.cursor = self.conn.cursor()
+        self.cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'audio_cache'")
+        is_new = self.cursor.fetchone() is None
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS audio_cache (
+            video_id TEXT PRIMARY KEY,
+            path TEXT,
+            size INTEGER,
+            last_access REAL,
+            pinned INTEGER DEFAULT 0
+        );
+        ''')
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_audio_cache_last_access ON audio_cache (last_access);")
+        self.cursor.execute("UPDATE audio_cache SET pinned = 0 WHERE pinned != 0")
+        self.conn.commit()
+        # 第一次使用時登記已經存在的 mp3，之後只靠 DB 追蹤
+        if is_new and audio_dir:
+            self.import_directory(audio_dir)
+
+    def import_directory(self, audio_dir: str) -> int:
+        paths = glob.glob(os.path.join(glob.escape(audio_dir), '*.mp3'))
+        for path in paths:
+            video_id = os.path.splitext(os.path.basename(path))[0]
+            self.add(video_id, path, evict=False, last_access=os.path.getmtime(path))
+        return len(paths)
+
+    def add(self, video_id: str, path: str, pin: bool = False, evict: bool = True,
+            last_access: Optional[float] = None) -> None:
+        '''
+        登記或更新一個 mp3，已登記的影片會更新大小與最後使用時間，pin=True 時同時 pin 住。
+        '''
+        size = os.path.getsize(path)
+        with self.lock:
+            self.cursor.execute('''
+            INSERT INTO audio_cache (video_id, path, size, last_access, pinned) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(video_id) DO UPDATE SET path = excluded.path, size = excluded.size,
+                last_access = excluded.last_access, pinned = pinned + excluded.pinned
+            ''', (video_id, path, size, last_access or time.time(), 1 if pin else 0))
+            self.conn.commit()
+            if evict:
+                self.evict()
+
+    def pin(self, video_id: str) -> None:
+        with self.lock:
+            self.cursor.execute("UPDATE audio_cache SET pinned = pinned + 1, last_access = ? WHERE video_id = ?",
+                                (time.time(), video_id))
+            self.conn.commit()
+
+    def unpin(self, video_id: str) -> None:
+        with self.lock:
+            self.cursor.execute("UPDATE audio_cache SET pinned = MAX(pinned - 1, 0), last_access = ? WHERE video_id = ?",
+                                (time.time(), video_id))
+            self.conn.commit()
+
+    def remove(self, video_id: str) -> None:
+        '''
+        檔案已在外部被刪除時 (例如 MediaDownloader.forget_download) 移除紀錄，避免總大小被高估。
+        '''
+        with self.lock:
+            self.cursor.execute("DELETE FROM audio_cache WHERE video_id = ?", (video_id,))
+            self.conn.commit()
+
+    def total_bytes(self) -> int:
+        with self.lock:
+            self.cursor.execute("SELECT COALESCE(SUM(size), 0) FROM audio_cache")
+            return self.cursor.fetchone()[0]
+
+    def evict(self) -> List[str]:
+        '''
+        刪除最久未使用且沒有被 pin 的 mp3，直到總大小小於 max_bytes，回傳刪除的 video_id。
+        '''
+        with self.lock:
+            total = self.total_bytes()
+            if total <= self.max_bytes:
+                return []
+            removed = []
+            self.cursor.execute("SELECT video_id, path, size FROM audio_cache WHERE pinned = 0 ORDER BY last_access ASC")
+            for video_id, path, size in self.cursor.fetchall():
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                removed.append(video_id)
+                total -= size
+            self.cursor.executemany("DELETE FROM audio_cache WHERE video_id = ?", [(video_id,) for video_id in removed])
+            self.conn.commit()
+            if removed:
+                print(f'Evicted {len(removed)} mp3 files from the audio cache.')
+            return removed
+
+    def close(self):
+        self.cursor.close()
+        self.conn.close()
@@ -0,0 +1,170 @@
+import json
+import os
+import re
+import subprocess
+import tempfile
+from typing import List, Optional, Tuple
+from core.metrics import metrics
+
+SILENCE_START_REGEX = re.compile(r"silence_start: (-?\d+(?:\.\d+)?)")
+SILENCE_END_REGEX = re.compile(r"silence_end: (-?\d+(?:\.\d+)?)")
+DURATION_REGEX = re.compile(r"Duration: (\d+):(\d{2}):(\d{2}(?:\.\d+)?)")
+
+
+class OffsetMap:
+    '''
+    記錄裁切後音檔保留了原始音檔的哪些區段，用來把轉錄結果的時間換算回原始時間。
+
+    Example:
+        offsets = OffsetMap([(12.0, 60.0), (65.0, 120.0)])
+        offsets.to_original(50.0)  # 67.0
+    '''
+    def __init__(self, regions: List[Tuple[float, float]]) -> None:
+        self.regions = [(float(start), float(end)) for start, end in regions]
+
+    @property
+    def duration(self) -> float:
+        return sum(end - start for start, end in self.regions)
+
+    def to_original(self, seconds: float) -> float:
+        elapsed = 0.0
+        for start, end in self.regions:
+            if seconds <= elapsed + (end - start):
+                return start + seconds - elapsed
+            elapsed += end - start
+        # 超出範圍時對齊最後一個區段的結尾
+        return self.regions[-1][1] + seconds - elapsed if self.regions else seconds
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'regions': self.regions}, f)
+
+    @classmethod
+    def load(cls, path: str) -> 'OffsetMap':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f)['regions'])
+
+
+def parse_silencedetect(stderr: str) -> Tuple[List[Tuple[float, float]], Optional[float]]:
+    '''
+    解析 ffmpeg silencedetect 的輸出，回傳 ([(silence_start, silence_end), ...], 音檔長度)。
+    '''
+    duration = None
+    match = DURATION_REGEX.search(stderr)
+    if match:
+        hours, minutes, seconds = match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    silences = []
+    start = None
+    for line in stderr.splitlines():
+        start_match = SILENCE_START_REGEX.search(line)
+        if start_match:
+            start = max(float(start_match.group(1)), 0.0)
+            continue
+        end_match = SILENCE_END_REGEX.search(line)
+        if end_match and start is not None:
+            silences.append((start, float(end_match.group(1))))
+            start = None
+    # 結尾的靜音沒有 silence_end
+    if start is not None and duration is not None:
+        silences.append((start, duration))
+    return silences, duration
+
+
+def speech_regions(silences: List[Tuple[float, float]], duration: float, padding: float = 0.25) -> List[Tuple[float, float]]:
+    '''
+    靜音區段的補集，每段前後保留 padding 秒避免切到字。
+    '''
+    regions = []
+    position = 0.0
+    for start, end in silences:
+        if start - position > 0:
+            regions.append((max(position - padding, 0.0), min(start + padding, duration)))
+        position = end
+    if duration - position > 0:
+        regions.append((max(position - padding, 0.0), duration))
+    # padding 造成重疊時合併
+    merged = []
+    for start, end in regions:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class SilenceTrimmer:
+    '''
+    轉錄前以 ffmpeg silencedetect 找出靜音區段並移除，減少上傳大小與 Whisper 計費的分鐘數。
+    裁切後的音檔是暫存檔，OffsetMap 另存為 JSON 供換算回原始時間。
+    節省比例低於 min_saving，或重新編碼後的檔案沒有比原始音檔小時，直接使用原始音檔。
+
+    silencedetect 以音量判斷，只會移除靜音，不會移除背景音樂。
+
+    Example:
+        trimmer = SilenceTrimmer(noise_db=-35, min_silence=1.0)
+        path, offsets = trimmer.trim('output/mp3/g0RWoZnOANM.mp3')
+    '''
+    def __init__(self, noise_db: float = -35, min_silence: float = 1.0, padding: float = 0.25, min_saving: float = 0.05) -> None:
+        self.noise_db = noise_db
+        self.min_silence = min_silence
+        self.padding = padding
+        self.min_saving = min_saving
+
+    def detect(self, path: str) -> Tuple[List[Tuple[float, float]], float]:
+        '''
+        回傳 (要保留的說話區段, 音檔長度)。
+        '''
+        command = [
+            'ffmpeg', '-hide_banner', '-nostats',
+            '-i', path,
+            '-af', f'silencedetect=noise={self.noise_db}dB:d={self.min_silence}',
+            '-f', 'null', '-',
+        ]
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg silencedetect failed for {path}: {result.stderr[-500:]}")
+        silences, duration = parse_silencedetect(result.stderr)
+        if duration is None:
+            raise RuntimeError(f"Could not read the duration of {path}.")
+        return speech_regions(silences, duration, self.padding), duration
+
+    def cut(self, path: str, regions: List[Tuple[float, float]], output_path: str) -> None:
+        selection = '+'.join(f'between(t,{start:.3f},{end:.3f})' for start, end in regions)
+        command = [
+            'ffmpeg', '-hide_banner', '-nostats', '-y',
+            '-i', path,
+            '-af', f"aselect='{selection}',asetpts=N/SR/TB",
+            # 與 yt-dlp 預設的 --audio-quality 5 相同，避免重新編碼後反而變大
+            '-c:a', 'libmp3lame', '-q:a', '5',
+            output_path,
+        ]
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed to trim {path}: {result.stderr[-500:]}")
+
+    def trim(self, path: str) -> Tuple[str, Optional[OffsetMap]]:
+        '''
+        回傳 (要轉錄的音檔路徑, OffsetMap)；沒有裁切時回傳 (path, None)。
+        裁切後的暫存檔由呼叫端在轉錄後刪除。
+        '''
+        with metrics.span('trim_silence'):
+            regions, duration = self.detect(path)
+            offsets = OffsetMap(regions)
+            if not regions or duration <= 0 or 1 - offsets.duration / duration < self.min_saving:
+                return path, None
+            fd, output_path = tempfile.mkstemp(suffix='.mp3', prefix='trimmed_')
+            os.close(fd)
+            try:
+                self.cut(path, regions, output_path)
+            except Exception:
+                os.remove(output_path)
+                raise
+            if os.path.getsize(output_path) >= os.path.getsize(path):
+                os.remove(output_path)
+                print(f'Trimmed audio is not smaller than {path}, using the original file.')
+                return path, None
+        metrics.inc('trimmed_seconds_total', duration - offsets.duration, stage='trim_silence')
+        print(f'Trimmed {duration - offsets.duration:.1f}s of silence from {path} ({duration:.1f}s)')
+        return output_path, offsets
@@ -0,0 +1,119 @@
+import json
+import os
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from core.metrics import metrics
+
+
+class ArticleBatchGenerator:
+    '''
+    透過 OpenAI Batch API 離線大量生成文章。
+    custom_id 使用 video_id，結果回來後依 custom_id 對應回影片。
+
+    可傳入 base_url (或設定 OPENAI_BASE_URL) 指向本地的替代服務做測試。
+
+    Example:
+        generator = ArticleBatchGenerator(model='gpt-4o', max_tokens=2000)
+        results, errors = generator.run({'g0RWoZnOANM': messages})
+    '''
+    FINAL_STATES = ['completed', 'failed', 'expired', 'cancelled']
+
+    def __init__(self, output_dir: str = 'output/', model: str = 'gpt-3.5-turbo', max_tokens: int = 2000,
+                 client: Optional[Any] = None, base_url: Optional[str] = None, poll_interval: int = 30) -> None:
+        self.output_dir = output_dir
+        self.model = model
+        self.max_tokens = max_tokens
+        self.poll_interval = poll_interval
+        if client is None:
+            from openai import OpenAI
+            client = OpenAI(base_url=base_url) if base_url else OpenAI()
+        self.client = client
+
+    def write_batch_file(self, messages_by_id: Dict[str, List[Dict[str, str]]]) -> str:
+        directory = os.path.join(self.output_dir, 'batch')
+        os.makedirs(directory, exist_ok=True)
+        now_time = '{:%y%m%d_%H%M%S}'.format(datetime.now())
+        batch_path = os.path.join(directory, f'{now_time}_requests.jsonl')
+        with open(batch_path, 'w', encoding='utf-8') as f:
+            for video_id, messages in messages_by_id.items():
+                request = {
+                    'custom_id': video_id,
+                    'method': 'POST',
+                    'url': '/v1/chat/completions',
+                    'body': {'model': self.model, 'messages': messages, 'max_tokens': self.max_tokens},
+                }
+                f.write(json.dumps(request, ensure_ascii=False) + '\n')
+        print(f'Save the batch requests to {batch_path}')
+        return batch_path
+
+    def submit(self, batch_path: str) -> str:
+        with open(batch_path, 'rb') as f:
+            batch_file = self.client.files.create(file=f, purpose='batch')
+        batch = self.client.batches.create(input_file_id=batch_file.id,
+                                           endpoint='/v1/chat/completions',
+                                           completion_window='24h')
+        print(f'Submitted batch {batch.id}')
+        return batch.id
+
+    def wait(self, batch_id: str, timeout: Optional[float] = None):
+        start = time.time()
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in self.FINAL_STATES:
+                print(f'Batch {batch_id} finished with status "{batch.status}"')
+                return batch
+            if timeout is not None and time.time() - start > timeout:
+                raise TimeoutError(f"Batch {batch_id} is still {batch.status} after {timeout} seconds.")
+            print(f'Batch {batch_id} is {batch.status}, waiting {self.poll_interval}s')
+            time.sleep(self.poll_interval)
+
+    def parse_results(self, content: str):
+        '''
+        解析 batch output file，回傳 ({video_id: article}, {video_id: error message})
+        '''
+        results, errors = {}, {}
+        for line in content.strip().split('\n'):
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError:
+                print("Error decoding JSON from line:", line)
+                continue
+            video_id = item.get('custom_id')
+            response = item.get('response') or {}
+            if item.get('error') or response.get('status_code') != 200:
+                errors[video_id] = str(item.get('error') or response.get('body'))
+                continue
+            results[video_id] = response['body']['choices'][0]['message']['content']
+            usage = response['body'].get('usage') or {}
+            metrics.inc('tokens_total', usage.get('prompt_tokens', 0), model=self.model, kind='prompt')
+            metrics.inc('tokens_total', usage.get('completion_tokens', 0), model=self.model, kind='completion')
+        return results, errors
+
+    def fetch_results(self, batch):
+        results, errors = {}, {}
+        if batch.output_file_id:
+            results, errors = self.parse_results(self.client.files.content(batch.output_file_id).text)
+        if getattr(batch, 'error_file_id', None):
+            _, failed = self.parse_results(self.client.files.content(batch.error_file_id).text)
+            errors.update(failed)
+        return results, errors
+
+    def run(self, messages_by_id: Dict[str, List[Dict[str, str]]], timeout: Optional[float] = None):
+        # API 不接受空的 batch
+        if not messages_by_id:
+            return {}, {}
+        batch_path = self.write_batch_file(messages_by_id)
+        batch_id = self.submit(batch_path)
+        with metrics.span('chat_completion_batch') as span:
+            batch = self.wait(batch_id, timeout)
+            if batch.status != 'completed':
+                span.outcome = 'Error'
+        results, errors = self.fetch_results(batch)
+        # batch 整體失敗時，沒有結果的影片都視為錯誤
+        for video_id in messages_by_id:
+            if video_id not in results and video_id not in errors:
+                errors[video_id] = f'Batch {batch_id} {batch.status}'
+        return results, errors
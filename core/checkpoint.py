@@ -0,0 +1,71 @@
+from typing import List, Dict, Optional
+from core.utils import OperateDB
+from core.content_store import KINDS, content_hook
+import glob
+import os
+
+# stage -> (DB 欄位, 產出的內容種類)，種類對應的資料夾見 core.content_store.KINDS
+STAGES = {
+    'subtitle': ('has_address_subtitles', ['transcription', 'subtitle']),
+    'article': ('has_generated_article', ['article']),
+}
+
+
+class StageCheckpoint:
+    '''
+    依 DB 狀態與產出檔案判斷每部影片的各階段是否已完成，重跑時只處理尚未完成的部分。
+    DB 狀態為 'Done' 且產出存在才算完成；DB 中沒有該影片時只看產出。
+    --content_store 時產出在 content store，沒有才找舊版的檔案。
+    force 中的 stage 一律重跑。
+
+    Example:
+        checkpoint = StageCheckpoint(output_dir='output/', force=['article'])
+        video_ids = checkpoint.pending(video_ids, 'subtitle')
+    '''
+    def __init__(self, output_dir: str = 'output/', force: Optional[List[str]] = None, db_path: Optional[str] = None) -> None:
+        self.output_dir = output_dir
+        self.force = set(force) if force else set()
+        # 預設使用 output_dir 下的 yt_info.db
+        self.db_path = db_path or os.path.join(output_dir, 'yt_info.db')
+
+    def artifact_exists(self, video_id: str, stage: str) -> bool:
+        _, kinds = STAGES[stage]
+        for kind in kinds:
+            stored = content_hook.stat(video_id, kind)
+            if stored is not None and stored[0] > 0:
+                return True
+            directory = KINDS[kind]
+            # 清洗後的字幕檔名帶有語言，例如 {id}.en.txt
+            paths = [os.path.join(self.output_dir, directory, video_id + '.txt')]
+            paths += glob.glob(os.path.join(glob.escape(os.path.join(self.output_dir, directory)), glob.escape(video_id) + '.*.txt'))
+            if any(os.path.exists(path) and os.path.getsize(path) > 0 for path in paths):
+                return True
+        return False
+
+    def get_states(self, video_ids: List[str]) -> Dict[str, Dict[str, str]]:
+        columns = [column for column, _ in STAGES.values()]
+        if not os.path.exists(self.db_path):
+            return {}
+        db = OperateDB(self.db_path)
+        try:
+            return db.get_values(video_ids, columns)
+        finally:
+            db.close()
+
+    def is_done(self, video_id: str, stage: str, states: Dict[str, Dict[str, str]]) -> bool:
+        if stage in self.force:
+            return False
+        column, _ = STAGES[stage]
+        if video_id in states and states[video_id][column] != 'Done':
+            return False
+        return self.artifact_exists(video_id, stage)
+
+    def pending(self, video_ids: List[str], stage: str) -> List[str]:
+        states = self.get_states(video_ids)
+        pending_ids = []
+        for video_id in video_ids:
+            if self.is_done(video_id, stage, states):
+                print(f'Skip stage "{stage}" for {video_id}: already done.')
+            else:
+                pending_ids.append(video_id)
+        return pending_ids
@@ -0,0 +1,99 @@
+import sqlite3
+import hashlib
+import json
+import time
+import threading
+from typing import List, Dict, Optional
+
+
+class CompletionCache:
+    '''
+    以 SQLite 保存 chat completion 結果，key 為 transcript、messages、model 與 max_tokens 的 hash。
+    超過 max_bytes 時依 last_access 淘汰最舊的紀錄 (LRU)。
+
+    Example:
+        cache = CompletionCache('output/completion_cache.db')
+        key = cache.make_key(transcript, messages, 'gpt-4o', 2000)
+        content = cache.get(key)
+        if content is None:
+            content = ...  # call the API
+            cache.set(key, content)
+    '''
+    def __init__(self, db_path: str = 'output/completion_cache.db', max_bytes: int = 50 * 1024 * 1024) -> None:
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        # 允許 pipeline 的多個 worker 共用同一個 cache
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.cursor = self.conn.cursor()
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS completions (
+            key TEXT PRIMARY KEY,
+            model TEXT,
+            content TEXT,
+            size INTEGER,
+            created REAL,
+            last_access REAL
+        );
+        ''')
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_completions_last_access ON completions (last_access);")
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(transcript: str, messages: List[Dict[str, str]], model: str, max_tokens: int) -> str:
+        payload = json.dumps({
+            'transcript': hashlib.sha256(transcript.encode('utf-8')).hexdigest(),
+            'messages': messages,
+            'model': model,
+            'max_tokens': max_tokens,
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self.lock:
+            self.cursor.execute("SELECT content FROM completions WHERE key = ?", (key,))
+            row = self.cursor.fetchone()
+            if row is None:
+                return None
+            self.cursor.execute("UPDATE completions SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+            return row[0]
+
+    def set(self, key: str, content: str, model: str = '') -> None:
+        now = time.time()
+        size = len(content.encode('utf-8'))
+        with self.lock:
+            self.cursor.execute('''
+            INSERT OR REPLACE INTO completions (key, model, content, size, created, last_access)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''', (key, model, content, size, now, now))
+            self.conn.commit()
+            self.evict()
+
+    def total_bytes(self) -> int:
+        with self.lock:
+            self.cursor.execute("SELECT COALESCE(SUM(size), 0) FROM completions")
+            return self.cursor.fetchone()[0]
+
+    def evict(self) -> int:
+        '''
+        刪除最久未使用的紀錄，直到總大小小於 max_bytes，回傳刪除筆數。
+        '''
+        with self.lock:
+            total = self.total_bytes()
+            if total <= self.max_bytes:
+                return 0
+            removed = []
+            self.cursor.execute("SELECT key, size FROM completions ORDER BY last_access ASC")
+            for key, size in self.cursor.fetchall():
+                if total <= self.max_bytes:
+                    break
+                removed.append((key,))
+                total -= size
+            self.cursor.executemany("DELETE FROM completions WHERE key = ?", removed)
+            self.conn.commit()
+            return len(removed)
+
+    def close(self):
+        self.cursor.close()
+        self.conn.close()
@@ -0,0 +1,416 @@
+import io
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# kind -> 舊版檔案所在的資料夾
+KINDS = {
+    'transcription': 'transcriptions',
+    'subtitle': 'adress_subtitles',
+    'article': 'article',
+}
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _load_zstd():
+    # zstandard 為選用套件，沒有安裝時使用 zlib
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def build_zlib_dictionary(texts: List[str], size: int = 32 * 1024) -> bytes:
+    '''
+    以常出現的字組成 zlib 的 preset dictionary，越常用的字放在越後面 (距離越近，編碼越短)。
+    '''
+    counter = Counter()
+    for text in texts:
+        counter.update(text.split())
+    scored = sorted(((count * len(word.encode('utf-8')), word) for word, count in counter.items() if count > 1), reverse=True)
+    words, total = [], 0
+    for _, word in scored:
+        length = len(word.encode('utf-8')) + 1
+        if total + length > size:
+            break
+        words.append(word)
+        total += length
+    return ' '.join(reversed(words)).encode('utf-8')
+
+
+class _ZlibReader(io.RawIOBase):
+    '''
+    逐段讀取 blob 並解壓縮，不需要一次把整個內容載入記憶體。
+    '''
+    def __init__(self, source, zdict: Optional[bytes]) -> None:
+        self.source = source
+        self.decompressor = zlib.decompressobj(zdict=zdict) if zdict else zlib.decompressobj()
+        self.buffer = b''
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        while not self.buffer:
+            chunk = self.source.read(CHUNK_SIZE)
+            if not chunk:
+                self.buffer = self.decompressor.flush()
+                break
+            self.buffer = self.decompressor.decompress(chunk)
+        size = min(len(target), len(self.buffer))
+        target[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+
+class _ContentStream(io.TextIOWrapper):
+    def __init__(self, buffer, release) -> None:
+        super().__init__(buffer, encoding='utf-8')
+        self.release = release
+
+    def close(self) -> None:
+        if not self.closed:
+            super().close()
+            self.release()
+
+
+class ContentStore:
+    '''
+    將逐字稿、清洗後字幕與文章壓縮後存在 SQLite 的 contents 表，以 (video_id, kind) 對應 videos.id。
+    有安裝 zstandard 時使用 zstd，否則使用 zlib；兩者都可用 train_dictionary() 以既有內容訓練共用字典，
+    字典存在 content_dicts 表，每筆內容記錄壓縮時使用的字典，之後換字典也能讀取舊資料。
+
+    Example:
+        store = ContentStore('output/yt_info.db')
+        store.put('g0RWoZnOANM', 'transcription', text)
+        with store.open('g0RWoZnOANM', 'transcription') as f:
+            for line in f:
+                ...
+        store.export('output/')  # 寫回 transcriptions/、adress_subtitles/、article/
+    '''
+    def __init__(self, db_path: str = 'output/yt_info.db', level: int = 9, use_zstd: bool = True) -> None:
+        self.db_path = db_path
+        self.level = level
+        self.zstd = _load_zstd() if use_zstd else None
+        self.codec = 'zstd' if self.zstd else 'zlib'
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.cursor = self.conn.cursor()
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS content_dicts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            codec TEXT,
+            data BLOB,
+            created REAL,
+            trained_count INTEGER
+        );
+        ''')
+        # 舊的 DB 沒有 trained_count，NULL 視為需要重新訓練
+        self.cursor.execute("PRAGMA table_info(content_dicts)")
+        if 'trained_count' not in {row[1] for row in self.cursor.fetchall()}:
+            self.cursor.execute("ALTER TABLE content_dicts ADD COLUMN trained_count INTEGER")
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS contents (
+            video_id TEXT,
+            kind TEXT,
+            name TEXT,
+            codec TEXT,
+            dict_id INTEGER,
+            size INTEGER,
+            compressed_size INTEGER,
+            data BLOB,
+            updated REAL,
+            PRIMARY KEY (video_id, kind)
+        );
+        ''')
+        self.conn.commit()
+        self.dicts: Dict[int, bytes] = {}
+        self.dict_id = self.latest_dictionary()
+
+    def latest_dictionary(self) -> Optional[int]:
+        with self.lock:
+            self.cursor.execute("SELECT id FROM content_dicts WHERE codec = ? ORDER BY id DESC LIMIT 1", (self.codec,))
+            row = self.cursor.fetchone()
+            return row[0] if row else None
+
+    def get_dictionary(self, dict_id: Optional[int]) -> Optional[bytes]:
+        if dict_id is None:
+            return None
+        if dict_id not in self.dicts:
+            with self.lock:
+                self.cursor.execute("SELECT data FROM content_dicts WHERE id = ?", (dict_id,))
+                self.dicts[dict_id] = self.cursor.fetchone()[0]
+        return self.dicts[dict_id]
+
+    def compress(self, data: bytes) -> bytes:
+        zdict = self.get_dictionary(self.dict_id)
+        if self.codec == 'zstd':
+            dict_data = self.zstd.ZstdCompressionDict(zdict) if zdict else None
+            return self.zstd.ZstdCompressor(level=self.level, dict_data=dict_data).compress(data)
+        compressor = zlib.compressobj(self.level, zdict=zdict) if zdict else zlib.compressobj(self.level)
+        return compressor.compress(data) + compressor.flush()
+
+    def _reader(self, source, codec: str, dict_id: Optional[int]):
+        zdict = self.get_dictionary(dict_id)
+        if codec == 'zstd':
+            if self.zstd is None:
+                raise RuntimeError("This content was compressed with zstd, install it with `pip install zstandard`.")
+            dict_data = self.zstd.ZstdCompressionDict(zdict) if zdict else None
+            return self.zstd.ZstdDecompressor(dict_data=dict_data).stream_reader(source)
+        return _ZlibReader(source, zdict)
+
+    def put(self, video_id: str, kind: str, text: str, name: Optional[str] = None) -> None:
+        if kind not in KINDS:
+            raise ValueError(f'Unknown content kind "{kind}", expected one of {list(KINDS)}.')
+        data = text.encode('utf-8')
+        compressed = self.compress(data)
+        with self.lock:
+            self.cursor.execute('''
+            INSERT OR REPLACE INTO contents (video_id, kind, name, codec, dict_id, size, compressed_size, data, updated)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (video_id, kind, name or f'{video_id}.txt', self.codec, self.dict_id, len(data), len(compressed),
+                  compressed, time.time()))
+            self.conn.commit()
+
+    def get(self, video_id: str, kind: str) -> Optional[str]:
+        with self.lock:
+            self.cursor.execute("SELECT codec, dict_id, data FROM contents WHERE video_id = ? AND kind = ?", (video_id, kind))
+            row = self.cursor.fetchone()
+        if row is None:
+            return None
+        codec, dict_id, data = row
+        with self._reader(io.BytesIO(data), codec, dict_id) as reader:
+            return reader.read().decode('utf-8')
+
+    def open(self, video_id: str, kind: str) -> io.TextIOWrapper:
+        '''
+        以串流方式讀取內容，blob 逐段解壓縮。使用獨立的連線，讀取完請關閉。
+        '''
+        with self.lock:
+            self.cursor.execute("SELECT rowid, codec, dict_id FROM contents WHERE video_id = ? AND kind = ?", (video_id, kind))
+            row = self.cursor.fetchone()
+        if row is None:
+            raise KeyError(f'No {kind} stored for {video_id}.')
+        rowid, codec, dict_id = row
+        conn = sqlite3.connect(self.db_path, timeout=30) if self.db_path != ':memory:' else self.conn
+        blob = conn.blobopen('contents', 'data', rowid, readonly=True)
+
+        def release():
+            try:
+                blob.close()
+            except sqlite3.ProgrammingError:
+                # zstd 的 stream_reader 關閉時已一併關閉 blob
+                pass
+            if conn is not self.conn:
+                conn.close()
+        return _ContentStream(io.BufferedReader(self._reader(blob, codec, dict_id)), release)
+
+    def stat(self, video_id: str, kind: str) -> Optional[Tuple[int, float]]:
+        '''
+        回傳 (未壓縮的大小, 最後寫入時間)，沒有資料時回傳 None。
+        '''
+        with self.lock:
+            self.cursor.execute("SELECT size, updated FROM contents WHERE video_id = ? AND kind = ?", (video_id, kind))
+            return self.cursor.fetchone()
+
+    def iter_contents(self, kind: Optional[str] = None) -> Iterator[Tuple[str, str, str]]:
+        '''
+        依序回傳 (video_id, kind, name)。
+        '''
+        with self.lock:
+            if kind:
+                self.cursor.execute("SELECT video_id, kind, name FROM contents WHERE kind = ? ORDER BY video_id", (kind,))
+            else:
+                self.cursor.execute("SELECT video_id, kind, name FROM contents ORDER BY kind, video_id")
+            rows = self.cursor.fetchall()
+        yield from rows
+
+    def needs_training(self, growth: float = 2.0) -> bool:
+        '''
+        還沒有字典，或內容數量已成長到訓練時的 growth 倍以上 (字典已過時) 時回傳 True。
+        '''
+        with self.lock:
+            self.cursor.execute("SELECT trained_count FROM content_dicts WHERE id = ?", (self.dict_id,))
+            row = self.cursor.fetchone()
+            self.cursor.execute("SELECT COUNT(*) FROM contents")
+            count = self.cursor.fetchone()[0]
+        if row is None or not row[0]:
+            return count >= 2
+        return count >= row[0] * growth
+
+    def train_dictionary(self, size: int = 32 * 1024, samples: int = 1000, recompress: bool = True) -> Optional[int]:
+        '''
+        以既有內容訓練字典，之後寫入的內容都使用新字典；recompress=True 時一併重新壓縮既有內容。
+        內容太少無法訓練時回傳 None。
+        '''
+        with self.lock:
+            self.cursor.execute("SELECT video_id, kind FROM contents ORDER BY updated DESC LIMIT ?", (samples,))
+            keys = self.cursor.fetchall()
+        texts = [self.get(video_id, kind) for video_id, kind in keys]
+        if len(texts) < 2:
+            return None
+        if self.codec == 'zstd':
+            try:
+                dictionary = self.zstd.train_dictionary(size, [text.encode('utf-8') for text in texts]).as_bytes()
+            except self.zstd.ZstdError:
+                # 樣本太少時 zstd 無法訓練
+                return None
+        else:
+            dictionary = build_zlib_dictionary(texts, size)
+        if not dictionary:
+            return None
+        with self.lock:
+            self.cursor.execute("SELECT COUNT(*) FROM contents")
+            count = self.cursor.fetchone()[0]
+            self.cursor.execute("INSERT INTO content_dicts (codec, data, created, trained_count) VALUES (?, ?, ?, ?)",
+                                (self.codec, dictionary, time.time(), count))
+            self.conn.commit()
+            self.dict_id = self.cursor.lastrowid
+        if recompress:
+            for video_id, kind, name in list(self.iter_contents()):
+                self.put(video_id, kind, self.get(video_id, kind), name)
+        return self.dict_id
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            self.cursor.execute("SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(compressed_size), 0) FROM contents")
+            count, size, compressed_size = self.cursor.fetchone()
+        return {'count': count, 'size': size, 'compressed_size': compressed_size}
+
+    def import_files(self, output_dir: str = 'output/') -> int:
+        '''
+        將舊版資料夾中的 .txt 匯入 content store，回傳匯入數量。
+        '''
+        count = 0
+        for kind, directory in KINDS.items():
+            directory = os.path.join(output_dir, directory)
+            if not os.path.isdir(directory):
+                continue
+            for filename in sorted(os.listdir(directory)):
+                if not filename.endswith('.txt'):
+                    continue
+                with open(os.path.join(directory, filename), 'r', encoding='utf-8') as f:
+                    # {id}.txt 或 {id}.{lang}.txt
+                    self.put(filename.split('.')[0], kind, f.read(), filename)
+                count += 1
+        return count
+
+    def export(self, output_dir: str = 'output/', kind: Optional[str] = None) -> int:
+        '''
+        以舊版的檔案結構寫出內容 ({output_dir}/transcriptions/{id}.txt 等)，回傳寫出數量。
+        '''
+        count = 0
+        for video_id, row_kind, name in self.iter_contents(kind):
+            path = os.path.join(output_dir, KINDS[row_kind], name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with self.open(video_id, row_kind) as source, open(path, 'w', encoding='utf-8') as target:
+                while True:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+            count += 1
+        return count
+
+    def close(self):
+        self.cursor.close()
+        self.conn.close()
+
+
+class ContentHook:
+    '''
+    逐字稿、清洗後字幕與文章都經由 save 寫入：store=True 時只存進 content store，不再寫出 .txt，
+    否則寫入檔案；index=True 時同時更新全文索引 core.search_index.SearchIndex。
+    讀取端先以 load/stat 查 content store，沒有資料時才讀舊版的檔案。
+    連線依 process 分開保存；clean_subtitles_batch 的子 process 不寫入，由主 process 統一 save。
+
+    Example:
+        content_hook.enable('output/yt_info.db', store=True, index=True)
+        content_hook.save('g0RWoZnOANM', 'transcription', text, 'output/transcriptions/g0RWoZnOANM.txt')
+        text = content_hook.load('g0RWoZnOANM', 'transcription')
+    '''
+    def __init__(self) -> None:
+        self.db_path: Optional[str] = None
+        self.store = False
+        self.index = False
+        self.lock = threading.Lock()
+        # pid -> {'store': ContentStore, 'index': SearchIndex}
+        self.handles: Dict[int, Dict[str, object]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.db_path is not None and (self.store or self.index)
+
+    @property
+    def store_enabled(self) -> bool:
+        return self.db_path is not None and self.store
+
+    def enable(self, db_path: str = 'output/yt_info.db', store: bool = True, index: bool = False) -> None:
+        self.db_path = db_path
+        self.store = store
+        self.index = index
+
+    def settings(self) -> Tuple[Optional[str], bool, bool]:
+        return self.db_path, self.store, self.index
+
+    def disable(self) -> None:
+        self.db_path = None
+        with self.lock:
+            handles, self.handles = self.handles, {}
+        for handle in handles.get(os.getpid(), {}).values():
+            handle.close()
+
+    def _get(self, name: str, factory):
+        pid = os.getpid()
+        with self.lock:
+            handles = self.handles.setdefault(pid, {})
+            if name not in handles:
+                handles[name] = factory(self.db_path)
+            return handles[name]
+
+    def get_store(self) -> ContentStore:
+        return self._get('store', ContentStore)
+
+    def get_index(self):
+        from core.search_index import SearchIndex
+        return self._get('index', SearchIndex)
+
+    def persist(self, video_id: str, kind: str, text: str, name: Optional[str] = None) -> None:
+        if not self.enabled:
+            return
+        if self.store:
+            self.get_store().put(video_id, kind, text, name)
+        if self.index:
+            self.get_index().add(video_id, kind, text)
+
+    def save(self, video_id: str, kind: str, text: str, path: str) -> None:
+        '''
+        store 啟用時只存進 content store (名稱為 path 的檔名)，否則寫入 path；兩者都依設定更新全文索引。
+        '''
+        if not self.store_enabled:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        self.persist(video_id, kind, text, os.path.basename(path))
+
+    def load(self, video_id: str, kind: str) -> Optional[str]:
+        '''
+        store 未啟用或沒有資料時回傳 None，由呼叫端改讀檔案。
+        '''
+        if not self.store_enabled:
+            return None
+        return self.get_store().get(video_id, kind)
+
+    def stat(self, video_id: str, kind: str) -> Optional[Tuple[int, float]]:
+        if not self.store_enabled:
+            return None
+        return self.get_store().stat(video_id, kind)
+
+
+content_hook = ContentHook()
@@ -0,0 +1,161 @@
+import re
+import struct
+import sys
+from array import array
+from typing import Iterator, List, Optional
+
+TIMESTAMP_REGEX = re.compile(r"(?:(\d+):)?(\d{2}):(\d{2})\.(\d{3})")
+CUE_TIMING_REGEX = re.compile(r"^((?:\d+:)?\d{2}:\d{2}\.\d{3})\s+-->\s+((?:\d+:)?\d{2}:\d{2}\.\d{3})")
+TAG_REGEX = re.compile(r"<\d{2}:\d{2}:\d{2}\.\d{3}><c>.*?</c>")
+
+MAGIC = b'CUE1'
+
+
+def parse_timestamp(value: str) -> float:
+    '''
+    '00:01:02.500' 或 '01:02.500' 轉為秒數。
+    '''
+    match = TIMESTAMP_REGEX.fullmatch(value.strip())
+    if not match:
+        raise ValueError(f"Invalid timestamp: {value}")
+    hours, minutes, seconds, millis = match.groups()
+    return int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds) + int(millis) / 1000
+
+
+class Cue:
+    __slots__ = ('start', 'end', 'text')
+
+    def __init__(self, start: float, end: float, text: str) -> None:
+        self.start = start
+        self.end = end
+        self.text = text
+
+    def __repr__(self) -> str:
+        return f'Cue({self.start:.3f}, {self.end:.3f}, {self.text!r})'
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Cue) and (self.start, self.end, self.text) == (other.start, other.end, other.text)
+
+
+class CueList:
+    '''
+    以 array 儲存字幕的起訖時間，文字另存 list，比 list of dict 省記憶體。
+    可序列化成 .cues 二進位檔，放在清洗後的 .txt 旁邊，後續階段不需要再解析 VTT。
+
+    .cues 格式 (little-endian)：
+        b'CUE1' | uint32 count | float64 starts[count] | float64 ends[count]
+        | uint32 text_offsets[count + 1] | utf-8 text
+    '''
+    __slots__ = ('starts', 'ends', 'texts')
+
+    def __init__(self) -> None:
+        self.starts = array('d')
+        self.ends = array('d')
+        self.texts: List[str] = []
+
+    def append(self, start: float, end: float, text: str) -> None:
+        self.starts.append(start)
+        self.ends.append(end)
+        self.texts.append(text)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getitem__(self, index: int) -> Cue:
+        return Cue(self.starts[index], self.ends[index], self.texts[index])
+
+    def __iter__(self) -> Iterator[Cue]:
+        for index in range(len(self.texts)):
+            yield self[index]
+
+    def text(self, separator: str = ' ') -> str:
+        return separator.join(self.texts)
+
+    def between(self, start: float, end: float) -> 'CueList':
+        '''
+        回傳與 [start, end) 時間區間重疊的字幕。
+        '''
+        result = CueList()
+        for index in range(len(self.texts)):
+            if self.ends[index] > start and self.starts[index] < end:
+                result.append(self.starts[index], self.ends[index], self.texts[index])
+        return result
+
+    def to_bytes(self) -> bytes:
+        encoded = [text.encode('utf-8') for text in self.texts]
+        offsets = array('I', [0])
+        for item in encoded:
+            offsets.append(offsets[-1] + len(item))
+        starts, ends = array('d', self.starts), array('d', self.ends)
+        if sys.byteorder == 'big':
+            for values in (starts, ends, offsets):
+                values.byteswap()
+        return b''.join([MAGIC, struct.pack('<I', len(encoded)), starts.tobytes(), ends.tobytes(),
+                         offsets.tobytes(), b''.join(encoded)])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'CueList':
+        if data[:4] != MAGIC:
+            raise ValueError("Not a cue file.")
+        count = struct.unpack_from('<I', data, 4)[0]
+        position = 8
+        cues = cls()
+        cues.starts.frombytes(data[position:position + 8 * count])
+        position += 8 * count
+        cues.ends.frombytes(data[position:position + 8 * count])
+        position += 8 * count
+        offsets = array('I')
+        offsets.frombytes(data[position:position + 4 * (count + 1)])
+        position += 4 * (count + 1)
+        if sys.byteorder == 'big':
+            for values in (cues.starts, cues.ends, offsets):
+                values.byteswap()
+        blob = data[position:]
+        cues.texts = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(count)]
+        return cues
+
+    def save(self, path: str) -> None:
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> 'CueList':
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+def parse_vtt_lines(lines: List[str]) -> CueList:
+    '''
+    解析 VTT 內容，文字的清洗方式與 clean_subtitles 相同。
+    '''
+    cues = CueList()
+    start: Optional[float] = None
+    end = 0.0
+    texts: List[str] = []
+
+    def flush():
+        if start is not None and texts:
+            cues.append(start, end, ' '.join(texts))
+
+    for line in lines:
+        match = CUE_TIMING_REGEX.match(line)
+        if match:
+            flush()
+            start, end = parse_timestamp(match.group(1)), parse_timestamp(match.group(2))
+            texts = []
+            continue
+        if not line.strip():
+            # 空行代表 cue 結束，下一個時間軸之前的內容 (cue id、NOTE) 不列入
+            flush()
+            start, texts = None, []
+            continue
+        if start is None:
+            continue
+        texts.append(TAG_REGEX.sub('', line).strip())
+    flush()
+    return cues
+
+
+def parse_vtt(file_path: str) -> CueList:
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return parse_vtt_lines(file.readlines())
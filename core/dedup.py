@@ -0,0 +1,161 @@
+import hashlib
+import random
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from array import array
+from typing import Callable, List, Optional, Set, Tuple
+
+# Mersenne prime 2^61 - 1，MinHash 的 hash 函數 (a * x + b) mod P
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+WORD_REGEX = re.compile(r'\w+', re.UNICODE)
+
+
+def shingles(text: str, size: int = 5, max_words: int = 3000) -> Set[int]:
+    '''
+    取前 max_words 個字，每 size 個連續字為一個 shingle，回傳 shingle 的 crc32。
+    中文沒有空白分詞，以單字為單位。
+    '''
+    words = []
+    for token in WORD_REGEX.findall(text.lower()):
+        # 中日韓文字逐字切開
+        if any('぀' <= char <= '鿿' for char in token):
+            words.extend(token)
+        else:
+            words.append(token)
+        if len(words) >= max_words:
+            break
+    words = words[:max_words]
+    if len(words) < size:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))} if words else set()
+    return {zlib.crc32(' '.join(words[i:i + size]).encode('utf-8')) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    '''
+    以 num_perm 個 hash 函數計算 MinHash signature，兩個 signature 相同位置相等的比例即為 Jaccard 相似度的估計。
+    seed 固定，不同次執行算出的 signature 可以互相比較。
+    '''
+    def __init__(self, num_perm: int = 128, seed: int = 1) -> None:
+        generator = random.Random(seed)
+        self.num_perm = num_perm
+        self.params = [(generator.randrange(1, _PRIME), generator.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+    def signature(self, features: Set[int]) -> array:
+        if not features:
+            return array('I', [_MAX_HASH] * self.num_perm)
+        return array('I', [min(((a * x + b) % _PRIME) & _MAX_HASH for x in features) for a, b in self.params])
+
+    @staticmethod
+    def similarity(first: array, second: array) -> float:
+        return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+class DedupIndex:
+    '''
+    以 MinHash + LSH 找出內容幾乎相同的影片 (重新上傳、剪輯版、鏡像頻道)，生成文章前直接沿用既有文章。
+    signature 存在 minhash_signatures 表，LSH 的 band hash 存在 minhash_bands 表並建立索引，
+    查詢只比對落在同一個 band 的候選影片，不需要掃描整個資料庫。
+
+    bands * rows 必須等於 num_perm；bands=16、rows=8 時相似度約 0.7 以上的影片會成為候選。
+
+    Example:
+        dedup = DedupIndex('output/yt_info.db', threshold=0.8)
+        duplicate = dedup.find_duplicate('cPdVWtRFDqw', transcript)
+        dedup.add('cPdVWtRFDqw', transcript, duplicate_of=duplicate)
+    '''
+    def __init__(self, db_path: str = 'output/yt_info.db', threshold: float = 0.8, num_perm: int = 128,
+                 bands: int = 16, shingle_size: int = 5, max_words: int = 3000) -> None:
+        if num_perm % bands != 0:
+            raise ValueError(f'num_perm ({num_perm}) must be divisible by bands ({bands}).')
+        self.db_path = db_path
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.max_words = max_words
+        self.hasher = MinHasher(num_perm)
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.cursor = self.conn.cursor()
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS minhash_signatures (
+            video_id TEXT PRIMARY KEY,
+            signature BLOB,
+            duplicate_of TEXT,
+            updated REAL
+        );
+        ''')
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS minhash_bands (
+            band INTEGER,
+            hash TEXT,
+            video_id TEXT,
+            PRIMARY KEY (band, hash, video_id)
+        );
+        ''')
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_minhash_bands_video_id ON minhash_bands (video_id);")
+        self.conn.commit()
+
+    def signature(self, text: str) -> array:
+        return self.hasher.signature(shingles(text, self.shingle_size, self.max_words))
+
+    def band_hashes(self, signature: array) -> List[str]:
+        # 沒有內容的 signature 不放入 LSH，避免空白逐字稿彼此被當成重複
+        if all(value == _MAX_HASH for value in signature):
+            return []
+        # md5 只用來分桶，不涉及安全性 (FIPS 模式下也可使用)
+        return [hashlib.md5(signature[i * self.rows:(i + 1) * self.rows].tobytes(), usedforsecurity=False).hexdigest()
+                for i in range(self.bands)]
+
+    def add(self, video_id: str, text: str, duplicate_of: Optional[str] = None, signature: Optional[array] = None) -> None:
+        signature = signature if signature is not None else self.signature(text)
+        with self.lock:
+            self.cursor.execute("DELETE FROM minhash_bands WHERE video_id = ?", (video_id,))
+            self.cursor.execute("INSERT OR REPLACE INTO minhash_signatures (video_id, signature, duplicate_of, updated) VALUES (?, ?, ?, ?)",
+                                (video_id, signature.tobytes(), duplicate_of, time.time()))
+            self.cursor.executemany("INSERT OR IGNORE INTO minhash_bands (band, hash, video_id) VALUES (?, ?, ?)",
+                                    [(band, value, video_id) for band, value in enumerate(self.band_hashes(signature))])
+            self.conn.commit()
+
+    def query(self, text: str, exclude: Optional[str] = None, signature: Optional[array] = None) -> List[Tuple[str, float]]:
+        '''
+        回傳相似度達到 threshold 的 [(video_id, 估計的相似度), ...]，由高到低排序。
+        '''
+        signature = signature if signature is not None else self.signature(text)
+        with self.lock:
+            candidates = set()
+            for band, value in enumerate(self.band_hashes(signature)):
+                self.cursor.execute("SELECT video_id FROM minhash_bands WHERE band = ? AND hash = ?", (band, value))
+                candidates.update(row[0] for row in self.cursor.fetchall())
+            candidates.discard(exclude)
+            results = []
+            for candidate in candidates:
+                self.cursor.execute("SELECT signature FROM minhash_signatures WHERE video_id = ?", (candidate,))
+                row = self.cursor.fetchone()
+                if row is None:
+                    continue
+                other = array('I')
+                other.frombytes(row[0])
+                score = MinHasher.similarity(signature, other)
+                if score >= self.threshold:
+                    results.append((candidate, score))
+        return sorted(results, key=lambda item: (-item[1], item[0]))
+
+    def find_duplicate(self, video_id: str, text: str, accept: Optional[Callable[[str], bool]] = None,
+                       signature: Optional[array] = None) -> Optional[str]:
+        '''
+        回傳最相似且 accept(video_id) 為 True 的影片 (例如已有文章)，沒有則回傳 None。
+        '''
+        for candidate, score in self.query(text, exclude=video_id, signature=signature):
+            if accept is None or accept(candidate):
+                print(f'{video_id} is a near-duplicate of {candidate} (similarity {score:.2f})')
+                return candidate
+        return None
+
+    def close(self):
+        self.cursor.close()
+        self.conn.close()
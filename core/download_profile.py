@@ -0,0 +1,102 @@
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+
+class HostLimiter:
+    '''
+    限制同一個 host 同時使用的連線數，所有 worker 共用，避免並行下載觸發 YouTube 限速。
+    一次下載可能佔用多條連線 (-N 或 aria2c 的 -x)，因此以 Condition 一次取得 count 個名額，
+    不會有兩個 worker 各拿一半名額互相等待的情況。
+
+    Example:
+        with host_limiter.acquire('www.youtube.com', 4):
+            subprocess.run(...)
+    '''
+    def __init__(self, max_connections: int = 16) -> None:
+        self.max_connections = max_connections
+        self.condition = threading.Condition()
+        self.in_use: Dict[str, int] = {}
+
+    @contextmanager
+    def acquire(self, host: str, count: int = 1):
+        # 單一下載超過上限時只佔用全部名額，不會永遠等待
+        count = max(1, min(count, self.max_connections))
+        with self.condition:
+            while self.in_use.get(host, 0) + count > self.max_connections:
+                self.condition.wait()
+            self.in_use[host] = self.in_use.get(host, 0) + count
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.in_use[host] -= count
+                self.condition.notify_all()
+
+
+host_limiter = HostLimiter()
+
+
+class DownloadProfile:
+    '''
+    yt-dlp 的下載設定：並行 fragment 數 (-N)、外部下載器 (例如 aria2c) 與影片網址。
+    base_url 可指向本地的 HTTP 服務做測試，網址為 base_url + video_id。
+
+    Example:
+        profile = DownloadProfile(concurrent_fragments=8)
+        command = ['yt-dlp', *profile.args(), profile.video_url('g0RWoZnOANM')]
+    '''
+    def __init__(self, name: str = 'default', concurrent_fragments: int = 1, external_downloader: Optional[str] = None,
+                 external_downloader_args: Optional[str] = None, http_chunk_size: Optional[str] = None,
+                 connections: Optional[int] = None, base_url: str = 'https://www.youtube.com/watch?v=') -> None:
+        self.name = name
+        self.concurrent_fragments = concurrent_fragments
+        self.external_downloader = external_downloader
+        self.external_downloader_args = external_downloader_args
+        self.http_chunk_size = http_chunk_size
+        # 一次下載佔用的連線數，預設與 concurrent_fragments 相同
+        self.connections = connections or concurrent_fragments
+        self.base_url = base_url
+
+    @property
+    def host(self) -> str:
+        return urlparse(self.base_url).netloc
+
+    def video_url(self, video_id: str) -> str:
+        return f'{self.base_url}{video_id}'
+
+    def args(self) -> List[str]:
+        args = []
+        if self.concurrent_fragments > 1:
+            args += ['--concurrent-fragments', str(self.concurrent_fragments)]
+        if self.http_chunk_size:
+            args += ['--http-chunk-size', self.http_chunk_size]
+        if self.external_downloader:
+            args += ['--external-downloader', self.external_downloader]
+            if self.external_downloader_args:
+                args += ['--external-downloader-args', self.external_downloader_args]
+        return args
+
+    def with_base_url(self, base_url: str) -> 'DownloadProfile':
+        return DownloadProfile(self.name, self.concurrent_fragments, self.external_downloader,
+                               self.external_downloader_args, self.http_chunk_size, self.connections, base_url)
+
+
+PROFILES = {
+    'default': DownloadProfile(),
+    # yt-dlp 內建下載器：--concurrent-fragments 只對 DASH/HLS 等分段格式並行；
+    # 一般 https 音訊仍是單一連線，http_chunk_size 只把它拆成依序的 10 MB range request，
+    # 可避開 YouTube 對長連線的限速，但不會並行。需要單一檔案多連線時請用 'aria2c'。
+    'fast': DownloadProfile('fast', concurrent_fragments=4, http_chunk_size='10M'),
+    # aria2c 對單一 https 檔案開 4 條連線 (-x/-s) 分段下載
+    'aria2c': DownloadProfile('aria2c', external_downloader='aria2c',
+                              external_downloader_args='aria2c:-x 4 -s 4 -k 1M', connections=4),
+}
+
+
+def get_profile(name: str = 'default', base_url: Optional[str] = None) -> DownloadProfile:
+    if name not in PROFILES:
+        raise ValueError(f'Unknown download profile "{name}", expected one of {list(PROFILES)}.')
+    profile = PROFILES[name]
+    return profile.with_base_url(base_url) if base_url else profile
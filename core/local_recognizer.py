@@ -0,0 +1,65 @@
+import importlib.util
+import threading
+from typing import Optional
+from core.utils import Recognizer
+
+
+class LocalWhisperRecognizer(Recognizer):
+    '''
+    以 faster-whisper (CTranslate2) 在本機 CPU 轉錄，不需上傳音檔，也不受 API 配額限制。
+    預設使用 int8 量化模型，batch_size > 1 時以 BatchedInferencePipeline 一次解碼多個片段。
+    模型在第一次轉錄時才載入，只下載字幕的執行不會付出載入成本。
+    輸出檔案與 DB 更新與 WhisperRecognizer 相同。
+
+    需要另外安裝：pip install faster-whisper
+
+    Example:
+        recognizer = LocalWhisperRecognizer(model_size='small', cpu_threads=8, batch_size=8)
+        text = recognizer.transcribe_audio('g0RWoZnOANM')
+    '''
+    def __init__(self, model_size: str = 'small', compute_type: str = 'int8', cpu_threads: int = 0,
+                 num_workers: int = 1, batch_size: int = 8, language: Optional[str] = None, model = None) -> None:
+        self.batch_size = batch_size
+        self.language = language
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.num_workers = num_workers
+        self.model = model
+        self.pipeline = None
+        self.loaded = False
+        self.lock = threading.Lock()
+        # 只檢查是否已安裝，不 import，缺少套件時仍在啟動時就報錯
+        if model is None and importlib.util.find_spec('faster_whisper') is None:
+            raise ImportError("--asr local requires faster-whisper, install it with `pip install faster-whisper`.")
+
+    def load(self) -> None:
+        '''
+        載入模型，多個 transcribe worker 同時呼叫時只載入一次。
+        '''
+        with self.lock:
+            if self.loaded:
+                return
+            if self.model is None:
+                from faster_whisper import WhisperModel
+                # cpu_threads 為每個轉錄使用的 thread 數 (0 為 CTranslate2 預設)，
+                # num_workers 為可同時轉錄的數量，對應 pipeline transcribe 階段的 worker 數
+                self.model = WhisperModel(self.model_size, device='cpu', compute_type=self.compute_type,
+                                          cpu_threads=self.cpu_threads, num_workers=self.num_workers)
+            if self.batch_size > 1:
+                try:
+                    from faster_whisper import BatchedInferencePipeline
+                    self.pipeline = BatchedInferencePipeline(model=self.model)
+                except ImportError:
+                    # faster-whisper 1.1 之前沒有 batched decoding，退回逐段解碼
+                    self.pipeline = None
+            self.loaded = True
+
+    def recognize(self, audio_path: str) -> str:
+        self.load()
+        if self.pipeline is not None:
+            segments, _ = self.pipeline.transcribe(audio_path, language=self.language, batch_size=self.batch_size)
+        else:
+            segments, _ = self.model.transcribe(audio_path, language=self.language)
+        # segments 是 generator，實際解碼在迭代時進行
+        return ' '.join(segment.text.strip() for segment in segments)
@@ -0,0 +1,170 @@
+import atexit
+import glob
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional
+
+_STOP = object()
+
+
+class StructuredLogger:
+    '''
+    以背景 thread 寫入 JSON lines 的 log，呼叫端只把紀錄放進 queue，不會在主流程開關檔案。
+    檔案超過 max_bytes 時輪替，舊的檔案以 gzip 壓縮。
+    queue 最多 max_queue 筆，寫入端跟不上或 thread 已停止時丟棄新紀錄並計入 dropped，不會拖住主流程。
+    寫入失敗 (例如磁碟已滿) 只記錄在 error，thread 會繼續處理後續紀錄。
+
+    Example:
+        logger = get_logger('output/logs')
+        logger.log('g0RWoZnOANM', 'Subtitles downloaded', event='download_subtitle', returncode=0)
+        records = list(logger.query('g0RWoZnOANM'))
+    '''
+    def __init__(self, log_dir: str = 'output/logs', name: str = 'yt_dlp', max_bytes: int = 10 * 1024 * 1024,
+                 flush_interval: float = 1.0, max_queue: int = 10000) -> None:
+        self.log_dir = log_dir
+        self.name = name
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.path = os.path.join(log_dir, f'{name}.jsonl')
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.error: Optional[BaseException] = None
+        self.thread = threading.Thread(target=self._run, name=f'logger-{name}', daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def log(self, video_id: Optional[str], message: str, **fields: Any) -> None:
+        record = {'time': time.time(), 'video_id': video_id, 'message': message}
+        record.update(fields)
+        if not self.thread.is_alive():
+            self.dropped += 1
+            return
+        try:
+            self.queue.put(record, timeout=self.flush_interval)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float = 10.0) -> None:
+        '''
+        等待 queue 中的紀錄寫入檔案；thread 已停止時 raise RuntimeError，超過 timeout 秒 raise TimeoutError。
+        '''
+        deadline = time.time() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                if not self.thread.is_alive():
+                    raise RuntimeError(f'The {self.name} log writer is not running, {self.queue.unfinished_tasks} records are not written.')
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise TimeoutError(f'The {self.name} log writer did not finish within {timeout} seconds.')
+                self.queue.all_tasks_done.wait(min(remaining, self.flush_interval))
+
+    def close(self) -> None:
+        if self.thread.is_alive():
+            try:
+                self.queue.put(_STOP, timeout=self.flush_interval)
+            except queue.Full:
+                return
+            self.thread.join(timeout=10)
+
+    def _run(self) -> None:
+        file = None
+        last_flush = time.time()
+        try:
+            while True:
+                try:
+                    record = self.queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    if file:
+                        self._safe(file.flush)
+                    last_flush = time.time()
+                    continue
+                if record is _STOP:
+                    self.queue.task_done()
+                    break
+                try:
+                    if file is None:
+                        os.makedirs(self.log_dir, exist_ok=True)
+                        file = open(self.path, 'a', encoding='utf-8')
+                    file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+                    # queue 空了或超過 flush_interval 才寫入磁碟，避免每筆紀錄都 flush
+                    if self.queue.empty() or time.time() - last_flush > self.flush_interval:
+                        file.flush()
+                        last_flush = time.time()
+                        if file.tell() >= self.max_bytes:
+                            file.close()
+                            file = None
+                            self.rotate()
+                except Exception as e:
+                    self.dropped += 1
+                    if self.error is None:
+                        print(f'Failed to write the {self.name} log: {e}')
+                    self.error = e
+                    # 下一筆紀錄重新開檔
+                    if file is not None:
+                        self._safe(file.close)
+                        file = None
+                finally:
+                    self.queue.task_done()
+        finally:
+            if file is not None:
+                self._safe(file.close)
+
+    @staticmethod
+    def _safe(function) -> None:
+        try:
+            function()
+        except Exception:
+            pass
+
+    def rotate(self) -> str:
+        now_time = '{:%y%m%d_%H%M%S_%f}'.format(datetime.now())
+        rotated_path = os.path.join(self.log_dir, f'{self.name}.{now_time}.jsonl.gz')
+        with open(self.path, 'rb') as source, gzip.open(rotated_path, 'wb') as target:
+            shutil.copyfileobj(source, target)
+        os.remove(self.path)
+        return rotated_path
+
+    def segments(self):
+        rotated = sorted(glob.glob(os.path.join(glob.escape(self.log_dir), f'{self.name}.*.jsonl.gz')))
+        return rotated + ([self.path] if os.path.exists(self.path) else [])
+
+    def query(self, video_id: str) -> Iterator[Dict[str, Any]]:
+        '''
+        依時間順序回傳某部影片的所有 log 紀錄，包含已壓縮的舊檔案。
+        '''
+        try:
+            self.flush()
+        except (RuntimeError, TimeoutError) as e:
+            # 仍回傳已寫入檔案的紀錄
+            print(e)
+        for path in self.segments():
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    # 先用字串比對過濾，減少 json 解析
+                    if video_id not in line:
+                        continue
+                    record = json.loads(line)
+                    if record.get('video_id') == video_id:
+                        yield record
+
+
+_loggers: Dict[str, StructuredLogger] = {}
+_loggers_lock = threading.Lock()
+
+
+def get_logger(log_dir: str = 'output/logs', name: str = 'yt_dlp') -> StructuredLogger:
+    '''
+    同一個 log_dir/name 在 process 內共用一個 logger。
+    '''
+    key = os.path.join(log_dir, name)
+    with _loggers_lock:
+        if key not in _loggers:
+            _loggers[key] = StructuredLogger(log_dir=log_dir, name=name)
+        return _loggers[key]
@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+
+class Span:
+    '''
+    metrics.span() 回傳的物件，可在區塊內修改 outcome，例如 span.outcome = 'NotFound'。
+    '''
+    __slots__ = ('outcome',)
+
+    def __init__(self) -> None:
+        self.outcome = 'success'
+
+
+class Metrics:
+    '''
+    記錄各階段耗時與計數，可輸出 Prometheus text format 或 JSON summary。
+
+    Example:
+        with metrics.span('download_audio') as span:
+            result = subprocess.run(...)
+            if result.returncode != 0:
+                span.outcome = 'Error'
+        metrics.inc('bytes_total', 1024, stage='download_audio')
+        print(metrics.to_prometheus())
+    '''
+    PREFIX = 'subtoarticle'
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.started = time.time()
+        # (stage, outcome) -> [count, total seconds, max seconds]
+        self.spans: Dict[Tuple[str, str], list] = {}
+        # (name, ((label, value), ...)) -> value
+        self.counters: Dict[Tuple[str, tuple], float] = {}
+
+    @contextmanager
+    def span(self, stage: str):
+        span = Span()
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            span.outcome = 'Error'
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start, span.outcome)
+
+    def observe(self, stage: str, seconds: float, outcome: str = 'success') -> None:
+        with self.lock:
+            record = self.spans.setdefault((stage, outcome), [0, 0.0, 0.0])
+            record[0] += 1
+            record[1] += seconds
+            record[2] = max(record[2], seconds)
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def reset(self) -> None:
+        with self.lock:
+            self.spans.clear()
+            self.counters.clear()
+            self.started = time.time()
+
+    @staticmethod
+    def format_labels(labels) -> str:
+        if not labels:
+            return ''
+        values = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in labels)
+        return '{' + values + '}'
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self.lock:
+            spans = sorted(self.spans.items())
+            counters = sorted(self.counters.items())
+        name = f'{self.PREFIX}_stage_seconds'
+        lines.append(f'# HELP {name} Time spent in each pipeline stage.')
+        lines.append(f'# TYPE {name} summary')
+        for (stage, outcome), (count, total, _) in spans:
+            labels = self.format_labels((('stage', stage), ('outcome', outcome)))
+            lines.append(f'{name}_count{labels} {count}')
+            lines.append(f'{name}_sum{labels} {total:.6f}')
+        declared = set()
+        for (counter, labels), value in counters:
+            metric = f'{self.PREFIX}_{counter}'
+            if metric not in declared:
+                lines.append(f'# TYPE {metric} counter')
+                declared.add(metric)
+            lines.append(f'{metric}{self.format_labels(labels)} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> Dict:
+        with self.lock:
+            stages = {}
+            for (stage, outcome), (count, total, longest) in sorted(self.spans.items()):
+                stages.setdefault(stage, {})[outcome] = {
+                    'count': count,
+                    'total_seconds': round(total, 6),
+                    'avg_seconds': round(total / count, 6),
+                    'max_seconds': round(longest, 6),
+                }
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self.counters.items())]
+            return {'started': self.started, 'elapsed_seconds': round(time.time() - self.started, 6),
+                    'stages': stages, 'counters': counters}
+
+    def write_summary(self, output_dir: str = 'output/metrics') -> str:
+        os.makedirs(output_dir, exist_ok=True)
+        now_time = '{:%y%m%d_%H%M%S}'.format(datetime.now())
+        output_path = os.path.join(output_dir, f'{now_time}_run.json')
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+        # 給 node_exporter textfile collector 讀取
+        with open(os.path.join(output_dir, 'last_run.prom'), 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        print(f'Save the run metrics to {output_path}')
+        return output_path
+
+
+metrics = Metrics()
@@ -0,0 +1,94 @@
+import queue
+import threading
+from typing import Any, Callable, Iterable, List, Optional
+
+_STOP = object()
+
+
+class Stage:
+    '''
+    Pipeline 中的一個階段。func 接收上一階段的 item，回傳 None 代表此 item 不再往下傳。
+    queue_size 為此階段輸入 queue 的上限，上游塞滿時會被阻塞 (backpressure)。
+    '''
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int = 1, queue_size: int = 8) -> None:
+        if workers < 1:
+            raise ValueError(f"Stage {name} needs at least one worker.")
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.queue_size = queue_size
+
+
+class Pipeline:
+    '''
+    以 thread 與有上限的 queue 串接多個 Stage，讓不同影片同時處於不同階段。
+    總耗時接近最慢的階段，而不是所有階段相加。
+
+    Example:
+        pipeline = Pipeline([Stage('fetch', fetch, workers=4), Stage('generate', generate, workers=2)])
+        results = pipeline.run(video_ids)
+    '''
+    def __init__(self, stages: List[Stage]) -> None:
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage.")
+        self.stages = stages
+        self.errors = []
+        self._lock = threading.Lock()
+
+    def run(self, source: Iterable[Any]) -> List[Any]:
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        results = []
+        remaining = [stage.workers for stage in self.stages]
+        threads = []
+
+        def produce():
+            try:
+                for item in source:
+                    queues[0].put(item)
+            except Exception as e:
+                self.record_error('source', None, e)
+            finally:
+                for _ in range(self.stages[0].workers):
+                    queues[0].put(_STOP)
+
+        def work(index: int):
+            stage = self.stages[index]
+            next_queue = queues[index + 1] if index + 1 < len(queues) else None
+            while True:
+                item = queues[index].get()
+                if item is _STOP:
+                    break
+                try:
+                    output = stage.func(item)
+                except Exception as e:
+                    self.record_error(stage.name, item, e)
+                    continue
+                if output is None:
+                    continue
+                if next_queue is None:
+                    with self._lock:
+                        results.append(output)
+                else:
+                    next_queue.put(output)
+            # 最後一個結束的 worker 通知下一個階段
+            with self._lock:
+                remaining[index] -= 1
+                last = remaining[index] == 0
+            if last and next_queue is not None:
+                for _ in range(self.stages[index + 1].workers):
+                    next_queue.put(_STOP)
+
+        threads.append(threading.Thread(target=produce, name='pipeline-source', daemon=True))
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                threads.append(threading.Thread(target=work, args=(index,), name=f'pipeline-{stage.name}-{n}', daemon=True))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def record_error(self, stage_name: str, item: Optional[Any], error: Exception) -> None:
+        print(f'Stage "{stage_name}" failed for {item}: {error}')
+        with self._lock:
+            self.errors.append((stage_name, item, error))
@@ -0,0 +1,154 @@
+import io
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, List, Optional
+
+_DISABLED = nullcontext()
+# cProfile / pstats 只在 enable() 後才載入，未啟用時 import 本模組幾乎沒有成本
+
+
+class Profiler:
+    '''
+    依階段 (fetch, download, transcribe, clean, generate) 記錄 cProfile 與取樣的 call stack。
+    未啟用時 stage() 直接回傳共用的 nullcontext，幾乎沒有額外成本。
+
+    啟用後會輸出到 output_dir：
+        {time}_{stage}.pstats      可用 python -m pstats 或 snakeviz 開啟
+        {time}_{stage}.collapsed   flamegraph.pl / speedscope 可讀的 collapsed stacks
+
+    Example:
+        profiler.enable('output/profiles')
+        with profiler.stage('download'):
+            ...
+        profiler.report()
+    '''
+    def __init__(self) -> None:
+        self.enabled = False
+        self.output_dir = 'output/profiles'
+        self.interval = 0.005
+        self.lock = threading.Lock()
+        self.stats: Dict[str, 'pstats.Stats'] = {}
+        self.samples: Dict[str, Counter] = {}
+        # thread id -> [(stage, cProfile.Profile or None), ...]
+        self.active: Dict[int, List] = {}
+        self.sampler: Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+
+    def enable(self, output_dir: str = 'output/profiles', interval: float = 0.005) -> None:
+        self.output_dir = output_dir
+        self.interval = interval
+        self.enabled = True
+        self.stop_event.clear()
+        self.sampler = threading.Thread(target=self._sample, name='profiler-sampler', daemon=True)
+        self.sampler.start()
+
+    def stage(self, name: str):
+        if not self.enabled:
+            return _DISABLED
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name: str):
+        import cProfile
+        thread_id = threading.get_ident()
+        with self.lock:
+            stack = self.active.setdefault(thread_id, [])
+        # 同一個 thread 的巢狀 stage：暫停外層的 cProfile，只記錄在最內層
+        if stack and stack[-1][1] is not None:
+            stack[-1][1].disable()
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ 同時只能有一個 profiler，其他 thread 只保留取樣結果
+            profile = None
+        # 取樣 thread 在 lock 內讀取 stack[-1]，修改 stack 也要持有 lock
+        with self.lock:
+            stack.append((name, profile))
+        try:
+            yield
+        finally:
+            with self.lock:
+                stack.pop()
+            if profile is not None:
+                profile.disable()
+                self._add_stats(name, profile)
+            if stack and stack[-1][1] is not None:
+                try:
+                    stack[-1][1].enable()
+                except ValueError:
+                    pass
+
+    def _add_stats(self, name: str, profile: 'cProfile.Profile') -> None:
+        import pstats
+        with self.lock:
+            if name in self.stats:
+                self.stats[name].add(profile)
+            else:
+                self.stats[name] = pstats.Stats(profile)
+
+    def _sample(self) -> None:
+        own_id = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            with self.lock:
+                active = {tid: stack[-1][0] for tid, stack in list(self.active.items()) if stack and tid != own_id}
+            for thread_id, name in active.items():
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                calls = []
+                while frame is not None:
+                    code = frame.f_code
+                    calls.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                    frame = frame.f_back
+                with self.lock:
+                    self.samples.setdefault(name, Counter())[';'.join(reversed(calls))] += 1
+
+    def disable(self) -> None:
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.stop_event.set()
+        if self.sampler is not None:
+            self.sampler.join()
+
+    def save(self) -> List[str]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        now_time = '{:%y%m%d_%H%M%S}'.format(datetime.now())
+        paths = []
+        with self.lock:
+            for name, stats in self.stats.items():
+                path = os.path.join(self.output_dir, f'{now_time}_{name}.pstats')
+                stats.dump_stats(path)
+                paths.append(path)
+            for name, counter in self.samples.items():
+                path = os.path.join(self.output_dir, f'{now_time}_{name}.collapsed')
+                with open(path, 'w', encoding='utf-8') as f:
+                    for stack, count in counter.most_common():
+                        f.write(f'{stack} {count}\n')
+                paths.append(path)
+        return paths
+
+    def report(self, top: int = 10) -> str:
+        '''
+        停止取樣、寫出檔案，並列出每個階段最耗時的函式。
+        '''
+        self.disable()
+        paths = self.save()
+        output = io.StringIO()
+        for name, stats in self.stats.items():
+            output.write(f'===== Profile of stage "{name}" =====\n')
+            stats.stream = output
+            stats.sort_stats('cumulative').print_stats(top)
+        output.write('Profiles saved to:\n' + '\n'.join(paths) + '\n')
+        print(output.getvalue())
+        return output.getvalue()
+
+
+profiler = Profiler()
@@ -0,0 +1,152 @@
+import math
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from core.utils import OperateDB, SUBTITLE_LANG_COLUMNS
+from core.metrics import metrics
+
+# 每百萬 token 的美元價格 (prompt, completion)
+MODEL_PRICES = {
+    'gpt-3.5-turbo': (0.5, 1.5),
+    'gpt-4o': (2.5, 10.0),
+}
+WHISPER_USD_PER_MINUTE = 0.006
+# 口說每分鐘約 150 字，約 200 個 token
+TOKENS_PER_MINUTE = 200
+# system prompt 與文章格式說明
+PROMPT_OVERHEAD_TOKENS = 300
+# 沒有 duration 的影片以 10 分鐘估算
+DEFAULT_DURATION = 600
+
+DEFAULT_WEIGHTS = {'recency': 1.0, 'views': 1.0, 'duration': 0.5}
+METADATA_COLUMNS = ['upload_date', 'view_count', 'duration', 'playlist_uploader_id']
+
+
+class VideoScheduler:
+    '''
+    依 videos 表中的 upload_date、view_count、duration 排序待處理的影片，
+    並在預算內 (以 duration 估算 Whisper 分鐘數與 token 數) 挑出要處理的影片，價值最高的文章最先產出。
+
+    priority = recency * 0.5 ** (上傳天數 / half_life_days)
+             + views * log(1 + 觀看數) / log(1 + 這批影片的最高觀看數)
+             + duration * (1 - 長度 / 這批影片的最長長度)
+    duration 權重為正時偏好短片 (便宜、快)，為負時偏好長片。
+
+    fair=True 時各頻道 (playlist_uploader_id) 輪流排入，避免單一頻道的大量舊片佔滿前面的位置。
+    超過 budget_usd 的影片延後到下次執行，排在後面但放得進預算的便宜影片仍會處理。
+    subtitle_source 為 None 時只估算文章的 token 費用 (例如字幕已清洗完成)。
+
+    Example:
+        scheduler = VideoScheduler(weights={'recency': 2.0, 'views': 1.0}, budget_usd=1.5)
+        video_ids, deferred = scheduler.schedule(video_ids)
+    '''
+    def __init__(self, weights: Optional[Dict[str, float]] = None, half_life_days: float = 180, fair: bool = True,
+                 budget_usd: Optional[float] = None, model: str = 'gpt-3.5-turbo', max_tokens: int = 2000,
+                 subtitle_source: Optional[str] = 'mp3', now: Optional[float] = None) -> None:
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update(weights or {})
+        self.half_life_days = half_life_days
+        self.fair = fair
+        self.budget_usd = budget_usd
+        self.model = model
+        self.max_tokens = max_tokens
+        self.subtitle_source = subtitle_source
+        self.now = now if now is not None else time.time()
+
+    def load(self, video_ids: List[str], db_path: str = 'output/yt_info.db') -> List[Dict[str, Any]]:
+        '''
+        從 DB 讀取排序需要的欄位，DB 中沒有的影片只帶 id。
+        '''
+        values = {}
+        if os.path.exists(db_path):
+            db = OperateDB(db_path)
+            try:
+                db.ensure_columns(SUBTITLE_LANG_COLUMNS)
+                values = db.get_values(video_ids, METADATA_COLUMNS + list(SUBTITLE_LANG_COLUMNS))
+            finally:
+                db.close()
+        return [dict(values.get(video_id, {}), id=video_id) for video_id in video_ids]
+
+    def age_days(self, video: Dict[str, Any]) -> Optional[float]:
+        try:
+            uploaded = datetime.strptime(str(video.get('upload_date')), '%Y%m%d').timestamp()
+        except ValueError:
+            return None
+        return max(self.now - uploaded, 0) / 86400
+
+    def score(self, video: Dict[str, Any], max_views: int = 0, max_duration: int = 0) -> float:
+        score = 0.0
+        age = self.age_days(video)
+        if age is not None:
+            score += self.weights.get('recency', 0) * 0.5 ** (age / self.half_life_days)
+        if video.get('view_count') and max_views:
+            score += self.weights.get('views', 0) * math.log1p(video['view_count']) / math.log1p(max_views)
+        if video.get('duration') and max_duration:
+            score += self.weights.get('duration', 0) * (1 - video['duration'] / max_duration)
+        return score
+
+    def needs_transcription(self, video: Dict[str, Any]) -> bool:
+        if self.subtitle_source == 'mp3':
+            return True
+        if self.subtitle_source == 'both':
+            # 已 probe 過且有字幕時不需要 Whisper；沒 probe 過的影片保守估計
+            return not (video.get('subtitle_langs') or video.get('auto_caption_langs'))
+        return False
+
+    def estimate_cost(self, video: Dict[str, Any]) -> float:
+        '''
+        以 duration 估算處理一部影片的美元費用：Whisper 分鐘數 + 文章的 prompt 與 completion token。
+        '''
+        minutes = (video.get('duration') or DEFAULT_DURATION) / 60
+        prompt_price, completion_price = MODEL_PRICES.get(self.model, MODEL_PRICES['gpt-4o'])
+        prompt_tokens = minutes * TOKENS_PER_MINUTE + PROMPT_OVERHEAD_TOKENS
+        cost = (prompt_tokens * prompt_price + self.max_tokens * completion_price) / 1_000_000
+        if self.needs_transcription(video):
+            cost += minutes * WHISPER_USD_PER_MINUTE
+        return cost
+
+    def order(self, videos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        '''
+        依 priority 由高到低排序；fair=True 時每一輪各頻道取一部，同一輪內再依 priority 排序。
+        '''
+        max_views = max((video.get('view_count') or 0 for video in videos), default=0)
+        max_duration = max((video.get('duration') or 0 for video in videos), default=0)
+        for video in videos:
+            video['priority'] = self.score(video, max_views, max_duration)
+        # 同分時保持輸入順序
+        ranked = sorted(videos, key=lambda video: -video['priority'])
+        if not self.fair:
+            return ranked
+        queues: Dict[str, List[Dict[str, Any]]] = {}
+        for video in ranked:
+            queues.setdefault(video.get('playlist_uploader_id') or '', []).append(video)
+        ordered = []
+        depth = 0
+        while len(ordered) < len(ranked):
+            batch = [queue[depth] for queue in queues.values() if depth < len(queue)]
+            ordered.extend(sorted(batch, key=lambda video: -video['priority']))
+            depth += 1
+        return ordered
+
+    def plan(self, videos: List[Dict[str, Any]]) -> Tuple[List[str], List[str]]:
+        '''
+        回傳 (這次要處理的 video_id, 超過預算延後的 video_id)，皆依處理順序排列。
+        '''
+        scheduled, deferred = [], []
+        spent = 0.0
+        for video in self.order(videos):
+            cost = self.estimate_cost(video)
+            if self.budget_usd is not None and spent + cost > self.budget_usd:
+                deferred.append(video['id'])
+                continue
+            spent += cost
+            scheduled.append(video['id'])
+        metrics.inc('estimated_cost_usd_total', spent, stage='schedule')
+        if self.budget_usd is not None:
+            print(f'Scheduled {len(scheduled)} videos (estimated ${spent:.2f} of ${self.budget_usd:.2f}), '
+                  f'deferred {len(deferred)} to the next run.')
+        return scheduled, deferred
+
+    def schedule(self, video_ids: List[str], db_path: str = 'output/yt_info.db') -> Tuple[List[str], List[str]]:
+        return self.plan(self.load(list(video_ids), db_path))
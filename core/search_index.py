@@ -0,0 +1,147 @@
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+from core.content_store import KINDS
+
+
+class SearchIndex:
+    '''
+    以 SQLite FTS5 建立逐字稿、清洗後字幕與文章的全文索引，存在 yt_info.db 的 content_fts 表。
+    搜尋結果依 bm25 排序，並從 videos 表帶出標題。
+
+    tokenize 預設為 unicode61，中文內容可改用 'trigram' (查詢字串至少 3 個字)。
+    content_fts_keys 記錄 (video_id, kind) 對應的 FTS rowid，取代時以 rowid 刪除，
+    不需要以 UNINDEXED 欄位掃描整個表。
+
+    Example:
+        index = SearchIndex('output/yt_info.db')
+        index.add('g0RWoZnOANM', 'transcription', text)
+        for result in index.search('resume tips'):
+            print(result['video_id'], result['title'], result['snippet'])
+    '''
+    def __init__(self, db_path: str = 'output/yt_info.db', tokenize: str = 'unicode61 remove_diacritics 2') -> None:
+        self.db_path = db_path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.cursor = self.conn.cursor()
+        self.cursor.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS content_fts USING fts5(
+            video_id UNINDEXED,
+            kind UNINDEXED,
+            body,
+            tokenize = '{tokenize}'
+        );
+        ''')
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'content_fts_keys'")
+        is_new = self.cursor.fetchone() is None
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS content_fts_keys (
+            video_id TEXT,
+            kind TEXT,
+            fts_rowid INTEGER,
+            PRIMARY KEY (video_id, kind)
+        );
+        ''')
+        if is_new:
+            # 舊版的索引沒有對照表，掃描一次補上 (同一組重複時保留最新的 rowid)
+            self.cursor.execute('''
+            INSERT OR REPLACE INTO content_fts_keys (video_id, kind, fts_rowid)
+            SELECT video_id, kind, rowid FROM content_fts ORDER BY rowid
+            ''')
+        self.conn.commit()
+
+    def add(self, video_id: str, kind: str, text: str) -> None:
+        '''
+        新增或取代一部影片某種內容的索引。
+        '''
+        with self.lock:
+            self._delete(video_id, kind)
+            self.cursor.execute("INSERT INTO content_fts (video_id, kind, body) VALUES (?, ?, ?)", (video_id, kind, text))
+            self.cursor.execute("INSERT INTO content_fts_keys (video_id, kind, fts_rowid) VALUES (?, ?, ?)",
+                                (video_id, kind, self.cursor.lastrowid))
+            self.conn.commit()
+
+    def _delete(self, video_id: str, kind: str) -> None:
+        self.cursor.execute("SELECT fts_rowid FROM content_fts_keys WHERE video_id = ? AND kind = ?", (video_id, kind))
+        row = self.cursor.fetchone()
+        if row is not None:
+            self.cursor.execute("DELETE FROM content_fts WHERE rowid = ?", row)
+            self.cursor.execute("DELETE FROM content_fts_keys WHERE video_id = ? AND kind = ?", (video_id, kind))
+
+    def remove(self, video_id: str, kind: Optional[str] = None) -> None:
+        with self.lock:
+            kinds = [kind] if kind else list(KINDS)
+            for row_kind in kinds:
+                self._delete(video_id, row_kind)
+            self.conn.commit()
+
+    @staticmethod
+    def escape(query: str) -> str:
+        '''
+        把一般的搜尋字串轉成 FTS5 語法，每個字都視為字面文字 (AND)，避免 '-'、':' 等字元造成語法錯誤。
+        '''
+        terms = re.findall(r'\S+', query)
+        return ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+    def has_videos_table(self) -> bool:
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'videos'")
+        return self.cursor.fetchone() is not None
+
+    def search(self, query: str, limit: int = 20, kind: Optional[str] = None, raw: bool = False,
+               snippet_tokens: int = 16) -> List[Dict[str, Any]]:
+        '''
+        回傳 [{'video_id', 'kind', 'title', 'snippet', 'score'}, ...]，score 越小越相關。
+        raw=True 時 query 直接使用 FTS5 語法，例如 'resume NOT interview' 或 '"data analysis"'。
+        '''
+        match = query if raw else self.escape(query)
+        if not match:
+            return []
+        with self.lock:
+            title = "v.title" if self.has_videos_table() else "NULL"
+            join = "LEFT JOIN videos v ON v.id = f.video_id" if title != "NULL" else ""
+            sql = f'''
+            SELECT f.video_id, f.kind, {title}, snippet(content_fts, 2, '[', ']', '...', ?), bm25(content_fts) AS score
+            FROM content_fts f {join}
+            WHERE content_fts MATCH ?
+            '''
+            params: List[Any] = [snippet_tokens, match]
+            if kind:
+                sql += " AND f.kind = ?"
+                params.append(kind)
+            sql += " ORDER BY score LIMIT ?"
+            params.append(limit)
+            try:
+                self.cursor.execute(sql, params)
+            except sqlite3.OperationalError as e:
+                raise ValueError(f'Invalid search query "{query}": {e}') from e
+            rows = self.cursor.fetchall()
+        return [{'video_id': video_id, 'kind': row_kind, 'title': row_title, 'snippet': snippet, 'score': score}
+                for video_id, row_kind, row_title, snippet, score in rows]
+
+    def count(self) -> int:
+        with self.lock:
+            self.cursor.execute("SELECT COUNT(*) FROM content_fts")
+            return self.cursor.fetchone()[0]
+
+    def import_files(self, output_dir: str = 'output/') -> int:
+        '''
+        為舊版資料夾中既有的 .txt 建立索引，回傳數量。
+        '''
+        count = 0
+        for kind, directory in KINDS.items():
+            directory = os.path.join(output_dir, directory)
+            if not os.path.isdir(directory):
+                continue
+            for filename in sorted(os.listdir(directory)):
+                if not filename.endswith('.txt'):
+                    continue
+                with open(os.path.join(directory, filename), 'r', encoding='utf-8') as f:
+                    self.add(filename.split('.')[0], kind, f.read())
+                count += 1
+        return count
+
+    def close(self):
+        self.cursor.close()
+        self.conn.close()
@@ -0,0 +1,230 @@
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+from core.utils import WhisperRecognizer, db_pool
+from core.subtitle_downloader import MediaOperations
+from core.article_generator import ArticleGenerator
+from core.completion_cache import CompletionCache
+from core.audio_cache import AudioCache
+from core.checkpoint import StageCheckpoint
+from core.metrics import metrics
+
+VIDEO_ID_REGEX = re.compile(r'^[A-Za-z0-9_-]{11}$')
+
+
+class JobManager:
+    '''
+    常駐服務使用的 job 管理，所有 job 共用同一個 OpenAI client、recognizer 與 completion cache，
+    由 thread pool 在背景執行 下載 -> 轉錄/清洗 -> 生成文章。
+    每個 worker thread 保留自己的 DB 連線 (core.utils.db_pool)。
+    已結束的 job 超過 job_ttl 秒，或數量超過 max_jobs 時，從最舊的開始移除。
+    同一部影片已有排隊或執行中的 job 時，submit 直接回傳該 job，不會重複下載與生成。
+
+    Example:
+        manager = JobManager(output_dir='output/', workers=4)
+        job = manager.submit('g0RWoZnOANM')
+        manager.get(job['id'])['status']  # 'queued' / 'running' / 'done' / 'error'
+    '''
+    def __init__(self, output_dir: str = 'output/', workers: int = 4, model: str = 'gpt-3.5-turbo',
+                 max_tokens: int = 2000, subtitle_source: str = 'mp3', client: Optional[Any] = None,
+                 use_cache: bool = True, audio_cache_mb: int = 0,
+                 download_profile: Optional[Any] = None, recognizer: Optional[Any] = None,
+                 max_jobs: int = 1000, job_ttl: float = 24 * 3600) -> None:
+        self.output_dir = output_dir
+        self.max_jobs = max_jobs
+        self.job_ttl = job_ttl
+        self.subtitle_source = subtitle_source
+        self.download_profile = download_profile
+        if client is None:
+            from openai import OpenAI
+            client = OpenAI()
+        self.client = client
+        self.recognizer = recognizer or WhisperRecognizer(client=self.client)
+        self.cache = None
+        if use_cache:
+            os.makedirs(output_dir, exist_ok=True)
+            self.cache = CompletionCache(os.path.join(output_dir, 'completion_cache.db'))
+        self.audio_cache = None
+        if audio_cache_mb:
+            os.makedirs(output_dir, exist_ok=True)
+            self.audio_cache = AudioCache(os.path.join(output_dir, 'yt_info.db'), max_bytes=audio_cache_mb * 1024 * 1024,
+                                          audio_dir=os.path.join(output_dir, 'mp3'))
+        self.generator = ArticleGenerator(output_dir=output_dir, model=model, max_tokens=max_tokens,
+                                          client=self.client, cache=self.cache)
+        db_pool.enable()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        # video_id -> 排隊或執行中的 job id
+        self.active: Dict[str, str] = {}
+        self.lock = threading.Lock()
+
+    def submit(self, video_id: str, subtitle_source: Optional[str] = None, force: bool = False) -> Dict[str, Any]:
+        # find_files 以子字串比對檔名，空白或過短的 id 會對到其他影片的檔案
+        if not VIDEO_ID_REGEX.match(video_id or ''):
+            raise ValueError(f'Invalid video_id "{video_id}", expected 11 characters of A-Z, a-z, 0-9, _ or -.')
+        job = {
+            'id': uuid.uuid4().hex,
+            'video_id': video_id,
+            'subtitle_source': subtitle_source or self.subtitle_source,
+            'force': force,
+            'status': 'queued',
+            'stage': None,
+            'error': None,
+            'article_path': None,
+            'created': time.time(),
+            'finished': None,
+        }
+        with self.lock:
+            if video_id in self.active:
+                return dict(self.jobs[self.active[video_id]])
+            self.prune()
+            self.jobs[job['id']] = job
+            self.active[video_id] = job['id']
+            snapshot = dict(job)
+        self.executor.submit(self.run_job, job['id'])
+        return snapshot
+
+    def prune(self) -> None:
+        '''
+        移除過期的已結束 job，並讓 job 數量 (含即將新增的一個) 不超過 max_jobs；執行中的 job 不會被移除。
+        '''
+        now = time.time()
+        finished = sorted((job for job in self.jobs.values() if job['finished'] is not None),
+                          key=lambda job: job['finished'])
+        overflow = len(self.jobs) + 1 - self.max_jobs
+        for job in finished:
+            if now - job['finished'] > self.job_ttl or overflow > 0:
+                del self.jobs[job['id']]
+                overflow -= 1
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [dict(job) for job in self.jobs.values()]
+
+    def result(self, job_id: str) -> Optional[str]:
+        job = self.get(job_id)
+        if not job or job['status'] != 'done':
+            return None
+        # --content_store 時文章只在 DB 中
+        return self.generator.read_article(job['video_id'])
+
+    def update(self, job_id: str, **values) -> None:
+        with self.lock:
+            job = self.jobs[job_id]
+            job.update(values)
+            if job['finished'] is not None and self.active.get(job['video_id']) == job_id:
+                del self.active[job['video_id']]
+
+    def run_job(self, job_id: str) -> None:
+        job = self.get(job_id)
+        video_id = job['video_id']
+        checkpoint = StageCheckpoint(output_dir=self.output_dir, force=['subtitle', 'article'] if job['force'] else None)
+        media = MediaOperations(output_dir=self.output_dir, download_mode=job['subtitle_source'],
+                                recognizer=self.recognizer, audio_cache=self.audio_cache,
+                                download_profile=self.download_profile, force=job['force'])
+        try:
+            self.update(job_id, status='running')
+            if checkpoint.pending([video_id], 'subtitle'):
+                self.update(job_id, stage='fetch')
+                source = media.fetch_media(video_id)
+                if source is None:
+                    raise RuntimeError(f"No subtitle or audio could be downloaded for {video_id}.")
+                if source == 'mp3':
+                    self.update(job_id, stage='transcribe')
+                    media.transcribe(video_id)
+                if source == 'subtitle':
+                    self.update(job_id, stage='clean')
+                    media.clean_downloaded_subtitle(video_id)
+            self.update(job_id, stage='generate')
+            if checkpoint.pending([video_id], 'article'):
+                article_path = self.generator.generate(video_id, force=job['force'])
+            else:
+                article_path = self.generator.article_path(video_id)
+            self.update(job_id, status='done', stage=None, article_path=article_path, finished=time.time())
+        except Exception as e:
+            print(f'Job {job_id} for {video_id} failed: {e}')
+            self.update(job_id, status='error', error=str(e), finished=time.time())
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+        db_pool.disable()
+        if self.cache:
+            self.cache.close()
+        if self.audio_cache:
+            self.audio_cache.close()
+
+
+def create_app(manager: Optional[JobManager] = None):
+    '''
+    建立 FastAPI app，啟動方式：
+        uvicorn core.service:create_app --factory --port 8000
+    或
+        python main.py --mode serve
+    '''
+    from fastapi import FastAPI, HTTPException
+    from fastapi.responses import PlainTextResponse
+    from pydantic import BaseModel
+
+    class JobRequest(BaseModel):
+        video_id: str
+        subtitle_source: Optional[str] = None
+        force: bool = False
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        if app.state.manager is not None:
+            app.state.manager.shutdown()
+
+    app = FastAPI(title='SubToArticle', lifespan=lifespan)
+    app.state.manager = manager
+
+    def get_manager() -> JobManager:
+        if app.state.manager is None:
+            app.state.manager = JobManager()
+        return app.state.manager
+
+    @app.post('/jobs', status_code=202)
+    def submit_job(request: JobRequest):
+        if request.subtitle_source not in [None, 'mp3', 'subtitle', 'both']:
+            raise HTTPException(status_code=422, detail='subtitle_source must be mp3, subtitle or both.')
+        try:
+            return get_manager().submit(request.video_id, request.subtitle_source, request.force)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+    @app.get('/metrics', response_class=PlainTextResponse)
+    def get_metrics():
+        return metrics.to_prometheus()
+
+    @app.get('/jobs')
+    def list_jobs():
+        return get_manager().list()
+
+    @app.get('/jobs/{job_id}')
+    def get_job(job_id: str):
+        job = get_manager().get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail='Job not found.')
+        return job
+
+    @app.get('/jobs/{job_id}/result', response_class=PlainTextResponse)
+    def get_result(job_id: str):
+        job = get_manager().get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail='Job not found.')
+        if job['status'] != 'done':
+            raise HTTPException(status_code=409, detail=f"Job is {job['status']}.")
+        return get_manager().result(job_id)
+
+    return app
@@ -1,38 +1,87 @@
-from core.utils import  OperateDB, MediaDownloader, WhisperRecognizer
-from typing import List
+from core.utils import  db_pool, MediaDownloader, WhisperRecognizer
+from typing import List, Optional
 from core.utils import find_files, clean_subtitles
+from core.content_store import content_hook
+import os
 
 class MediaOperations:
-    def __init__(self, channel_url: str = '', output_dir: str = 'output/', download_mode: str = 'mp3'):
+    def __init__(self, channel_url: str = '', output_dir: str = 'output/', download_mode: str = 'mp3', recognizer = None,
+                 audio_cache = None, download_profile = None, force: bool = False):
         self.channel_url = channel_url
         self.output_dir = output_dir
         self.download_mode = download_mode
+        # 長時間執行的服務可傳入共用的 recognizer，避免每部影片重建 client
+        self.recognizer = recognizer
+        # core.audio_cache.AudioCache，None 時保留所有 mp3
+        self.audio_cache = audio_cache
+        # core.download_profile.DownloadProfile，None 時使用 yt-dlp 預設的單一連線
+        self.download_profile = download_profile
+        # --force subtitle：忽略已下載的字幕、mp3 與已轉錄的文字
+        self.force = force
+        # probe_subtitles 的結果 {video_id: {'manual': [...], 'auto': [...]}}，fetch_media 直接使用
+        self.probe_cache = {}
+
+    @property
+    def db_path(self) -> str:
+        return os.path.join(self.output_dir, 'yt_info.db')
+
+    def get_downloader(self):
+        return MediaDownloader(output_dir=self.output_dir, profile=self.download_profile, force=self.force,
+                               audio_cache=self.audio_cache)
+
+    def get_recognizer(self):
+        return self.recognizer if self.recognizer else WhisperRecognizer()
+
+    def existing_transcription(self, video_id: str) -> Optional[str]:
+        '''
+        已經轉錄過的影片直接讀取 content store 或 transcriptions/{id}.txt，不再呼叫 Whisper；force 時回傳 None。
+        '''
+        if self.force:
+            return None
+        stored = content_hook.load(video_id, 'transcription')
+        if stored:
+            print(f'Transcription already exists in the content store: {video_id}')
+            return stored
+        path = os.path.join(self.output_dir, 'transcriptions', f'{video_id}.txt')
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return None
+        print(f'Transcription already exists: {path}')
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
 
     def download_audio_and_transcribe(self, video_id: str):
-        
-        downloader = MediaDownloader()
+        existing = self.existing_transcription(video_id)
+        if existing is not None:
+            return existing
+        downloader = self.get_downloader()
         downloader.download_audio(video_id=video_id, download_type='mp3')
+        self.cache_audio(video_id)
         #breakpoint()
-        client = WhisperRecognizer()
-        result = client.transcribe_audio(video_id)
+        result = self.transcribe(video_id)
         return result
 
-    def download_single_subtitles(self, video_id:str, download_mode:str = None):
-        downloader = MediaDownloader()
+    def cache_audio(self, video_id: str) -> None:
+        '''
+        登記下載好的 mp3 並 pin 住，直到 transcribe 完成才可被淘汰。
+        '''
+        path = os.path.join(self.output_dir, 'mp3', f'{video_id}.mp3')
+        if self.audio_cache and os.path.exists(path):
+            self.audio_cache.add(video_id, path, pin=True)
+
+    def release_audio(self, video_id: str) -> None:
+        if self.audio_cache:
+            self.audio_cache.unpin(video_id)
+            self.audio_cache.evict()
+
+    def download_single_subtitles(self, video_id:str, download_mode:str = None, available = None):
+        downloader = self.get_downloader()
         state_result = None
         result = None
         if download_mode in ['subtitle', 'both']:
-            state_result = downloader.check_and_download_subtitles(video_id, 0)
+            state_result = downloader.check_and_download_subtitles(video_id, 0, available)
             print('Subtitle mode:', video_id, state_result['state'])
             if state_result['state'] == 'Done':
-                input_path = self.output_dir + '/subtitle' 
-                output_path = self.output_dir + '/adress_subtitle'
-                matched_files = find_files(input_path, [video_id, 'vtt'])
-                clean_subtitles(file_path = matched_files[0],
-                                 output_dir = output_path)
-                db = OperateDB()
-                db.update_value(video_id, 'has_address_subtitles', 'Done')
-                db.close()
+                self.clean_downloaded_subtitle(video_id)
             
             if download_mode == 'both' and state_result['state'] in ['NotFound', 'Error']:
                 result = self.download_audio_and_transcribe(video_id)
@@ -42,10 +91,79 @@ class MediaOperations:
         
         return result if result else None
     
+    def clean_downloaded_subtitle(self, video_id: str) -> None:
+        input_path = self.output_dir + '/subtitle' 
+        output_path = self.output_dir + '/adress_subtitles'
+        matched_files = find_files(input_path, [video_id, 'vtt'])
+        clean_subtitles(file_path = matched_files[0],
+                         output_dir = output_path)
+        db = db_pool.connect(self.db_path)
+        db.update_value(video_id, 'has_address_subtitles', 'Done')
+        db.close()
+
+    def fetch_media(self, video_id: str) -> Optional[str]:
+        '''
+        pipeline 的下載階段，回傳下載到的來源 'subtitle'、'mp3'，都沒有則回傳 None。
+        '''
+        downloader = self.get_downloader()
+        if self.download_mode in ['subtitle', 'both']:
+            # 先用 list_videos 批次 probe 留在記憶體中的結果，沒有才查 DB 或以 --dump-json 查詢並保存
+            probe = self.probe_cache if video_id in self.probe_cache else self.probe_subtitles([video_id])
+            available = MediaDownloader.select_available(probe[video_id]) if video_id in probe else None
+            state_result = downloader.check_and_download_subtitles(video_id, 0, available)
+            print('Subtitle mode:', video_id, state_result['state'])
+            if state_result['state'] == 'Done':
+                return 'subtitle'
+            if self.download_mode == 'subtitle':
+                return None
+        result = downloader.download_audio(video_id=video_id, download_type='mp3')
+        if result.returncode != 0:
+            return None
+        self.cache_audio(video_id)
+        return 'mp3'
+
+    def transcribe(self, video_id: str) -> str:
+        try:
+            existing = self.existing_transcription(video_id)
+            if existing is not None:
+                return existing
+            client = self.get_recognizer()
+            return client.transcribe_audio(video_id, self.output_dir)
+        finally:
+            self.release_audio(video_id)
+
     def download_subtitles(self, video_ids:List):
         if not isinstance(video_ids, list):
             video_ids = [video_ids]
+        probe = self.probe_subtitles(video_ids) if len(video_ids) > 1 else {}
         for video_id in video_ids:
-            self.download_single_subtitles(video_id, self.download_mode)
+            if video_id in probe:
+                self.download_single_subtitles(video_id, self.download_mode,
+                                               available=MediaDownloader.select_available(probe[video_id]))
+            else:
+                self.download_single_subtitles(video_id, self.download_mode)
+
+    def probe_subtitles(self, video_ids: List[str]):
+        '''
+        批次查詢字幕語言並存入 DB，DB 已有紀錄的影片不再查詢，mp3 模式不需要字幕資訊。
+        結果同時保存在 self.probe_cache，之後的 fetch_media 不必再讀 DB。
+        '''
+        if self.download_mode not in ['subtitle', 'both']:
+            return {}
+        db = db_pool.connect(self.db_path)
+        try:
+            probe = db.get_subtitle_langs(video_ids)
+            downloader = self.get_downloader()
+            # 已下載字幕的影片不需要查詢
+            missing_ids = [video_id for video_id in video_ids
+                           if video_id not in probe and not downloader.find_downloaded(video_id, 'subtitle')]
+            if missing_ids:
+                new_probe = downloader.probe_subtitles(missing_ids)
+                db.save_subtitle_langs(new_probe)
+                probe.update(new_probe)
+        finally:
+            db.close()
+        self.probe_cache.update(probe)
+        return probe
 
 
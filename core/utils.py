@@ -1,10 +1,17 @@
 import sqlite3
 import json
 import subprocess
-from typing import List, Dict, Any, Set, Tuple
-from datetime import datetime
-from openai import OpenAI
-import re, os
+from typing import List, Dict, Any, Set, Tuple, Optional
+from core.metrics import metrics
+from core.logger import get_logger
+from core.profiling import profiler
+from core.cues import parse_vtt_lines
+from core.download_profile import DownloadProfile, get_profile, host_limiter
+from core.content_store import content_hook
+import re, os, glob
+import threading
+import time
+from abc import ABC, abstractmethod
 
 
 def fetch_youtube_playlist(url: str, mode = 'playlist') -> List[Dict[str, Any]]:
@@ -41,16 +48,54 @@ def fetch_youtube_playlist(url: str, mode = 'playlist') -> List[Dict[str, Any]]:
             url
         ] 
     
-    result = subprocess.run(command, stdout=subprocess.PIPE, text=True)
-    videos_info = []
-    if result.stdout:
-        for line in result.stdout.strip().split('\n'):
+    with metrics.span('fetch_youtube_playlist') as span, profiler.stage('fetch'):
+        result = subprocess.run(command, stdout=subprocess.PIPE, text=True)
+        videos_info = []
+        if result.stdout:
+            for line in result.stdout.strip().split('\n'):
+                try:
+                    video_data = json.loads(line)
+                    videos_info.append(video_data)
+                except json.JSONDecodeError:
+                    print("Error decoding JSON from line:", line)
+        if not videos_info:
+            span.outcome = 'NotFound'
+    metrics.inc('videos_listed_total', len(videos_info))
+    return videos_info
+
+def iter_youtube_playlist(url: str):
+    '''
+    與 fetch_youtube_playlist(url, 'playlist') 相同，但邊讀 yt-dlp 輸出邊 yield，
+    讓後續階段不必等整個播放清單列完。
+    '''
+    if 'youtube' not in url:
+        url = 'https://www.youtube.com/' + url
+    command = [
+        'yt-dlp',
+        '-o', '%(title)s.%(ext)s',
+        '--flat-playlist',
+        '--dump-json',
+        url
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    try:
+        for line in process.stdout:
+            if not line.strip():
+                continue
             try:
                 video_data = json.loads(line)
-                videos_info.append(video_data)
+                metrics.inc('videos_listed_total')
+                yield video_data
             except json.JSONDecodeError:
                 print("Error decoding JSON from line:", line)
-    return videos_info
+    finally:
+        process.stdout.close()
+        process.wait()
+
+# probe_subtitles 的結果，NULL 代表尚未查詢；subtitle_probed 為查詢時間
+SUBTITLE_LANG_COLUMNS = {'subtitle_langs': 'TEXT', 'auto_caption_langs': 'TEXT', 'subtitle_probed': 'REAL'}
+# 沒有字幕的結果在這段時間 (秒) 後重新查詢，之後可能會補上字幕或自動字幕
+EMPTY_PROBE_TTL = 7 * 24 * 3600
 
 class OperateDB:
     def __init__(self, db_path:str = 'output/yt_info.db'): 
@@ -70,9 +115,14 @@ class OperateDB:
         return existing_ids
     
     def save_new_yt_info(self, videos_info, mode):
-        c = self.cursor
+        with metrics.span('db_write'):
+            self._save_new_yt_info(videos_info, mode)
 
-        c.execute('''
+    def create_table(self) -> None:
+        '''
+        建立 videos table (已存在時不變動)，save_new_yt_info 之前就寫入的欄位 (例如字幕語言) 也會用到。
+        '''
+        self.cursor.execute('''
         CREATE TABLE IF NOT EXISTS videos (
             id TEXT PRIMARY KEY,
             title TEXT,
@@ -96,6 +146,11 @@ class OperateDB:
             has_uploaded_article TEXT DEFAULT 'No'
         );
         ''')
+
+    def _save_new_yt_info(self, videos_info, mode):
+        c = self.cursor
+
+        self.create_table()
         if mode == 'playlist':
             for video in videos_info:
                 c.execute('''
@@ -177,7 +232,90 @@ class OperateDB:
         waiting_download_ids = {row[0] for row in self.cursor.fetchall()}
         return waiting_download_ids
     
+    def update_values(self, ids: List[str], col_name: str, value: str) -> None:
+        '''
+        在同一個 transaction 中更新多個 video_id 的同一欄位。
+        '''
+        with metrics.span('db_write'):
+            sql = f"UPDATE videos SET {col_name} = ? WHERE id = ?"
+            self.cursor.executemany(sql, [(value, id) for id in ids])
+            self.conn.commit()
+            print(f'Column "{col_name}" updated to "{value}" for {len(ids)} videos.')
+
+    def get_subtitle_langs(self, video_ids: List[str], empty_ttl: float = EMPTY_PROBE_TTL) -> Dict[str, Dict[str, List[str]]]:
+        '''
+        讀取之前 probe 過的字幕語言，尚未 probe 的影片 (欄位為 NULL) 不會出現在結果中。
+        沒有任何字幕的結果超過 empty_ttl 秒 (或沒有查詢時間) 也視為尚未 probe，讓呼叫端重新查詢。
+        '''
+        self.ensure_columns(SUBTITLE_LANG_COLUMNS)
+        values = self.get_values(video_ids, list(SUBTITLE_LANG_COLUMNS))
+        now = time.time()
+        langs = {}
+        for video_id, value in values.items():
+            if value['subtitle_langs'] is None:
+                continue
+            result = {'manual': [lang for lang in value['subtitle_langs'].split(',') if lang],
+                      'auto': [lang for lang in value['auto_caption_langs'].split(',') if lang]}
+            if not (result['manual'] or result['auto']):
+                if value['subtitle_probed'] is None or now - value['subtitle_probed'] > empty_ttl:
+                    continue
+            langs[video_id] = result
+        return langs
+
+    def save_subtitle_langs(self, probe: Dict[str, Dict[str, List[str]]]) -> None:
+        '''
+        保存 probe_subtitles 的結果到 subtitle_langs / auto_caption_langs 欄位 (以逗號分隔)，並記錄查詢時間。
+        DB 還沒有 videos table 或沒有該影片的資料時 (例如 --video_id) 會建立 table 並新增一筆。
+        '''
+        now = time.time()
+        with metrics.span('db_write'):
+            self.create_table()
+            self.ensure_columns(SUBTITLE_LANG_COLUMNS)
+            self.cursor.executemany('''
+            INSERT INTO videos (id, subtitle_langs, auto_caption_langs, subtitle_probed) VALUES (?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET subtitle_langs = excluded.subtitle_langs,
+                auto_caption_langs = excluded.auto_caption_langs, subtitle_probed = excluded.subtitle_probed
+            ''', [(video_id, ','.join(langs['manual']), ','.join(langs['auto']), now) for video_id, langs in probe.items()])
+            self.conn.commit()
+
+    def ensure_columns(self, columns: Dict[str, str]) -> None:
+        '''
+        舊的 DB 沒有新欄位時自動新增，columns 為 {欄位名稱: 型別與預設值}。
+        '''
+        self.cursor.execute("PRAGMA table_info(videos)")
+        existing = {row[1] for row in self.cursor.fetchall()}
+        if not existing:
+            return
+        for name, definition in columns.items():
+            if name not in existing:
+                self.cursor.execute(f"ALTER TABLE videos ADD COLUMN {name} {definition}")
+        self.conn.commit()
+
+    def get_values(self, video_ids: List[str], columns: List[str]) -> Dict[str, Dict[str, Any]]:
+        '''
+        一次查詢多個 video_id 的欄位值，不存在的 video_id 不會出現在結果中。
+
+        Example:
+            states = db.get_values(['g0RWoZnOANM'], ['has_address_subtitles'])
+            # {'g0RWoZnOANM': {'has_address_subtitles': 'Done'}}
+        '''
+        if not video_ids:
+            return {}
+        placeholders = ", ".join("?" for _ in video_ids)
+        sql_query = f"SELECT id, {', '.join(columns)} FROM videos WHERE id IN ({placeholders})"
+        try:
+            self.cursor.execute(sql_query, tuple(video_ids))
+        except sqlite3.OperationalError as e:
+            if 'no such table' in str(e):
+                return {}
+            raise
+        return {row[0]: dict(zip(columns, row[1:])) for row in self.cursor.fetchall()}
+
     def update_value(self, id: str, col_name: str, value: str) -> None:
+        with metrics.span('db_write'):
+            self._update_value(id, col_name, value)
+
+    def _update_value(self, id: str, col_name: str, value: str) -> None:
         try:
             # Prepare the SQL statement
             sql = f"UPDATE videos SET {col_name} = ? WHERE id = ?"
@@ -195,6 +333,47 @@ class OperateDB:
         self.cursor.close()
         self.conn.close()                     
 
+
+class PooledDB(OperateDB):
+    '''
+    DBPool 保留的連線，close() 不會真的關閉，留給同一個 thread 下次使用。
+    '''
+    def close(self):
+        pass
+
+
+class DBPool:
+    '''
+    常駐服務 (core.service) 啟用後，每個 thread 依 db_path 保留一個已連線的 OperateDB，
+    更新狀態時不必每次重新連線；未啟用時 connect() 每次建立新的連線。
+
+    Example:
+        db = db_pool.connect('output/yt_info.db')
+        db.update_value('g0RWoZnOANM', 'has_subtitles', 'Done')
+        db.close()
+    '''
+    def __init__(self) -> None:
+        self.enabled = False
+        self.local = threading.local()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        # 各 thread 的連線隨 thread 結束被回收
+        self.enabled = False
+        self.local = threading.local()
+
+    def connect(self, db_path: str = 'output/yt_info.db') -> OperateDB:
+        if not self.enabled:
+            return OperateDB(db_path)
+        connections = self.local.__dict__.setdefault('connections', {})
+        if db_path not in connections:
+            connections[db_path] = PooledDB(db_path)
+        return connections[db_path]
+
+
+db_pool = DBPool()
 def classify_videos(new_videos: List[Dict[str, Any]], existing_ids: Set[str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
     new_data = []
     existing_data = []
@@ -205,20 +384,54 @@ def classify_videos(new_videos: List[Dict[str, Any]], existing_ids: Set[str]) ->
             new_data.append(video)
     return new_data, existing_data
 
+def is_complete_download(path: str, download_type: str) -> bool:
+    '''
+    檔案存在、非空且檔頭正確才算下載完成。
+    MediaDownloader 先下載到 {output_dir}/.part/，yt-dlp 成功結束後才 rename 到正式位置，
+    所以正式位置不會有中斷留下的殘檔；檔頭檢查用來排除其他來源的錯誤檔案，
+    mp3 需以 ID3 標籤或 MPEG frame sync 開頭，字幕需以 WEBVTT 開頭。
+    '''
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(8)
+    except OSError:
+        return False
+    if download_type == 'mp3':
+        return header[:3] == b'ID3' or (len(header) >= 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0)
+    return header.lstrip(b'\xef\xbb\xbf').startswith(b'WEBVTT')
+
 class MediaDownloader:
-    def __init__(self, output_dir:str = 'output/', priority_langs:List[str] = ['en', 'zh-TW', 'zh', 'es']) -> None:
+    def __init__(self, output_dir:str = 'output/', priority_langs:List[str] = ['en', 'zh-TW', 'zh', 'es'],
+                 profile: Optional[DownloadProfile] = None, force: bool = False, audio_cache = None) -> None:
         self.output_dir = output_dir
         self.priority_langs = priority_langs
+        # 下載設定，見 core.download_profile.PROFILES
+        self.profile = profile or get_profile('default')
+        # --force subtitle 時忽略已下載的檔案，重新下載並覆寫
+        self.force = force
+        # core.audio_cache.AudioCache，刪除 mp3 時一併移除紀錄
+        self.audio_cache = audio_cache
 
-        now_time = '{:%y%m%d_%H%M%S%}'.format(datetime.now())
-        self.log_path = f'{self.output_dir}/subtitles/{now_time}_yt_dlp_logs.txt'
+        self.logger = get_logger(f'{self.output_dir}/logs')
 
-    def check_and_download_subtitles(self, video_id:str, mode:int) -> None:
-        db = OperateDB()  
+    def check_and_download_subtitles(self, video_id:str, mode:int, available: Tuple = None) -> None:
+        '''
+        available 為 probe_subtitles 已查到的 (languages, subtitle_type)，有值時不再逐一執行 --list-subs。
+        '''
+        db = db_pool.connect(os.path.join(self.output_dir, 'yt_info.db'))
         try:
+            # 已有完整的字幕檔就不再連網查詢與下載
+            existing = self.find_downloaded(video_id, 'subtitle')
+            if existing:
+                print(video_id, 'Subtitles already downloaded:', existing)
+                db.update_value(video_id, 'has_subtitles', 'Done')
+                return {'state': 'Done'}
             #for video_id in video_ids:
             # check subtilte
-            manual_subs, subtitle_type = self.check_subtitle_available(video_id, mode)
+            if available is None:
+                manual_subs, subtitle_type = self.check_subtitle_available(video_id, mode)
+            else:
+                manual_subs, subtitle_type = available
             print(video_id, manual_subs, subtitle_type)
             # select_subtitle_lang
             download_lang = None
@@ -229,17 +442,17 @@ class MediaDownloader:
             if download_lang:
                 download_result = self.download_audio(download_lang = download_lang, video_id = video_id, subtitle_type = subtitle_type)
                 if download_result.returncode == 0:
-                    self.write_log(video_id, f"{download_lang} subtitles downloaded successfully.\n")
+                    self.write_log(video_id, f"{download_lang} subtitles downloaded successfully.", event='download_subtitle', state='Done')
                     db.update_value(video_id, 'has_subtitles', 'Done')
                     return {'state': 'Done'}
                 else:
-                    self.write_log(video_id, "An error occurred while downloading subtitles.\n")
+                    self.write_log(video_id, "An error occurred while downloading subtitles.", event='download_subtitle', state='Error')
                     db.update_value(video_id, 'has_subtitles', 'Error')
                     return {'state': 'Error'}
 
                 db.update_value(video_id, 'type_subtitle', subtitle_type)
             else:
-                self.write_log(video_id, "No suitable subtitles were found.\n")
+                self.write_log(video_id, "No suitable subtitles were found.", event='download_subtitle', state='NotFound')
                 db.update_value(video_id, 'has_subtitles', 'NotFound')
                 return {'state': 'NotFound'}
         finally:
@@ -258,19 +471,79 @@ class MediaDownloader:
             download_lang = subtitles[0]    
         return download_lang
 
+    def probe_subtitles(self, video_ids: List[str], batch_size: int = 50) -> Dict[str, Dict[str, List[str]]]:
+        '''
+        一次 yt-dlp 呼叫查詢多部影片的字幕與自動字幕語言，取代逐一執行 --list-subs。
+        查詢失敗的影片不會出現在結果中。
+
+        Example:
+            probe = downloader.probe_subtitles(['g0RWoZnOANM', 'cPdVWtRFDqw'])
+            # {'g0RWoZnOANM': {'manual': ['en'], 'auto': ['en', 'zh-TW']}, ...}
+        '''
+        probe = {}
+        for i in range(0, len(video_ids), batch_size):
+            batch = video_ids[i:i + batch_size]
+            command = [
+                'yt-dlp',
+                '--skip-download',
+                '--dump-json',
+                '--ignore-errors',
+                '--no-warnings',
+            ] + [self.profile.video_url(video_id) for video_id in batch]
+            with metrics.span('probe_subtitles') as span, profiler.stage('download'):
+                result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                if result.returncode != 0:
+                    span.outcome = 'Error'
+            for line in result.stdout.splitlines():
+                try:
+                    info = json.loads(line)
+                except json.JSONDecodeError:
+                    print("Error decoding JSON from line:", line)
+                    continue
+                probe[info['id']] = {
+                    'manual': self._vtt_langs(info.get('subtitles')),
+                    'auto': self._vtt_langs(info.get('automatic_captions')),
+                }
+            self.write_log(None, f"Probed subtitles for {len(batch)} videos", event='probe_subtitles',
+                           returncode=result.returncode, stderr=result.stderr)
+        return probe
+
+    @staticmethod
+    def _vtt_langs(subtitles: Dict[str, List[Dict[str, Any]]]) -> List[str]:
+        return [lang for lang, formats in (subtitles or {}).items()
+                if any(f.get('ext') == 'vtt' for f in formats)]
+
+    @staticmethod
+    def select_available(probe_result: Dict[str, List[str]]) -> Tuple:
+        '''
+        將 probe_subtitles 的結果轉為 check_subtitle_available 的回傳格式，手動字幕優先。
+        '''
+        if probe_result.get('manual'):
+            return probe_result['manual'], 'manual'
+        if probe_result.get('auto'):
+            return probe_result['auto'], 'auto'
+        return None, None
+
     def check_subtitle_available(self, video_id:str, mode:int):
+        with metrics.span('check_subtitle_available') as span, profiler.stage('download'):
+            subtitles, subtitle_type = self._check_subtitle_available(video_id, mode)
+            if subtitles is None:
+                span.outcome = 'NotFound'
+        return subtitles, subtitle_type
+
+    def _check_subtitle_available(self, video_id:str, mode:int):
         list_command = [
             'yt-dlp',
             '--list-subs',
-            f'https://www.youtube.com/watch?v={video_id}'
+            self.profile.video_url(video_id)
         ]
         list_result = subprocess.run(list_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
         
         # writing log
-        log_message = f"Checking subtitles for video ID {video_id}\nList Subtitles Output:\n{list_result.stdout}\nList Subtitles Errors:\n{list_result.stderr}\n"
-        self.write_log(video_id, log_message)
+        self.write_log(video_id, f"Checking subtitles for video ID {video_id}", event='list_subs',
+                       returncode=list_result.returncode, stdout=list_result.stdout, stderr=list_result.stderr)
         if list_result.returncode != 0:
-            self.write_log(video_id, f"Error listing subtitles for video ID {video_id}\n")
+            self.write_log(video_id, f"Error listing subtitles for video ID {video_id}", event='list_subs')
             return None, None
         
         # check subtitle exits.
@@ -296,7 +569,69 @@ class MediaDownloader:
         else:
             return None, None
 
+    def find_downloaded(self, video_id: str, download_type: str, download_lang: str = '*') -> Optional[str]:
+        '''
+        回傳已完整下載的檔案路徑，沒有則回傳 None。字幕檔名帶有語言，例如 {id}.en.vtt。
+        force 時一律回傳 None，讓呼叫端重新下載。
+        '''
+        if self.force:
+            return None
+        if download_type == 'mp3':
+            paths = [os.path.join(self.output_dir, 'mp3', f'{video_id}.mp3')]
+        else:
+            paths = sorted(glob.glob(os.path.join(self.output_dir, download_type, f'{video_id}.{download_lang}.vtt')))
+        for path in paths:
+            if is_complete_download(path, download_type):
+                return path
+        return None
+
+    def part_dir(self, download_type: str) -> str:
+        '''
+        下載中的暫存資料夾，不在 mp3/、subtitle/ 底下，find_files 與 clean_subtitles_batch 不會讀到殘檔。
+        '''
+        return os.path.join(self.output_dir, '.part', download_type)
+
+    def part_files(self, video_id: str, download_type: str) -> List[str]:
+        return glob.glob(os.path.join(self.part_dir(download_type), f'{glob.escape(video_id)}.*'))
+
+    def forget_download(self, video_id: str, download_type: str) -> None:
+        '''
+        刪除上次中斷留下的暫存檔，以及正式位置上不完整的 mp3，讓 yt-dlp 重新下載。
+        '''
+        for path in self.part_files(video_id, download_type):
+            os.remove(path)
+        if download_type == 'mp3':
+            path = os.path.join(self.output_dir, 'mp3', f'{video_id}.mp3')
+            # 完整的舊檔保留 (例如 force 重新下載時)，下載成功後才被覆寫
+            if os.path.exists(path) and not is_complete_download(path, 'mp3'):
+                os.remove(path)
+                if self.audio_cache:
+                    self.audio_cache.remove(video_id)
+
+    def commit_download(self, video_id: str, download_type: str) -> None:
+        '''
+        yt-dlp 成功結束後，把暫存資料夾中的檔案以 os.replace (同一個檔案系統內為 atomic) 移到正式位置，
+        yt-dlp 自己的 .part/.ytdl 殘檔直接刪除。
+        '''
+        target_dir = os.path.join(self.output_dir, download_type)
+        os.makedirs(target_dir, exist_ok=True)
+        for path in self.part_files(video_id, download_type):
+            if path.endswith(('.part', '.ytdl')):
+                os.remove(path)
+            else:
+                os.replace(path, os.path.join(target_dir, os.path.basename(path)))
+
     def download_audio(self, video_id:str, download_type:str = 'subtitle', download_lang:str = 'en', subtitle_type:int = 'manual'):
+        stage = 'download_audio' if download_type == 'mp3' else 'download_subtitle'
+        existing = self.find_downloaded(video_id, download_type, download_lang)
+        if existing:
+            metrics.inc('skipped_total', stage=stage)
+            print('Audio    mode:', video_id, f'{existing} already exists')
+            self.write_log(video_id, f"Skip {download_type}, {existing} already exists", event=stage, returncode=0, skipped=True)
+            return subprocess.CompletedProcess(args=[], returncode=0, stdout='', stderr='')
+        self.forget_download(video_id, download_type)
+        # 先寫到暫存資料夾，成功後才移到正式位置
+        output_template = os.path.join(self.part_dir(download_type), '%(id)s.%(ext)s')
         if download_type == 'subtitle':
             sub_command = '--write-sub' if subtitle_type == 'manual' else '--write-auto-sub'
             download_command = [
@@ -304,8 +639,8 @@ class MediaDownloader:
                 sub_command,  # 使用手动或自动字幕下载指令
                 '--sub-langs', download_lang,  # 指定下载语言
                 '--skip-download',  # 只下载字幕，不下载视频
-                '-o', f'{self.output_dir}/{download_type}/%(id)s.%(ext)s',
-                f'https://www.youtube.com/watch?v={video_id}'
+                '-o', output_template,
+                self.profile.video_url(video_id)
             ]
         if download_type == 'mp3':
             # breakpoint()
@@ -313,55 +648,155 @@ class MediaDownloader:
                 'yt-dlp',
                 '-x',  # Extract audio only
                 '--audio-format', 'mp3',  # Specify audio format as mp3
-                '-o', f'{self.output_dir}/{download_type}/%(id)s.%(ext)s',
-                f'https://www.youtube.com/watch?v={video_id}'
+                *self.profile.args(),  # 並行 fragment 或外部下載器
+                '-o', output_template,
+                self.profile.video_url(video_id)
             ]
-        download_result = subprocess.run(download_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        # 字幕只有一個小檔案，音訊依 profile 佔用多條連線
+        connections = self.profile.connections if download_type == 'mp3' else 1
+        before = self.file_states(video_id, download_type)
+        with host_limiter.acquire(self.profile.host, connections), \
+                metrics.span(stage) as span, profiler.stage('download'):
+            download_result = subprocess.run(download_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            if download_result.returncode != 0:
+                span.outcome = 'Error'
+        if download_result.returncode == 0:
+            self.commit_download(video_id, download_type)
+        else:
+            self.forget_download(video_id, download_type)
+        metrics.inc('retries_total', str(download_result.stderr or '').count('Retrying'), stage=stage)
+        # 只計算這次新增或改變的檔案，其他語言的字幕等既有檔案不算
+        for path, state in self.file_states(video_id, download_type).items():
+            if before.get(path) != state:
+                metrics.inc('bytes_total', state[1], stage=stage)
         _info = download_result.stderr if download_result.stderr else 'Downloading'
         print('Audio    mode:', video_id, _info)
-        self.write_log(video_id, f"Download {type} Output:\n{download_result.stdout}\nDownload {type} Errors:\n{download_result.stderr}")
+        self.write_log(video_id, f"Download {download_type}", event=stage, returncode=download_result.returncode,
+                       profile=self.profile.name, stdout=download_result.stdout, stderr=download_result.stderr)
         return download_result
 
-    def write_log(self, video_id:str, message:str) -> None:
-        output_path = f'output/subtitles/{video_id}_logs.txt'
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, 'a') as log_file:
-            log_file.write(message)
+    def file_states(self, video_id: str, download_type: str) -> Dict[str, Tuple[float, int]]:
+        '''
+        回傳 {路徑: (mtime, size)}，用來比對下載前後哪些檔案被新增或改寫。
+        '''
+        states = {}
+        for path in glob.glob(f'{self.output_dir}/{download_type}/{glob.escape(video_id)}.*'):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            states[path] = (stat.st_mtime, stat.st_size)
+        return states
 
+    def write_log(self, video_id:str, message:str, **fields) -> None:
+        '''
+        寫入 {output_dir}/logs/yt_dlp.jsonl，由背景 thread 批次寫入，可用 self.logger.query(video_id) 查詢。
+        '''
+        self.logger.log(video_id, message, **fields)
 
-class WhisperRecognizer:
-    def __init__(self) -> None:
-        self.client = OpenAI()
-           
-    def transcribe_audio(self, video_id: str) -> str:
-        audio_file = f"output/mp3/{video_id}.mp3"
+
+class Recognizer(ABC):
+    '''
+    轉錄 {output_dir}/mp3/{id}.mp3 的共同流程，結果寫入 {output_dir}/transcriptions/{id}.txt
+    並更新 {output_dir}/yt_info.db，output_dir 預設為 output/。
+    子類別只需要實作 recognize(audio_path) 回傳文字，例如 WhisperRecognizer (OpenAI API)
+    與 core.local_recognizer.LocalWhisperRecognizer (本機 CPU)。
+
+    設定 trimmer (core.audio_trim.SilenceTrimmer) 時，轉錄前先移除靜音，
+    時間對照表存為 {output_dir}/transcriptions/{id}.offsets.json。
+    '''
+    trimmer = None
+
+    def transcribe_audio(self, video_id: str, output_dir: str = 'output/') -> str:
+        audio_file = os.path.join(output_dir, 'mp3', f'{video_id}.mp3')
         if not os.path.exists(audio_file):
             raise FileNotFoundError(f"The file {audio_file} does not exist.")
-        audio_file= open(f"output/mp3/{video_id}.mp3", "rb")
-        transcription = self.client.audio.transcriptions.create(
-            model="whisper-1", 
-            file=audio_file
-        )
-        self.save_transcription(video_id, transcription.text)
+        source, offsets = audio_file, None
+        if self.trimmer is not None:
+            source, offsets = self.trimmer.trim(audio_file)
+        try:
+            with metrics.span('transcribe_audio'), profiler.stage('transcribe'):
+                text = self.recognize(source)
+            try:
+                metrics.inc('bytes_total', os.path.getsize(source), stage='transcribe_audio')
+            except OSError:
+                pass
+        finally:
+            if source != audio_file:
+                os.remove(source)
+        self.save_offsets(video_id, offsets, output_dir)
+        self.save_transcription(video_id, text, output_dir)
         
-        return transcription.text
+        return text
+
+    @abstractmethod
+    def recognize(self, audio_path: str) -> str:
+        ...
 
-    def save_transcription(self, video_id: str, text: str) -> None:
-        output_path = f"output/transcriptions/{video_id}.txt"
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(text)
+    def save_offsets(self, video_id: str, offsets, output_dir: str = 'output/') -> None:
+        '''
+        轉錄成功後才寫入時間對照表；這次沒有裁切時刪除上次留下的 offsets.json，避免和新的逐字稿對不上。
+        '''
+        offsets_path = os.path.join(output_dir, 'transcriptions', f'{video_id}.offsets.json')
+        if offsets is not None:
+            offsets.save(offsets_path)
+            return
+        try:
+            os.remove(offsets_path)
+        except FileNotFoundError:
+            pass
+
+    def save_transcription(self, video_id: str, text: str, output_dir: str = 'output/') -> None:
+        output_path = os.path.join(output_dir, 'transcriptions', f'{video_id}.txt')
+        # --content_store 時只存進 DB，不寫出 .txt
+        content_hook.save(video_id, 'transcription', text, output_path)
         print(f"Transcription saved to {output_path}")
-        db = OperateDB()
+        db = db_pool.connect(os.path.join(output_dir, 'yt_info.db'))
         db.update_value(video_id, 'has_address_subtitles', 'Done')
         db.close()
         print("The variable has_address_subtitles has been updated in the database.")
 
 
+class WhisperRecognizer(Recognizer):
+    def __init__(self, client = None) -> None:
+        if client is None:
+            # 延遲載入 openai，不需要轉錄的模式不必付出 import 成本
+            from openai import OpenAI
+            client = OpenAI()
+        self.client = client
+
+    def recognize(self, audio_path: str) -> str:
+        with open(audio_path, "rb") as audio_file:
+            transcription = self.client.audio.transcriptions.create(
+                model="whisper-1", 
+                file=audio_file
+            )
+        return transcription.text
+
+
+def create_recognizer(asr: str = 'api', **kwargs) -> Recognizer:
+    '''
+    asr='api' 使用 OpenAI Whisper API，asr='local' 使用本機的 faster-whisper，kwargs 傳給 LocalWhisperRecognizer。
+    '''
+    if asr == 'local':
+        from core.local_recognizer import LocalWhisperRecognizer
+        return LocalWhisperRecognizer(**kwargs)
+    if asr == 'api':
+        return WhisperRecognizer()
+    raise ValueError(f'Unknown asr backend "{asr}", expected "api" or "local".')
+
+
         
 
 
-def clean_subtitles(file_path:str, output_dir:str = 'output/adress_subtitles') -> None:
+def clean_subtitles(file_path:str, output_dir:str = 'output/adress_subtitles', persist: bool = True) -> Tuple[str, str]:
+    '''
+    回傳 (清洗後的檔名, 清洗後的文字)。persist=False 時不保存文字 (檔案或 content store)，由呼叫端以 content_hook.save 保存。
+    '''
+    with metrics.span('clean_subtitles'), profiler.stage('clean'):
+        return _clean_subtitles(file_path, output_dir, persist)
+
+def _clean_subtitles(file_path:str, output_dir:str = 'output/adress_subtitles', persist: bool = True) -> Tuple[str, str]:
     # 用于匹配时间线和WEBVTT的标头
     time_stamp_regex = re.compile(r"\d{2}:\d{2}:\d{2}\.\d{3} --> \d{2}:\d{2}:\d{2}\.\d{3}.*")
     tag_regex = re.compile(r"<\d{2}:\d{2}:\d{2}\.\d{3}><c>.*?</c>")
@@ -369,6 +804,7 @@ def clean_subtitles(file_path:str, output_dir:str = 'output/adress_subtitles') -
     # 读取字幕文件
     with open(file_path, 'r', encoding='utf-8') as file:
         lines = file.readlines()
+    metrics.inc('bytes_total', sum(len(line.encode('utf-8')) for line in lines), stage='clean_subtitles')
 
     # 清洗数据
     cleaned_lines = []
@@ -389,11 +825,64 @@ def clean_subtitles(file_path:str, output_dir:str = 'output/adress_subtitles') -
     filename = os.path.join(output_dir, new_filename)
 
     ensure_directory_exists(filename)
-    with open(filename, 'w', encoding='utf-8') as output_file:
-        output_file.write(cleaned_text)
+    # 保留時間軸的 cue 檔，後續階段不需要再解析 VTT
+    parse_vtt_lines(lines).save(filename.rsplit('.', 1)[0] + '.cues')
+    if persist:
+        # {id}.{lang}.txt -> id
+        content_hook.save(new_filename.split('.')[0], 'subtitle', cleaned_text, filename)
 
     print("字幕已清洗完毕并保存到, ", filename)
+    return new_filename, cleaned_text
+
 
+def _clean_subtitle_chunk(tasks: List[Tuple[str, str]]) -> List[Tuple[str, str, str]]:
+    '''
+    在子 process 中執行，回傳 [(file_path, 清洗後的檔名, 文字), ...]；DB 只由主 process 寫入。
+    '''
+    cleaned = []
+    for file_path, output_dir in tasks:
+        try:
+            cleaned.append((file_path, *clean_subtitles(file_path, output_dir, persist=False)))
+        except Exception as e:
+            print(f"Failed to clean {file_path}: {e}")
+    return cleaned
+
+def clean_subtitles_batch(input_dir: str = 'output/subtitle', output_dir: str = 'output/adress_subtitles',
+                          workers: int = None, chunk_size: int = 50, force: bool = False) -> List[str]:
+    '''
+    以 process pool 批次清洗 input_dir 下所有 .vtt，輸出 (檔案或 content store 中的內容) 比輸入新的會跳過
+    (force=True 則全部重做)。回傳成功清洗的 video_id。
+
+    Example:
+        video_ids = clean_subtitles_batch('output/subtitle', 'output/adress_subtitles', workers=8)
+    '''
+    tasks = []
+    for file_path in find_files(input_dir, ['.vtt']):
+        new_filename = os.path.basename(file_path).rsplit('.', 1)[0] + '.txt'
+        output_path = os.path.join(output_dir, new_filename)
+        if not force:
+            stored = content_hook.stat(new_filename.split('.')[0], 'subtitle')
+            if stored is not None:
+                updated = stored[1]
+            else:
+                updated = os.path.getmtime(output_path) if os.path.exists(output_path) else None
+            if updated is not None and updated >= os.path.getmtime(file_path):
+                continue
+        tasks.append((file_path, output_dir))
+    if not tasks:
+        return []
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+    cleaned = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(_clean_subtitle_chunk, chunks):
+            # 多個子 process 同時寫入 sqlite 會 "database is locked"，改由主 process 依序寫入
+            for file_path, new_filename, cleaned_text in result:
+                content_hook.save(new_filename.split('.')[0], 'subtitle', cleaned_text, os.path.join(output_dir, new_filename))
+                cleaned.append(file_path)
+    # {id}.{lang}.vtt -> id
+    return sorted({os.path.basename(file_path).split('.')[0] for file_path in cleaned})
 
 def find_files(directory: str, search_texts: List[str]) -> List[str]:
     # Check if the directory exists
@@ -1,42 +1,142 @@
 import argparse
-from core.utils import fetch_youtube_playlist, classify_videos, clean_subtitles, find_files
+from core.utils import fetch_youtube_playlist, iter_youtube_playlist, classify_videos, clean_subtitles, clean_subtitles_batch
 from core.utils import  OperateDB
-from openai import OpenAI
-from CopyCraftAPI.utils import GetAPIMessage
 from core.subtitle_downloader import MediaOperations
+from core.checkpoint import StageCheckpoint
+from core.pipeline import Pipeline, Stage
+from core.metrics import metrics
+from core.profiling import profiler
+from core.scheduler import DEFAULT_WEIGHTS
+from core.download_profile import PROFILES, get_profile, host_limiter
+from core.content_store import ContentStore, content_hook
 import os
+# 生成文章相關的模組 (openai、CopyCraftAPI) 只在需要的模式中才載入，
+# 讓 fetch_video_id 等模式啟動更快，test/test_import_time.py 會檢查 import main 時沒有載入這些模組。
+
+def get_db_path(args):
+    # 所有 DB (影片資訊、audio cache、content store、全文索引) 都放在 --output_path 下
+    os.makedirs(args.output_path, exist_ok=True)
+    return os.path.join(args.output_path, 'yt_info.db')
+
+def get_force_stages(args):
+    # --force 不帶參數時代表所有 stage 都重跑
+    if args.force is None:
+        return []
+    return args.force if args.force else ['subtitle', 'article']
+
+def open_completion_cache(args):
+    if args.no_cache:
+        return None
+    from core.completion_cache import CompletionCache
+    os.makedirs(args.output_path, exist_ok=True)
+    return CompletionCache(os.path.join(args.output_path, 'completion_cache.db'),
+                           max_bytes=args.cache_max_mb * 1024 * 1024)
+
+def create_asr(args):
+    '''
+    --asr local 時建立共用的本機 recognizer，模型只載入一次；api 時回傳 None，由 MediaOperations 建立 WhisperRecognizer。
+    --trim_silence 時 recognizer 會先移除靜音再轉錄。
+    '''
+    if args.asr == 'api' and not args.trim_silence:
+        return None
+    from core.utils import create_recognizer
+    if args.asr == 'api':
+        recognizer = create_recognizer('api')
+    else:
+        workers = parse_stage_workers(args.stage_workers)['transcribe']
+        recognizer = create_recognizer(args.asr, model_size=args.asr_model, cpu_threads=args.cpu_threads,
+                                       num_workers=workers, batch_size=args.asr_batch_size)
+    if args.trim_silence:
+        from core.audio_trim import SilenceTrimmer
+        recognizer.trimmer = SilenceTrimmer(noise_db=args.silence_db, min_silence=args.min_silence)
+    return recognizer
+
+def get_download_profile(args):
+    host_limiter.max_connections = args.max_host_connections
+    return get_profile(args.download_profile, base_url=args.download_base_url)
+
+def open_audio_cache(args):
+    if not args.audio_cache_mb:
+        return None
+    from core.audio_cache import AudioCache
+    return AudioCache(get_db_path(args), max_bytes=args.audio_cache_mb * 1024 * 1024,
+                      audio_dir=os.path.join(args.output_path, 'mp3'))
+
+def open_dedup(args):
+    if not args.dedup:
+        return None
+    from core.dedup import DedupIndex
+    return DedupIndex(get_db_path(args), threshold=args.dedup_threshold)
 
 def step_generate_article(args):
-    input_path_sub = args.output_path + '/adress_subtitles'
-    input_path_tra = args.output_path + '/transcriptions'
-    response_content_list = {}
-    for id in args.video_id:
+    from core.article_generator import ArticleGenerator
+    checkpoint = StageCheckpoint(output_dir=args.output_path, force=get_force_stages(args))
+    video_ids = checkpoint.pending(args.video_id, 'article')
+    if not video_ids:
+        return {}
+
+    cache = open_completion_cache(args)
+    dedup = open_dedup(args)
+    generator = ArticleGenerator(output_dir=args.output_path, model=args.model,
+                                 max_tokens=args.max_tokens, cache=cache, dedup=dedup)
+    article_paths = {}
+    for id in video_ids:
         #breakpoint()
-        use_file = find_files(input_path_tra, id)
-        use_file = use_file if len(use_file) == 1 else  find_files(input_path_sub, id)
-        message = GetAPIMessage(path=use_file[0], article_type='blog', role='Angel investor')
-        message = message.combine_messages()
-        
-        client = OpenAI()
-        response = client.chat.completions.create(model=args.model, messages=message, max_tokens=args.max_tokens)
-        response_content_list[id] = response.choices[0].message.content
-        
-    return response_content_list
+        try:
+            article_paths[id] = generator.generate(id, force='article' in get_force_stages(args))
+        except Exception as e:
+            # 單一影片失敗不影響其他已完成的文章
+            print(f'Failed to generate the article for {id}: {e}')
+            generator.update_state(id, 'Error')
+
+    if cache:
+        cache.close()
+    if dedup:
+        dedup.close()
+    return article_paths
 
 def save_articles(result, output_path, video_ids):
     directory = os.path.join(output_path, 'article/')
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-
     for _id in video_ids:
         output_path = directory + _id + '.txt'
-        with open(output_path, 'w') as file:
-            file.write(f"{_id}: {result[_id]}\n")
-            print(f'Save the article to {output_path}')
+        # --content_store 時只存進 DB
+        content_hook.save(_id, 'article', f"{_id}: {result[_id]}\n", output_path)
+        print(f'Save the article to {output_path}')
+
+def step_generate_article_batch(args, video_ids):
+    from core.article_generator import build_article_message
+    from core.batch_generator import ArticleBatchGenerator
+    if not video_ids:
+        print('No videos waiting for an article.')
+        return {}
+    messages_by_id, missing = {}, {}
+    for _id in video_ids:
+        try:
+            _, messages_by_id[_id] = build_article_message(args.output_path, _id)
+        except FileNotFoundError as e:
+            # 缺少逐字稿的影片不影響同一批的其他影片
+            missing[_id] = str(e)
+
+    results, errors = {}, dict(missing)
+    if messages_by_id:
+        generator = ArticleBatchGenerator(output_dir=args.output_path, model=args.model,
+                                          max_tokens=args.max_tokens, poll_interval=args.batch_poll_interval)
+        results, batch_errors = generator.run(messages_by_id)
+        errors.update(batch_errors)
+        save_articles(results, args.output_path, list(results))
+
+    db = OperateDB(get_db_path(args))
+    for _id in results:
+        db.update_value(_id, 'has_generated_article', 'Done')
+    for _id, error in errors.items():
+        print(f'Failed to generate the article for {_id}: {error}')
+        db.update_value(_id, 'has_generated_article', 'Error')
+    db.close()
+    return results
 
 def handle_fetch_video_id(args, mode):
     videos_info = fetch_youtube_playlist(args.channel_url, mode)
-    db = OperateDB()
+    db = OperateDB(get_db_path(args))
     existing_ids = db.fetch_existing_ids()
     new_videos, existing_videos = classify_videos(videos_info, existing_ids)
     print("New video data:")
@@ -51,16 +151,208 @@ def handle_fetch_video_id(args, mode):
 
 
 def handle_download_subtitle(args, video_ids):
+    checkpoint = StageCheckpoint(output_dir=args.output_path, force=get_force_stages(args))
+    video_ids = checkpoint.pending(video_ids, 'subtitle')
+    if not video_ids:
+        return
+    audio_cache = open_audio_cache(args)
     client = MediaOperations(channel_url=args.channel_url, 
                              output_dir=args.output_path, 
-                             download_mode=args.subtitle_source)
+                             download_mode=args.subtitle_source,
+                             audio_cache=audio_cache,
+                             download_profile=get_download_profile(args),
+                             recognizer=create_asr(args),
+                             force='subtitle' in get_force_stages(args))
     client.download_subtitles(video_ids)
+    if audio_cache:
+        audio_cache.close()
 
 
-def main():
+def parse_priority_weights(values):
+    weights = {}
+    for value in values or []:
+        name, _, weight = value.partition('=')
+        try:
+            weights[name] = float(weight)
+        except ValueError:
+            raise ValueError(f'Invalid --priority_weights value "{value}", expected e.g. recency=1.5.')
+        if name not in DEFAULT_WEIGHTS:
+            raise ValueError(f'Invalid --priority_weights value "{value}", expected one of {", ".join(DEFAULT_WEIGHTS)}.')
+    return weights
+
+def schedule_videos(args, video_ids, subtitle_source=None):
+    '''
+    依優先順序排列待處理的影片，--budget_usd 時只回傳預算內的影片。
+    '''
+    from core.scheduler import VideoScheduler
+    scheduler = VideoScheduler(weights=parse_priority_weights(args.priority_weights),
+                               half_life_days=args.half_life_days,
+                               fair=not args.no_channel_fairness,
+                               budget_usd=args.budget_usd,
+                               model=args.model, max_tokens=args.max_tokens,
+                               subtitle_source=subtitle_source)
+    video_ids, _ = scheduler.schedule(video_ids, get_db_path(args))
+    return video_ids
+
+
+DEFAULT_STAGE_WORKERS = {'fetch': 4, 'transcribe': 2, 'clean': 2, 'generate': 2}
+
+def parse_stage_workers(values):
+    workers = dict(DEFAULT_STAGE_WORKERS)
+    for value in values or []:
+        name, _, count = value.partition('=')
+        if name not in workers or not count.isdigit():
+            raise ValueError(f'Invalid --stage_workers value "{value}", expected e.g. fetch=4.')
+        workers[name] = int(count)
+    return workers
+
+def handle_full_process(args):
+    '''
+    以 pipeline 同時執行 列出影片 -> 下載字幕/音檔 -> 轉錄 -> 清洗字幕 -> 生成文章，
+    每個階段各自有 worker 數量與有上限的 queue。
+    '''
+    from core.article_generator import ArticleGenerator
+    workers = parse_stage_workers(args.stage_workers)
+    checkpoint = StageCheckpoint(output_dir=args.output_path, force=get_force_stages(args))
+    audio_cache = open_audio_cache(args)
+    media = MediaOperations(channel_url=args.channel_url,
+                            output_dir=args.output_path,
+                            download_mode=args.subtitle_source,
+                            audio_cache=audio_cache,
+                            download_profile=get_download_profile(args),
+                            recognizer=create_asr(args),
+                            force='subtitle' in get_force_stages(args))
+    cache = open_completion_cache(args)
+    dedup = open_dedup(args)
+    generator = ArticleGenerator(output_dir=args.output_path, model=args.model,
+                                 max_tokens=args.max_tokens, cache=cache, dedup=dedup)
+    scheduled = args.schedule or args.budget_usd is not None
+
+    def list_videos():
+        if args.download_mode == 'video_id':
+            # 一次查詢所有影片的字幕語言，fetch 階段直接使用留在 media.probe_cache 的結果
+            pending = checkpoint.pending(args.video_id, 'subtitle')
+            if len(pending) > 1:
+                media.probe_subtitles(pending)
+            for _id in args.video_id:
+                yield {'id': _id, 'source': None}
+            return
+        # 在 pipeline 的 thread 中開 DB，sqlite 連線不可跨 thread
+        db = OperateDB(get_db_path(args))
+        existing_ids = db.fetch_existing_ids()
+        listed = []
+        for video in iter_youtube_playlist(args.channel_url):
+            if video['id'] not in existing_ids:
+                db.save_new_yt_info([video], 'playlist')
+            if not scheduled:
+                yield {'id': video['id'], 'source': None}
+            listed.append(video['id'])
+        db.close()
+        # 排程需要整份清單的 metadata，列完後才依優先順序送出尚未完成的影片
+        if scheduled:
+            for _id in schedule_videos(args, checkpoint.pending(listed, 'article'), args.subtitle_source):
+                yield {'id': _id, 'source': None}
+
+    def fetch(item):
+        if not checkpoint.pending([item['id']], 'subtitle'):
+            item['source'] = 'done'
+            return item
+        item['source'] = media.fetch_media(item['id'])
+        return item if item['source'] else None
+
+    def transcribe(item):
+        if item['source'] == 'mp3':
+            media.transcribe(item['id'])
+        return item
+
+    def clean(item):
+        if item['source'] == 'subtitle':
+            media.clean_downloaded_subtitle(item['id'])
+        return item
+
+    def generate(item):
+        if checkpoint.pending([item['id']], 'article'):
+            try:
+                generator.generate(item['id'], force='article' in get_force_stages(args))
+            except Exception:
+                generator.update_state(item['id'], 'Error')
+                raise
+        return item['id']
+
+    pipeline = Pipeline([
+        Stage('fetch', fetch, workers['fetch'], args.queue_size),
+        Stage('transcribe', transcribe, workers['transcribe'], args.queue_size),
+        Stage('clean', clean, workers['clean'], args.queue_size),
+        Stage('generate', generate, workers['generate'], args.queue_size),
+    ])
+    finished = pipeline.run(list_videos())
+    if cache:
+        cache.close()
+    if dedup:
+        dedup.close()
+    if audio_cache:
+        audio_cache.close()
+    print(f'full_process finished: {len(finished)} articles ready, {len(pipeline.errors)} errors.')
+    return finished
+
+def handle_clean_subtitles(args):
+    video_ids = clean_subtitles_batch(input_dir=os.path.join(args.output_path, 'subtitle'),
+                                      output_dir=os.path.join(args.output_path, 'adress_subtitles'),
+                                      workers=args.clean_workers, chunk_size=args.chunk_size,
+                                      force='subtitle' in get_force_stages(args))
+    print(f'Cleaned {len(video_ids)} subtitle files.')
+    if video_ids:
+        db = OperateDB(get_db_path(args))
+        db.update_values(video_ids, 'has_address_subtitles', 'Done')
+        db.close()
+    return video_ids
+
+def handle_contents(args):
+    '''
+    import_contents: 匯入既有的 .txt 並訓練壓縮字典；export_contents: 以舊版檔案結構寫到 --export_dir。
+    '''
+    store = ContentStore(get_db_path(args))
+    if args.mode == 'import_contents':
+        count = store.import_files(args.output_path)
+        # 只有還沒有字典，或內容已成長一倍以上時才重新訓練 (訓練會重新壓縮全部內容)
+        if store.needs_training():
+            store.train_dictionary()
+        stats = store.stats()
+        print(f'Imported {count} files, {stats["size"]} bytes stored as {stats["compressed_size"]} bytes.')
+        if args.search_index:
+            index = content_hook.get_index()
+            print(f'Indexed {index.import_files(args.output_path)} files for --mode search.')
+    if args.mode == 'export_contents':
+        count = store.export(args.export_dir or args.output_path)
+        print(f'Exported {count} files to {args.export_dir or args.output_path}')
+    store.close()
+
+def handle_search(args):
+    if not args.query:
+        raise ValueError('Please input the search words by --query.')
+    from core.search_index import SearchIndex
+    index = SearchIndex(get_db_path(args))
+    results = index.search(' '.join(args.query), limit=args.limit, kind=args.kind, raw=args.raw_query)
+    index.close()
+    for result in results:
+        print(f"{result['video_id']} [{result['kind']}] {result['title'] or ''}")
+        print(f"    {result['snippet']}")
+    print(f'{len(results)} results.')
+    return results
+
+def handle_serve(args):
+    import uvicorn
+    from core.service import JobManager, create_app
+    manager = JobManager(output_dir=args.output_path, workers=args.service_workers, model=args.model,
+                         max_tokens=args.max_tokens, subtitle_source=args.subtitle_source,
+                         use_cache=not args.no_cache, audio_cache_mb=args.audio_cache_mb,
+                         download_profile=get_download_profile(args), recognizer=create_asr(args))
+    uvicorn.run(create_app(manager), host=args.host, port=args.port)
+
+def build_parser():
     parser = argparse.ArgumentParser(description="Data Fetching Operations")
     parser.add_argument("--mode", default='full_process',  
-                    choices=["full_process", "fetch_video_id", 'download_subtitle', 'generate_article', 'test'], 
+                    choices=["full_process", "fetch_video_id", 'download_subtitle', 'generate_article', 'generate_article_batch', 'clean_subtitles', 'import_contents', 'export_contents', 'search', 'serve', 'test'], 
                     help="Select the mode of operation. The mode 'full_process' runs through all three stages: fetch_video_id, download_subtitle, and generate_article. The other three modes execute each stage individually.")
     parser.add_argument("--download_mode", choices=['video_id', 'playlist'], type=str, default='video_id', help = '')
     parser.add_argument("--subtitle_source", choices=['mp3', 'subtitle', 'both'], type=str, default='mp3',
@@ -68,40 +360,119 @@ def main():
     parser.add_argument("--channel_url", type=str, default='https://www.youtube.com/@benhsu501')
     parser.add_argument("--output_path", type=str, default='output/')
     parser.add_argument("--video_id", type=str, nargs='+', help="One or more video IDs", default=None)
+    parser.add_argument("--stage_workers", type=str, nargs='+', default=None,
+        help="Worker count per full_process stage, e.g. --stage_workers fetch=4 transcribe=2 clean=2 generate=2.")
+    parser.add_argument("--queue_size", type=int, default=8, help="Max number of videos waiting in front of each full_process stage.")
+    parser.add_argument("--host", type=str, default='127.0.0.1', help="Host for --mode serve. The service has no authentication, use 0.0.0.0 only behind a proxy that adds it.")
+    parser.add_argument("--port", type=int, default=8000, help="Port for --mode serve.")
+    parser.add_argument("--service_workers", type=int, default=4, help="Number of background job workers for --mode serve.")
+    parser.add_argument("--profile", action='store_true',
+        help="Profile each stage (fetch, download, transcribe, clean, generate) and save pstats and collapsed stacks to output/profiles/.")
+    parser.add_argument("--clean_workers", type=int, default=None, help="Number of processes for --mode clean_subtitles. Default is the CPU count.")
+    parser.add_argument("--chunk_size", type=int, default=50, help="Number of subtitle files sent to a process at a time in --mode clean_subtitles.")
+    parser.add_argument("--force", choices=['subtitle', 'article'], nargs='*', default=None,
+        help="Redo the given stages even if they are already done. Without values, all stages are redone.")
     # chatGPT API para
     parser.add_argument("--model", type=str, default = 'gpt-3.5-turbo', choices=['gpt-3.5-turbo', 'gpt-4o'], help='Set the model for the chatGPT API. Default is gpt-3.5-turbo.')
     parser.add_argument("--max_tokens", type=int, default=2000, help="set the max tokens for the chatGPT API.")
-    args = parser.parse_args()
+    parser.add_argument("--batch_poll_interval", type=int, default=60, help="Seconds between status checks in generate_article_batch mode.")
+    parser.add_argument("--no_cache", action='store_true', help="Bypass the completion cache and always call the chatGPT API.")
+    parser.add_argument("--cache_max_mb", type=int, default=50, help="Size limit of the completion cache in MB. The least recently used entries are evicted first.")
+    parser.add_argument("--audio_cache_mb", type=int, default=0,
+        help="Size limit of output/mp3/ in MB. The least recently used mp3 files are deleted after transcription; files waiting for transcription are kept. 0 (default) keeps every mp3.")
+    parser.add_argument("--download_profile", choices=list(PROFILES), default='default',
+        help="yt-dlp download settings for audio. 'fast': 4 concurrent fragments for DASH/HLS formats and 10 MB range requests (one connection for plain https). 'aria2c': split each file over 4 aria2c connections (aria2c must be installed).")
+    parser.add_argument("--max_host_connections", type=int, default=16,
+        help="Max connections to the same host shared by all download workers.")
+    parser.add_argument("--download_base_url", type=str, default=None,
+        help="Download videos from base_url + video_id instead of YouTube, e.g. a local HTTP server for testing.")
+    parser.add_argument("--asr", choices=['api', 'local'], default='api',
+        help="Speech recognition backend for --subtitle_source mp3/both. 'api': OpenAI Whisper API. 'local': faster-whisper on the CPU (pip install faster-whisper).")
+    parser.add_argument("--asr_model", type=str, default='small', help="faster-whisper model for --asr local, e.g. tiny, base, small, medium, large-v3.")
+    parser.add_argument("--cpu_threads", type=int, default=0, help="Threads per transcription for --asr local. 0 uses the CTranslate2 default.")
+    parser.add_argument("--asr_batch_size", type=int, default=8, help="Number of audio chunks decoded together for --asr local. 1 disables batched decoding.")
+    parser.add_argument("--trim_silence", action='store_true',
+        help="Remove silent parts of the mp3 with ffmpeg before transcription. The time offsets are saved to output/transcriptions/{id}.offsets.json.")
+    parser.add_argument("--silence_db", type=float, default=-35, help="Volume in dB below which audio counts as silence for --trim_silence.")
+    parser.add_argument("--min_silence", type=float, default=1.0, help="Minimum length in seconds of a silent part removed by --trim_silence.")
+    parser.add_argument("--content_store", action='store_true',
+        help="Save transcriptions, cleaned subtitles and articles compressed in the contents table of yt_info.db instead of .txt files.")
+    parser.add_argument("--export_dir", type=str, default=None, help="Target folder for --mode export_contents. Default is --output_path.")
+    parser.add_argument("--search_index", action='store_true',
+        help="Add new transcriptions, cleaned subtitles and articles to the full-text index used by --mode search. The index keeps its own copy of every text.")
+    parser.add_argument("--query", type=str, nargs='+', default=None, help="Words to look for in --mode search.")
+    parser.add_argument("--kind", choices=['transcription', 'subtitle', 'article'], default=None, help="Only search this kind of text in --mode search.")
+    parser.add_argument("--limit", type=int, default=20, help="Max number of results in --mode search.")
+    parser.add_argument("--raw_query", action='store_true', help="Treat --query as FTS5 syntax, e.g. '\"data analysis\" NOT interview'.")
+    parser.add_argument("--dedup", action='store_true',
+        help="Before generating an article, look for an already processed video with nearly the same transcript (MinHash/LSH) and reuse its article.")
+    parser.add_argument("--dedup_threshold", type=float, default=0.8, help="Estimated similarity (0-1) above which --dedup treats two videos as duplicates.")
+    parser.add_argument("--schedule", action='store_true',
+        help="In full_process playlist mode, list the whole playlist first and process pending videos by priority instead of playlist order. Implied by --budget_usd.")
+    parser.add_argument("--priority_weights", type=str, nargs='+', default=None,
+        help="Weights of the priority score, e.g. --priority_weights recency=2 views=1 duration=0.5. A negative duration weight prefers long videos.")
+    parser.add_argument("--half_life_days", type=float, default=180, help="Age in days at which the recency part of the priority score halves.")
+    parser.add_argument("--no_channel_fairness", action='store_true', help="Order strictly by priority instead of taking turns between channels.")
+    parser.add_argument("--budget_usd", type=float, default=None,
+        help="Estimated Whisper and chatGPT cost allowed per run. Videos over the budget are left for the next run.")
+    return parser
+
+def main():
+    args = build_parser().parse_args()
+    if args.profile:
+        profiler.enable(os.path.join(args.output_path, 'profiles'))
+    if args.content_store or args.search_index:
+        content_hook.enable(get_db_path(args),
+                            store=args.content_store, index=args.search_index)
 
     if args.mode == "fetch_video_id":
         handle_fetch_video_id(args, 'playlist')
         
     if args.mode == "download_subtitle":
-        db = OperateDB()
+        db = OperateDB(get_db_path(args))
         if args.download_mode == 'video_id':
             handle_fetch_video_id(args, 'single_video')
             handle_download_subtitle(args, args.video_id)
         if args.download_mode == 'playlist':
             video_ids = db.get_video_ids(conditions={'has_subtitles': 'Done', 'has_address_subtitles': 'No'})
-            handle_download_subtitle(args, list(video_ids))
+            handle_download_subtitle(args, schedule_videos(args, video_ids, args.subtitle_source))
         db.close()
 
     if args.mode == 'generate_article':
         if not args.video_id:
             raise  ValueError('Please input video_id by --video_id.')
-        result = step_generate_article(args)
-        save_articles(result, args.output_path, args.video_id)
+        step_generate_article(args)
+
+    if args.mode == 'generate_article_batch':
+        video_ids = args.video_id
+        if not video_ids:
+            db = OperateDB(get_db_path(args))
+            video_ids = db.get_video_ids(conditions={'has_address_subtitles': 'Done', 'has_generated_article': 'No'})
+            db.close()
+            video_ids = schedule_videos(args, video_ids)
+        step_generate_article_batch(args, video_ids)
 
     if args.mode == "full_process":
-        if args.download_mode == "playlist":
-            print('The full_process mode with --download_mode video_id playlist isn\'t working yet. Please use --download_mode mp3 instead.')
+        if args.download_mode == 'video_id' and not args.video_id:
+            raise  ValueError('Please input video_id by --video_id.')
+        handle_full_process(args)
 
-        if args.download_mode == 'video_id':
-            if not args.video_id:
-                raise  ValueError('Please input video_id by --video_id.')
-            handle_download_subtitle(args, args.video_id)
-            result = step_generate_article(args)
-            save_articles(result, args.output_path, args.video_id)
+    if args.mode == 'clean_subtitles':
+        handle_clean_subtitles(args)
+
+    if args.mode in ['import_contents', 'export_contents']:
+        handle_contents(args)
+
+    if args.mode == 'search':
+        handle_search(args)
+
+    if args.mode == 'serve':
+        handle_serve(args)
+
+    if args.mode != 'serve':
+        metrics.write_summary(os.path.join(args.output_path, 'metrics'))
+    if args.profile:
+        profiler.report()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,79 @@
+import unittest, os, tempfile
+from unittest.mock import patch, MagicMock
+from core.article_generator import ArticleGenerator
+from core.completion_cache import CompletionCache
+
+
+def make_chunk(text):
+    chunk = MagicMock()
+    chunk.choices = [MagicMock()]
+    chunk.choices[0].delta.content = text
+    chunk.usage = None
+    return chunk
+
+
+class TestArticleGenerator(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.client = MagicMock()
+        self.generator = ArticleGenerator(output_dir=self.tmp.name, client=self.client)
+        self.generator.update_state = MagicMock()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    @patch('core.article_generator.build_article_message')
+    def test_generate_streaming(self, mock_build):
+        mock_build.return_value = ('transcript', [{'role': 'user', 'content': 'hi'}])
+        self.client.chat.completions.create.return_value = iter([make_chunk('Hello'), make_chunk(None), make_chunk(' world')])
+
+        output_path = self.generator.generate('video1')
+
+        with open(output_path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'video1: Hello world\n')
+        self.assertFalse(os.path.exists(output_path + '.part'))
+        self.assertTrue(self.client.chat.completions.create.call_args.kwargs['stream'])
+        self.generator.update_state.assert_called_once_with('video1', 'Done')
+
+    @patch('core.article_generator.build_article_message')
+    def test_generate_failure_keeps_no_partial_file(self, mock_build):
+        mock_build.return_value = ('transcript', [{'role': 'user', 'content': 'hi'}])
+        def broken_stream():
+            yield make_chunk('Hello')
+            raise ConnectionError('stream closed')
+        self.client.chat.completions.create.return_value = broken_stream()
+
+        with self.assertRaises(ConnectionError):
+            self.generator.generate('video1')
+        self.assertEqual(os.listdir(os.path.join(self.tmp.name, 'article')), [])
+        self.generator.update_state.assert_not_called()
+
+    @patch('core.article_generator.build_article_message')
+    def test_generate_with_cache(self, mock_build):
+        mock_build.return_value = ('transcript', [{'role': 'user', 'content': 'hi'}])
+        self.generator.cache = CompletionCache(':memory:')
+        self.client.chat.completions.create.return_value = iter([make_chunk('Hello')])
+        self.generator.generate('video1')
+        self.generator.generate('video1')
+
+        self.client.chat.completions.create.assert_called_once()
+        with open(self.generator.article_path('video1'), encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'video1: Hello\n')
+        self.generator.cache.close()
+
+    @patch('core.article_generator.build_article_message')
+    def test_generate_with_content_store(self, mock_build):
+        from core.content_store import ContentHook
+        mock_build.return_value = ('transcript', [{'role': 'user', 'content': 'hi'}])
+        self.client.chat.completions.create.return_value = iter([make_chunk('Hello')])
+        hook = ContentHook()
+        hook.enable(os.path.join(self.tmp.name, 'yt_info.db'))
+        try:
+            with patch('core.article_generator.content_hook', hook):
+                self.generator.generate('video1')
+                # 文章只存在 content store
+                self.assertFalse(os.path.exists(self.generator.article_path('video1')))
+                self.assertTrue(self.generator.has_article('video1'))
+                self.assertEqual(self.generator.read_article('video1'), 'video1: Hello\n')
+        finally:
+            hook.disable()
@@ -0,0 +1,79 @@
+import unittest, os, tempfile
+from unittest.mock import MagicMock
+from core.audio_cache import AudioCache
+from core.subtitle_downloader import MediaOperations
+
+
+class TestAudioCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = AudioCache(':memory:', max_bytes=20)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def make_mp3(self, video_id, size=8):
+        path = os.path.join(self.tmp.name, f'{video_id}.mp3')
+        with open(path, 'wb') as f:
+            f.write(b'\x00' * size)
+        return path
+
+    def test_evict_least_recently_used(self):
+        for video_id in ['video1', 'video2']:
+            self.cache.add(video_id, self.make_mp3(video_id))
+        # 將 video1 設為最久未使用，加入 video3 時應被淘汰
+        self.cache.cursor.execute("UPDATE audio_cache SET last_access = 0 WHERE video_id = 'video1'")
+        self.cache.add('video3', self.make_mp3('video3'))
+
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, 'video1.mp3')))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, 'video2.mp3')))
+        self.assertEqual(self.cache.total_bytes(), 16)
+
+    def test_pinned_files_are_kept(self):
+        self.cache.add('video1', self.make_mp3('video1'), pin=True)
+        self.cache.cursor.execute("UPDATE audio_cache SET last_access = 0 WHERE video_id = 'video1'")
+        self.cache.add('video2', self.make_mp3('video2', size=16), pin=True)
+        self.assertEqual(self.cache.evict(), [])
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, 'video1.mp3')))
+
+        self.cache.unpin('video1')
+        self.assertEqual(self.cache.evict(), ['video1'])
+        self.assertEqual(self.cache.total_bytes(), 16)
+
+    def test_forget_download_removes_entry(self):
+        from core.utils import MediaDownloader
+        os.makedirs(os.path.join(self.tmp.name, 'mp3'))
+        path = os.path.join(self.tmp.name, 'mp3', 'video1.mp3')
+        with open(path, 'wb') as f:
+            f.write(b'<html>')
+        self.cache.add('video1', path)
+        downloader = MediaDownloader(output_dir=self.tmp.name, audio_cache=self.cache)
+        downloader.forget_download('video1', 'mp3')
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.cache.total_bytes(), 0)
+
+    def test_import_directory(self):
+        self.make_mp3('video1')
+        self.make_mp3('video2')
+        cache = AudioCache(':memory:', audio_dir=self.tmp.name)
+        self.assertEqual(cache.total_bytes(), 16)
+        cache.close()
+
+
+class TestMediaOperationsAudioCache(unittest.TestCase):
+    def test_transcribe_releases_audio(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, 'mp3'))
+            with open(os.path.join(tmp, 'mp3', 'video1.mp3'), 'wb') as f:
+                f.write(b'\x00' * 8)
+            audio_cache = AudioCache(':memory:', max_bytes=0)
+            recognizer = MagicMock()
+            recognizer.transcribe_audio.return_value = 'transcript'
+            media = MediaOperations(output_dir=tmp, recognizer=recognizer, audio_cache=audio_cache)
+
+            media.cache_audio('video1')
+            self.assertTrue(os.path.exists(os.path.join(tmp, 'mp3', 'video1.mp3')))
+            self.assertEqual(media.transcribe('video1'), 'transcript')
+            self.assertFalse(os.path.exists(os.path.join(tmp, 'mp3', 'video1.mp3')))
+            audio_cache.close()
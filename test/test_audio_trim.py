@@ -0,0 +1,120 @@
+import unittest, os, tempfile
+from unittest.mock import patch, MagicMock
+from core.audio_trim import OffsetMap, SilenceTrimmer, parse_silencedetect, speech_regions
+
+STDERR = '''Input #0, mp3, from 'output/mp3/video1.mp3':
+  Duration: 00:02:00.00, start: 0.025057, bitrate: 128 kb/s
+[silencedetect @ 0x1] silence_start: 0
+[silencedetect @ 0x1] silence_end: 10.5 | silence_duration: 10.5
+[silencedetect @ 0x1] silence_start: 60
+[silencedetect @ 0x1] silence_end: 65 | silence_duration: 5
+[silencedetect @ 0x1] silence_start: 110
+'''
+
+
+class TestSilenceTrimmer(unittest.TestCase):
+    def test_parse_silencedetect(self):
+        silences, duration = parse_silencedetect(STDERR)
+        self.assertEqual(duration, 120.0)
+        self.assertEqual(silences, [(0.0, 10.5), (60.0, 65.0), (110.0, 120.0)])
+        self.assertEqual(speech_regions(silences, duration, padding=0),
+                         [(10.5, 60.0), (65.0, 110.0)])
+        # padding 重疊時合併
+        self.assertEqual(speech_regions([(10.0, 10.2)], 20.0, padding=0.25), [(0.0, 20.0)])
+
+    def test_offset_map(self):
+        offsets = OffsetMap([(12.0, 60.0), (65.0, 120.0)])
+        self.assertEqual(offsets.duration, 103.0)
+        self.assertEqual(offsets.to_original(0), 12.0)
+        self.assertEqual(offsets.to_original(50.0), 67.0)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'video1.offsets.json')
+            offsets.save(path)
+            self.assertEqual(OffsetMap.load(path).regions, offsets.regions)
+
+    def fake_ffmpeg(self, output_size):
+        # silencedetect 回傳 STDERR，裁切時寫出 output_size bytes 的檔案
+        def run(command, **kwargs):
+            if 'libmp3lame' in command:
+                with open(command[-1], 'wb') as f:
+                    f.write(b'0' * output_size)
+            return MagicMock(returncode=0, stderr=STDERR)
+        return run
+
+    @patch('core.audio_trim.subprocess.run')
+    def test_trim(self, mock_run):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'video1.mp3')
+            with open(source, 'wb') as f:
+                f.write(b'0' * 1000)
+            mock_run.side_effect = self.fake_ffmpeg(600)
+            trimmer = SilenceTrimmer(padding=0)
+            path, offsets = trimmer.trim(source)
+
+            self.assertNotEqual(path, source)
+            self.assertEqual(os.path.getsize(path), 600)
+            self.assertEqual(offsets.regions, [(10.5, 60.0), (65.0, 110.0)])
+            command = mock_run.call_args.args[0]
+            self.assertIn("between(t,10.500,60.000)+between(t,65.000,110.000)", ' '.join(command))
+            self.assertEqual(command[command.index('-q:a') + 1], '5')
+            os.remove(path)
+
+            # 節省太少時不裁切
+            mock_run.side_effect = None
+            mock_run.return_value = MagicMock(returncode=0, stderr='  Duration: 00:02:00.00, start: 0\n')
+            self.assertEqual(trimmer.trim(source), (source, None))
+
+    @patch('core.audio_trim.subprocess.run')
+    def test_trim_keeps_smaller_file(self, mock_run):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'video1.mp3')
+            with open(source, 'wb') as f:
+                f.write(b'0' * 1000)
+            # 重新編碼後比原始音檔大時使用原始音檔，並刪除暫存檔
+            mock_run.side_effect = self.fake_ffmpeg(1200)
+            mkstemp = tempfile.mkstemp
+            with patch('core.audio_trim.tempfile.mkstemp', side_effect=lambda **kwargs: mkstemp(dir=tmp, **kwargs)):
+                self.assertEqual(SilenceTrimmer(padding=0).trim(source), (source, None))
+            self.assertEqual(os.listdir(tmp), ['video1.mp3'])
+
+    @patch('core.utils.os.path.exists', return_value=True)
+    def test_recognizer_removes_trimmed_file(self, mock_exists):
+        from core.utils import Recognizer
+
+        class EchoRecognizer(Recognizer):
+            def recognize(self, audio_path):
+                return 'Hello'
+
+        fd, trimmed_path = tempfile.mkstemp(suffix='.mp3')
+        os.close(fd)
+        recognizer = EchoRecognizer()
+        recognizer.recognize = MagicMock(return_value='Hello')
+        recognizer.save_transcription = MagicMock()
+        recognizer.trimmer = MagicMock()
+        recognizer.trimmer.trim.return_value = (trimmed_path, None)
+
+        self.assertEqual(recognizer.transcribe_audio('video1'), 'Hello')
+        recognizer.recognize.assert_called_once_with(trimmed_path)
+        self.assertNotIn(os.path.basename(trimmed_path), os.listdir(os.path.dirname(trimmed_path)))
+
+    def test_untrimmed_transcription_removes_stale_offsets(self):
+        from core.utils import Recognizer
+
+        class EchoRecognizer(Recognizer):
+            def recognize(self, audio_path):
+                return 'Hello'
+
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                recognizer = EchoRecognizer()
+                recognizer.save_offsets('video1', OffsetMap([(1.0, 2.0)]))
+                path = os.path.join('output', 'transcriptions', 'video1.offsets.json')
+                self.assertTrue(os.path.exists(path))
+                # 這次沒有裁切，上次的對照表已不適用
+                recognizer.save_offsets('video1', None)
+                self.assertFalse(os.path.exists(path))
+                recognizer.save_offsets('video1', None)
+            finally:
+                os.chdir(cwd)
@@ -0,0 +1,67 @@
+import unittest, json, tempfile
+from unittest.mock import MagicMock
+from core.batch_generator import ArticleBatchGenerator
+
+
+def make_output_line(video_id, content, status_code=200):
+    return json.dumps({
+        'custom_id': video_id,
+        'response': {'status_code': status_code,
+                     'body': {'choices': [{'message': {'content': content}}]}},
+        'error': None,
+    })
+
+
+class TestArticleBatchGenerator(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.client = MagicMock()
+        self.generator = ArticleBatchGenerator(output_dir=self.tmp.name, model='gpt-4o', max_tokens=100,
+                                               client=self.client, poll_interval=0)
+        self.messages = {'video1': [{'role': 'user', 'content': 'hi'}],
+                         'video2': [{'role': 'user', 'content': 'hello'}]}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_write_batch_file(self):
+        batch_path = self.generator.write_batch_file(self.messages)
+        with open(batch_path, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([line['custom_id'] for line in lines], ['video1', 'video2'])
+        self.assertEqual(lines[0]['url'], '/v1/chat/completions')
+        self.assertEqual(lines[0]['body']['model'], 'gpt-4o')
+        self.assertEqual(lines[0]['body']['max_tokens'], 100)
+
+    def test_parse_results(self):
+        content = make_output_line('video1', 'article 1') + '\n' + make_output_line('video2', '', 500)
+        results, errors = self.generator.parse_results(content)
+        self.assertEqual(results, {'video1': 'article 1'})
+        self.assertIn('video2', errors)
+
+    def test_run(self):
+        self.client.files.create.return_value = MagicMock(id='file-in')
+        self.client.batches.create.return_value = MagicMock(id='batch-1')
+        self.client.batches.retrieve.side_effect = [
+            MagicMock(status='in_progress'),
+            MagicMock(status='completed', output_file_id='file-out', error_file_id=None),
+        ]
+        self.client.files.content.return_value = MagicMock(text=make_output_line('video1', 'article 1'))
+
+        results, errors = self.generator.run(self.messages)
+
+        self.assertEqual(results, {'video1': 'article 1'})
+        self.assertEqual(list(errors), ['video2'])
+        self.client.batches.create.assert_called_once_with(input_file_id='file-in',
+                                                           endpoint='/v1/chat/completions',
+                                                           completion_window='24h')
+
+    def test_run_empty(self):
+        self.assertEqual(self.generator.run({}), ({}, {}))
+        self.client.files.create.assert_not_called()
+        self.client.batches.create.assert_not_called()
+
+    def test_wait_timeout(self):
+        self.client.batches.retrieve.return_value = MagicMock(status='in_progress')
+        with self.assertRaises(TimeoutError):
+            self.generator.wait('batch-1', timeout=-1)
@@ -0,0 +1,63 @@
+import unittest, os, tempfile
+from core.checkpoint import StageCheckpoint
+from core.utils import OperateDB
+
+
+class TestStageCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'yt_info.db')
+        db = OperateDB(self.db_path)
+        db.save_new_yt_info([{'id': 'done'}, {'id': 'failed'}], 'playlist')
+        db.update_value('done', 'has_address_subtitles', 'Done')
+        db.update_value('failed', 'has_address_subtitles', 'Error')
+        db.close()
+        for video_id in ['done', 'failed', 'not_in_db']:
+            self.write_artifact('transcriptions', video_id)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_artifact(self, directory, video_id):
+        os.makedirs(os.path.join(self.tmp.name, directory), exist_ok=True)
+        with open(os.path.join(self.tmp.name, directory, video_id + '.txt'), 'w') as f:
+            f.write('text')
+
+    def test_pending_with_content_store(self):
+        from unittest.mock import patch
+        from core.content_store import ContentHook
+        hook = ContentHook()
+        hook.enable(self.db_path)
+        try:
+            hook.save('new', 'article', 'new: article', os.path.join(self.tmp.name, 'article', 'new.txt'))
+            with patch('core.checkpoint.content_hook', hook):
+                checkpoint = StageCheckpoint(output_dir=self.tmp.name)
+                self.assertEqual(checkpoint.pending(['new', 'other'], 'article'), ['other'])
+        finally:
+            hook.disable()
+
+    def test_pending(self):
+        # db_path 預設為 output_dir 下的 yt_info.db
+        checkpoint = StageCheckpoint(output_dir=self.tmp.name)
+        self.assertEqual(checkpoint.db_path, self.db_path)
+        pending = checkpoint.pending(['done', 'failed', 'not_in_db', 'new'], 'subtitle')
+        self.assertEqual(pending, ['failed', 'new'])
+
+    def test_missing_artifact(self):
+        os.remove(os.path.join(self.tmp.name, 'transcriptions', 'done.txt'))
+        checkpoint = StageCheckpoint(output_dir=self.tmp.name, db_path=self.db_path)
+        self.assertEqual(checkpoint.pending(['done'], 'subtitle'), ['done'])
+
+    def test_language_suffixed_subtitle(self):
+        os.remove(os.path.join(self.tmp.name, 'transcriptions', 'done.txt'))
+        os.makedirs(os.path.join(self.tmp.name, 'adress_subtitles'))
+        with open(os.path.join(self.tmp.name, 'adress_subtitles', 'done.en.txt'), 'w') as f:
+            f.write('text')
+        checkpoint = StageCheckpoint(output_dir=self.tmp.name, db_path=self.db_path)
+        self.assertEqual(checkpoint.pending(['done'], 'subtitle'), [])
+
+    def test_force(self):
+        checkpoint = StageCheckpoint(output_dir=self.tmp.name, force=['subtitle'], db_path=self.db_path)
+        self.assertEqual(checkpoint.pending(['done'], 'subtitle'), ['done'])
+        self.write_artifact('article', 'not_in_db')
+        self.assertEqual(checkpoint.pending(['not_in_db'], 'article'), [])
@@ -0,0 +1,34 @@
+import unittest
+from core.completion_cache import CompletionCache
+
+
+class TestCompletionCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache = CompletionCache(':memory:', max_bytes=20)
+        self.messages = [{'role': 'user', 'content': 'write a blog'}]
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_make_key(self):
+        key = CompletionCache.make_key('transcript', self.messages, 'gpt-4o', 2000)
+        self.assertEqual(key, CompletionCache.make_key('transcript', self.messages, 'gpt-4o', 2000))
+        self.assertNotEqual(key, CompletionCache.make_key('transcript', self.messages, 'gpt-3.5-turbo', 2000))
+        self.assertNotEqual(key, CompletionCache.make_key('transcript', self.messages, 'gpt-4o', 1000))
+        self.assertNotEqual(key, CompletionCache.make_key('other', self.messages, 'gpt-4o', 2000))
+
+    def test_get_and_set(self):
+        self.assertIsNone(self.cache.get('missing'))
+        self.cache.set('key1', 'article')
+        self.assertEqual(self.cache.get('key1'), 'article')
+
+    def test_evict_least_recently_used(self):
+        self.cache.set('key1', 'a' * 8)
+        self.cache.set('key2', 'b' * 8)
+        # 將 key2 設為最久未使用，寫入 key3 時應被淘汰
+        self.cache.cursor.execute("UPDATE completions SET last_access = 0 WHERE key = 'key2'")
+        self.cache.set('key3', 'c' * 8)
+        self.assertIsNone(self.cache.get('key2'))
+        self.assertEqual(self.cache.get('key1'), 'a' * 8)
+        self.assertEqual(self.cache.get('key3'), 'c' * 8)
+        self.assertLessEqual(self.cache.total_bytes(), 20)
@@ -0,0 +1,111 @@
+import unittest, os, tempfile
+from core.content_store import ContentStore, ContentHook, build_zlib_dictionary
+from core.utils import clean_subtitles
+
+
+class TestContentStore(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ContentStore(os.path.join(self.tmp.name, 'yt_info.db'), use_zstd=False)
+        self.text = 'In this video we talk about data analysis and career changes. ' * 200
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_put_and_get(self):
+        self.assertIsNone(self.store.get('video1', 'transcription'))
+        self.store.put('video1', 'transcription', self.text)
+        self.assertEqual(self.store.get('video1', 'transcription'), self.text)
+        stats = self.store.stats()
+        self.assertEqual(stats['size'], len(self.text))
+        self.assertLess(stats['compressed_size'] * 10, stats['size'])
+        with self.assertRaises(ValueError):
+            self.store.put('video1', 'unknown', self.text)
+
+    def test_open_streams_content(self):
+        self.store.put('video1', 'article', self.text)
+        with self.store.open('video1', 'article') as f:
+            self.assertEqual(f.read(10), self.text[:10])
+            self.assertEqual(f.read(), self.text[10:])
+        with self.assertRaises(KeyError):
+            self.store.open('missing', 'article')
+
+    def test_train_dictionary(self):
+        for i in range(5):
+            self.store.put(f'video{i}', 'subtitle', f'Episode {i}: ' + 'data analysis career resume interview ' * 3)
+        before = self.store.stats()['compressed_size']
+        dict_id = self.store.train_dictionary()
+
+        self.assertIsNotNone(dict_id)
+        self.assertLess(self.store.stats()['compressed_size'], before)
+        self.assertEqual(self.store.get('video3', 'subtitle'), 'Episode 3: ' + 'data analysis career resume interview ' * 3)
+
+    def test_needs_training(self):
+        self.store.put('video1', 'subtitle', 'data analysis data analysis')
+        # 內容太少時無法訓練
+        self.assertFalse(self.store.needs_training())
+        self.store.put('video2', 'subtitle', 'data analysis career')
+        self.assertTrue(self.store.needs_training())
+        self.store.train_dictionary()
+        self.assertFalse(self.store.needs_training())
+        for i in range(3, 5):
+            self.store.put(f'video{i}', 'subtitle', 'career resume')
+        self.assertTrue(self.store.needs_training())
+
+    def test_import_and_export(self):
+        source = os.path.join(self.tmp.name, 'source')
+        os.makedirs(os.path.join(source, 'adress_subtitles'))
+        with open(os.path.join(source, 'adress_subtitles', 'video1.en.txt'), 'w', encoding='utf-8') as f:
+            f.write('subtitle text')
+        self.assertEqual(self.store.import_files(source), 1)
+
+        target = os.path.join(self.tmp.name, 'target')
+        self.assertEqual(self.store.export(target), 1)
+        with open(os.path.join(target, 'adress_subtitles', 'video1.en.txt'), encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'subtitle text')
+
+    def test_build_zlib_dictionary(self):
+        dictionary = build_zlib_dictionary(['a bb bb ccc ccc ccc', 'bb ccc'], size=7)
+        # 最常用的字放在最後
+        self.assertEqual(dictionary, b'bb ccc')
+
+
+class TestContentHook(unittest.TestCase):
+    def test_save_routes_to_store(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'transcriptions', 'video1.txt')
+            hook = ContentHook()
+            hook.save('video1', 'transcription', 'Hello', path)
+            self.assertTrue(os.path.exists(path))
+            self.assertIsNone(hook.load('video1', 'transcription'))
+            os.remove(path)
+
+            hook.enable(os.path.join(tmp, 'yt_info.db'))
+            try:
+                # store 啟用時不寫出 .txt
+                hook.save('video1', 'transcription', 'Hello', path)
+                self.assertFalse(os.path.exists(path))
+                self.assertEqual(hook.load('video1', 'transcription'), 'Hello')
+                self.assertEqual(hook.stat('video1', 'transcription')[0], 5)
+                self.assertEqual(next(hook.get_store().iter_contents()), ('video1', 'transcription', 'video1.txt'))
+            finally:
+                hook.disable()
+
+    def test_clean_subtitles_persists_content(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            vtt_path = os.path.join(tmp, 'video1.en.vtt')
+            with open(vtt_path, 'w', encoding='utf-8') as f:
+                f.write('WEBVTT\n\n00:00:00.000 --> 00:00:01.000\nHello\n')
+            hook = ContentHook()
+            from core import utils
+            original, utils.content_hook = utils.content_hook, hook
+            try:
+                clean_subtitles(vtt_path, os.path.join(tmp, 'adress_subtitles'))
+                hook.enable(os.path.join(tmp, 'yt_info.db'))
+                clean_subtitles(vtt_path, os.path.join(tmp, 'adress_subtitles'))
+                self.assertEqual(hook.get_store().get('video1', 'subtitle'), 'Hello')
+                self.assertEqual(next(hook.get_store().iter_contents()), ('video1', 'subtitle', 'video1.en.txt'))
+            finally:
+                utils.content_hook = original
+                hook.disable()
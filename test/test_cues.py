@@ -0,0 +1,51 @@
+import unittest, os, tempfile
+from core.cues import Cue, CueList, parse_timestamp, parse_vtt_lines
+from core.utils import clean_subtitles
+
+VTT = """WEBVTT
+Kind: captions
+Language: en
+
+1
+00:00:01.000 --> 00:00:03.500 align:start position:0%
+Hello<00:00:01.500><c> world</c>
+
+00:00:03.500 --> 01:00:05.000
+second line
+continues here
+"""
+
+
+class TestCues(unittest.TestCase):
+    def test_parse_timestamp(self):
+        self.assertEqual(parse_timestamp('00:00:01.500'), 1.5)
+        self.assertEqual(parse_timestamp('01:02.250'), 62.25)
+        self.assertEqual(parse_timestamp('01:00:00.000'), 3600)
+        with self.assertRaises(ValueError):
+            parse_timestamp('1.5')
+
+    def test_parse_vtt_lines(self):
+        cues = parse_vtt_lines(VTT.splitlines(keepends=True))
+        self.assertEqual(list(cues), [Cue(1.0, 3.5, 'Hello'), Cue(3.5, 3605.0, 'second line continues here')])
+        self.assertEqual(cues.text(), 'Hello second line continues here')
+        self.assertEqual(len(cues.between(0, 2)), 1)
+
+    def test_round_trip(self):
+        cues = parse_vtt_lines(VTT.splitlines(keepends=True))
+        cues.append(4000, 4001, '中文字幕')
+        restored = CueList.from_bytes(cues.to_bytes())
+        self.assertEqual(list(restored), list(cues))
+        with self.assertRaises(ValueError):
+            CueList.from_bytes(b'nope')
+
+    def test_clean_subtitles_writes_cues(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            file_path = os.path.join(tmp, 'video1.en.vtt')
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(VTT)
+            clean_subtitles(file_path, os.path.join(tmp, 'out'))
+            cues = CueList.load(os.path.join(tmp, 'out', 'video1.en.cues'))
+            with open(os.path.join(tmp, 'out', 'video1.en.txt'), encoding='utf-8') as f:
+                text = f.read()
+        self.assertEqual(len(cues), 2)
+        self.assertIn('Hello', text)
@@ -0,0 +1,85 @@
+import unittest, os, tempfile
+from unittest.mock import MagicMock, patch
+from core.dedup import DedupIndex, shingles
+from core.article_generator import ArticleGenerator
+
+TEXT = ' '.join(f'word{i % 97} topic{i % 13} point{i}' for i in range(300))
+
+
+class TestDedupIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dedup = DedupIndex(':memory:')
+
+    def tearDown(self):
+        self.dedup.close()
+
+    def test_near_duplicate_is_found(self):
+        self.dedup.add('video1', TEXT)
+        # 重新上傳時開頭多了一段介紹
+        reupload = 'welcome back to the channel ' + TEXT
+        self.assertEqual(self.dedup.find_duplicate('video2', reupload), 'video1')
+        self.assertIsNone(self.dedup.find_duplicate('video2', 'a completely different talk about cooking pasta at home'))
+        # 不會找到自己
+        self.assertIsNone(self.dedup.find_duplicate('video1', TEXT))
+
+    def test_accept_filters_candidates(self):
+        self.dedup.add('video1', TEXT)
+        self.assertIsNone(self.dedup.find_duplicate('video2', TEXT, accept=lambda candidate: False))
+
+    def test_empty_text_is_not_a_duplicate(self):
+        self.dedup.add('video1', '')
+        self.assertEqual(self.dedup.query(''), [])
+
+    def test_cjk_shingles(self):
+        self.assertEqual(len(shingles('今天天氣很好', size=2)), 5)
+
+
+class TestArticleGeneratorDedup(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.tmp.name, 'transcriptions'))
+        for video_id in ['video1', 'video2']:
+            with open(os.path.join(self.tmp.name, 'transcriptions', video_id + '.txt'), 'w', encoding='utf-8') as f:
+                f.write(TEXT)
+        self.dedup = DedupIndex(':memory:')
+        self.client = MagicMock()
+        self.generator = ArticleGenerator(output_dir=self.tmp.name, client=self.client, dedup=self.dedup)
+        self.generator.update_state = MagicMock()
+
+    def tearDown(self):
+        self.dedup.close()
+        self.tmp.cleanup()
+
+    def test_reuses_article_of_duplicate(self):
+        self.generator.write_article('video1', ['An article.'])
+        self.dedup.add('video1', TEXT)
+
+        output_path = self.generator.generate('video2')
+
+        self.client.chat.completions.create.assert_not_called()
+        with open(output_path, 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'video2: An article.\n')
+        self.generator.update_state.assert_called_once_with('video2', 'Done')
+        self.dedup.cursor.execute("SELECT duplicate_of FROM minhash_signatures WHERE video_id = 'video2'")
+        self.assertEqual(self.dedup.cursor.fetchone()[0], 'video1')
+
+    def test_force_skips_reuse(self):
+        self.generator.write_article('video1', ['An article.'])
+        self.dedup.add('video1', TEXT)
+        self.client.chat.completions.create.return_value = iter([])
+
+        with patch('core.article_generator.build_article_message', return_value=(TEXT, [])):
+            self.generator.generate('video2', force=True)
+
+        self.client.chat.completions.create.assert_called_once()
+        self.dedup.cursor.execute("SELECT duplicate_of FROM minhash_signatures WHERE video_id = 'video2'")
+        self.assertIsNone(self.dedup.cursor.fetchone()[0])
+
+    def test_no_duplicate_records_signature(self):
+        self.assertIsNone(self.generator.reuse_duplicate('video1'))
+        self.dedup.cursor.execute("SELECT COUNT(*) FROM minhash_signatures")
+        self.assertEqual(self.dedup.cursor.fetchone()[0], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest, tempfile, threading, time
+from unittest.mock import patch, MagicMock
+from core.download_profile import DownloadProfile, HostLimiter, get_profile
+from core.utils import MediaDownloader
+
+
+class TestDownloadProfile(unittest.TestCase):
+    def test_args(self):
+        self.assertEqual(get_profile('default').args(), [])
+        self.assertEqual(get_profile('fast').args(), ['--concurrent-fragments', '4', '--http-chunk-size', '10M'])
+        self.assertIn('aria2c', get_profile('aria2c').args())
+        with self.assertRaises(ValueError):
+            get_profile('missing')
+
+    def test_base_url(self):
+        profile = get_profile('fast', base_url='http://127.0.0.1:8000/media/')
+        self.assertEqual(profile.video_url('video1'), 'http://127.0.0.1:8000/media/video1')
+        self.assertEqual(profile.host, '127.0.0.1:8000')
+        self.assertEqual(profile.concurrent_fragments, 4)
+        self.assertEqual(get_profile('fast').host, 'www.youtube.com')
+
+    @patch('subprocess.run')
+    def test_download_audio_with_profile(self, mock_subprocess):
+        mock_subprocess.return_value = MagicMock(returncode=0, stdout='', stderr='')
+        profile = DownloadProfile('test', concurrent_fragments=8, base_url='http://127.0.0.1:8000/')
+        with tempfile.TemporaryDirectory() as tmp:
+            downloader = MediaDownloader(output_dir=tmp, profile=profile)
+            downloader.download_audio('missing_video', download_type='mp3')
+            downloader.logger.flush()
+
+        command = mock_subprocess.call_args.args[0]
+        self.assertEqual(command[-1], 'http://127.0.0.1:8000/missing_video')
+        self.assertIn('--concurrent-fragments', command)
+
+
+class TestHostLimiter(unittest.TestCase):
+    def test_connections_are_bounded_per_host(self):
+        limiter = HostLimiter(max_connections=4)
+        lock = threading.Lock()
+        in_use = {'a': 0, 'b': 0}
+        peak = {'a': 0, 'b': 0}
+
+        def download(host):
+            with limiter.acquire(host, 2):
+                with lock:
+                    in_use[host] += 2
+                    peak[host] = max(peak[host], in_use[host])
+                time.sleep(0.01)
+                with lock:
+                    in_use[host] -= 2
+
+        threads = [threading.Thread(target=download, args=(host,)) for host in ['a', 'b'] * 5]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLessEqual(peak['a'], 4)
+        self.assertLessEqual(peak['b'], 4)
+
+    def test_large_request_does_not_block_forever(self):
+        limiter = HostLimiter(max_connections=2)
+        with limiter.acquire('a', 8):
+            self.assertEqual(limiter.in_use['a'], 2)
+        self.assertEqual(limiter.in_use['a'], 0)
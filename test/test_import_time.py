@@ -0,0 +1,31 @@
+import unittest, os, re, subprocess, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 只在特定模式或選項才需要的模組，import main 時不應載入
+HEAVY_MODULES = ['openai', 'CopyCraftAPI', 'fastapi', 'uvicorn', 'faster_whisper', 'zstandard',
+                 'cProfile', 'pstats', 'concurrent.futures.process', 'multiprocessing']
+
+
+def run_python(code, *options):
+    return subprocess.run([sys.executable, *options, '-c', code], cwd=ROOT,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+
+
+def imported_modules(code):
+    '''
+    以 -X importtime 的輸出列出執行 code 時載入的模組，不受機器快慢影響。
+    '''
+    result = run_python(code, '-X', 'importtime')
+    return set(re.findall(r'^import time:\s+\d+ \|\s+\d+ \|\s+(\S+)$', result.stderr, re.MULTILINE))
+
+
+class TestImportTime(unittest.TestCase):
+    def test_fetch_mode_skips_heavy_imports(self):
+        code = ("import sys, main; main.build_parser().parse_args(['--mode', 'fetch_video_id']); "
+                "print(sorted(m for m in ('openai', 'CopyCraftAPI') if m in sys.modules))")
+        self.assertEqual(run_python(code).stdout.strip(), '[]')
+
+    def test_import_main_skips_optional_modules(self):
+        modules = imported_modules('import main')
+        self.assertIn('main', modules)
+        self.assertEqual(sorted(modules & set(HEAVY_MODULES)), [])
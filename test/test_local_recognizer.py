@@ -0,0 +1,50 @@
+import unittest, sys
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from core.local_recognizer import LocalWhisperRecognizer
+from core.utils import create_recognizer
+
+
+def make_segments(*texts):
+    return iter([SimpleNamespace(text=text) for text in texts]), SimpleNamespace(language='en')
+
+
+class TestLocalWhisperRecognizer(unittest.TestCase):
+    def test_recognize_without_batching(self):
+        model = MagicMock()
+        model.transcribe.return_value = make_segments(' Hello', ' world ')
+        recognizer = LocalWhisperRecognizer(model=model, batch_size=1)
+
+        self.assertEqual(recognizer.recognize('output/mp3/video1.mp3'), 'Hello world')
+        model.transcribe.assert_called_once_with('output/mp3/video1.mp3', language=None)
+
+    def test_recognize_batched(self):
+        fake_module = MagicMock(__spec__=MagicMock())
+        fake_module.BatchedInferencePipeline.return_value.transcribe.return_value = make_segments('Hello')
+        with patch.dict(sys.modules, {'faster_whisper': fake_module}):
+            recognizer = LocalWhisperRecognizer(model_size='tiny', cpu_threads=4, num_workers=2, batch_size=16)
+            # 模型在第一次轉錄時才載入
+            fake_module.WhisperModel.assert_not_called()
+            self.assertEqual(recognizer.recognize('video1.mp3'), 'Hello')
+            recognizer.recognize('video2.mp3')
+
+        fake_module.WhisperModel.assert_called_once_with('tiny', device='cpu', compute_type='int8', cpu_threads=4, num_workers=2)
+        fake_module.BatchedInferencePipeline.return_value.transcribe.assert_any_call('video1.mp3', language=None, batch_size=16)
+
+    @patch('core.utils.OperateDB')
+    @patch('core.utils.os.path.exists', return_value=True)
+    def test_transcribe_audio_saves_transcription(self, mock_exists, mock_operate_db):
+        recognizer = LocalWhisperRecognizer(model=MagicMock(), batch_size=1)
+        recognizer.recognize = MagicMock(return_value='Hello')
+        recognizer.save_transcription = MagicMock()
+
+        self.assertEqual(recognizer.transcribe_audio('video1'), 'Hello')
+        recognizer.recognize.assert_called_once_with('output/mp3/video1.mp3')
+        recognizer.save_transcription.assert_called_once_with('video1', 'Hello', 'output/')
+
+    def test_missing_dependency(self):
+        with patch.dict(sys.modules, {'faster_whisper': None}):
+            with self.assertRaises(ImportError):
+                create_recognizer('local')
+        with self.assertRaises(ValueError):
+            create_recognizer('other')
@@ -0,0 +1,58 @@
+import unittest, os, glob, tempfile
+from core.logger import StructuredLogger
+
+
+class TestStructuredLogger(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_log_and_query(self):
+        logger = StructuredLogger(log_dir=self.tmp.name)
+        logger.log('video1', 'Checking subtitles', event='list_subs', returncode=0)
+        logger.log('video2', 'Download mp3', event='download_audio')
+        logger.log('video1', 'Download mp3', event='download_audio')
+
+        records = list(logger.query('video1'))
+        logger.close()
+        self.assertEqual([record['event'] for record in records], ['list_subs', 'download_audio'])
+        self.assertEqual(records[0]['returncode'], 0)
+
+    def test_rotate_and_compress(self):
+        logger = StructuredLogger(log_dir=self.tmp.name, max_bytes=200)
+        for i in range(20):
+            logger.log('video1', f'message {i}')
+            logger.flush()
+        logger.close()
+
+        rotated = glob.glob(os.path.join(self.tmp.name, 'yt_dlp.*.jsonl.gz'))
+        self.assertGreater(len(rotated), 0)
+        messages = [record['message'] for record in logger.query('video1')]
+        self.assertEqual(messages, [f'message {i}' for i in range(20)])
+
+    def test_write_error_does_not_block_flush(self):
+        logger = StructuredLogger(log_dir=self.tmp.name)
+        # 無法序列化的紀錄 (default=str 也會失敗) 模擬寫入錯誤
+        class Broken:
+            def __str__(self):
+                raise OSError('No space left on device')
+        logger.log('video1', 'broken', value=Broken())
+        logger.log('video1', 'after')
+        logger.flush(timeout=5)
+        self.assertIsInstance(logger.error, OSError)
+        self.assertEqual(logger.dropped, 1)
+        self.assertEqual([record['message'] for record in logger.query('video1')], ['after'])
+        logger.close()
+
+    def test_dead_writer(self):
+        logger = StructuredLogger(log_dir=self.tmp.name, max_queue=2)
+        logger.close()
+        logger.log('video1', 'dropped')
+        self.assertEqual(logger.dropped, 1)
+        # 寫入 thread 停止後仍有未處理的紀錄時 flush 不會卡住
+        logger.queue.put({'video_id': 'video1'})
+        with self.assertRaises(RuntimeError):
+            logger.flush(timeout=5)
+        self.assertEqual(list(logger.query('video1')), [])
@@ -0,0 +1,40 @@
+import unittest, os, json, tempfile
+from core.metrics import Metrics
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+
+    def test_span_outcome(self):
+        with self.metrics.span('download_audio'):
+            pass
+        with self.metrics.span('download_audio') as span:
+            span.outcome = 'NotFound'
+        with self.assertRaises(RuntimeError):
+            with self.metrics.span('download_audio'):
+                raise RuntimeError('boom')
+
+        stages = self.metrics.summary()['stages']['download_audio']
+        self.assertEqual(stages['success']['count'], 1)
+        self.assertEqual(stages['NotFound']['count'], 1)
+        self.assertEqual(stages['Error']['count'], 1)
+
+    def test_to_prometheus(self):
+        with self.metrics.span('clean_subtitles'):
+            pass
+        self.metrics.inc('bytes_total', 100, stage='clean_subtitles')
+        self.metrics.inc('bytes_total', 50, stage='clean_subtitles')
+        text = self.metrics.to_prometheus()
+        self.assertIn('subtoarticle_stage_seconds_count{stage="clean_subtitles",outcome="success"} 1', text)
+        self.assertIn('# TYPE subtoarticle_bytes_total counter', text)
+        self.assertIn('subtoarticle_bytes_total{stage="clean_subtitles"} 150', text)
+
+    def test_write_summary(self):
+        self.metrics.inc('tokens_total', 10, model='gpt-4o', kind='prompt')
+        with tempfile.TemporaryDirectory() as tmp:
+            output_path = self.metrics.write_summary(tmp)
+            with open(output_path) as f:
+                summary = json.load(f)
+            self.assertTrue(os.path.exists(os.path.join(tmp, 'last_run.prom')))
+        self.assertEqual(summary['counters'], [{'name': 'tokens_total', 'labels': {'kind': 'prompt', 'model': 'gpt-4o'}, 'value': 10}])
@@ -0,0 +1,60 @@
+import unittest, threading, time
+from core.pipeline import Pipeline, Stage
+
+
+class TestPipeline(unittest.TestCase):
+    def test_run_all_stages(self):
+        pipeline = Pipeline([
+            Stage('double', lambda x: x * 2, workers=3),
+            Stage('filter', lambda x: x if x % 4 == 0 else None, workers=2),
+            Stage('str', str, workers=1),
+        ])
+        results = pipeline.run(range(10))
+        self.assertEqual(sorted(results, key=int), ['0', '4', '8', '12', '16'])
+        self.assertEqual(pipeline.errors, [])
+
+    def test_errors_do_not_stop_pipeline(self):
+        def fail_on_three(x):
+            if x == 3:
+                raise RuntimeError('boom')
+            return x
+        pipeline = Pipeline([Stage('check', fail_on_three, workers=2)])
+        results = pipeline.run(range(5))
+        self.assertEqual(sorted(results), [0, 1, 2, 4])
+        self.assertEqual([(stage, item) for stage, item, _ in pipeline.errors], [('check', 3)])
+
+    def test_stages_run_concurrently(self):
+        # 兩個階段各睡 0.05 秒，pipeline 執行時間應接近單一階段，而不是兩者相加
+        def slow(x):
+            time.sleep(0.05)
+            return x
+        pipeline = Pipeline([Stage('a', slow, workers=4), Stage('b', slow, workers=4)])
+        start = time.time()
+        pipeline.run(range(8))
+        self.assertLess(time.time() - start, 0.05 * 8)
+
+    def test_backpressure(self):
+        produced = []
+        release = threading.Event()
+        def source():
+            for i in range(20):
+                produced.append(i)
+                yield i
+        def blocked(x):
+            release.wait()
+            return x
+        pipeline = Pipeline([Stage('blocked', blocked, workers=1, queue_size=2)])
+        thread = threading.Thread(target=pipeline.run, args=(source(),))
+        thread.start()
+        time.sleep(0.1)
+        # 1 個處理中 + queue 中 2 個 + 1 個等待放入
+        self.assertLessEqual(len(produced), 4)
+        release.set()
+        thread.join()
+        self.assertEqual(len(produced), 20)
+
+    def test_invalid_stage(self):
+        with self.assertRaises(ValueError):
+            Stage('bad', str, workers=0)
+        with self.assertRaises(ValueError):
+            Pipeline([])
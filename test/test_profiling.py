@@ -0,0 +1,54 @@
+import unittest, os, glob, time, tempfile
+from core.profiling import Profiler
+
+
+def busy(seconds):
+    end = time.time() + seconds
+    while time.time() < end:
+        sum(range(100))
+
+
+class TestProfiler(unittest.TestCase):
+    def test_disabled_stage_is_noop(self):
+        profiler = Profiler()
+        self.assertIs(profiler.stage('download'), profiler.stage('clean'))
+        with profiler.stage('download'):
+            pass
+        self.assertEqual(profiler.stats, {})
+
+    def test_stage_profiles(self):
+        profiler = Profiler()
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler.enable(tmp, interval=0.001)
+            with profiler.stage('download'):
+                busy(0.05)
+                with profiler.stage('clean'):
+                    busy(0.05)
+            report = profiler.report(top=5)
+
+            self.assertEqual(set(profiler.stats), {'download', 'clean'})
+            self.assertIn('Profile of stage "clean"', report)
+            self.assertEqual(len(glob.glob(os.path.join(tmp, '*.pstats'))), 2)
+            collapsed = glob.glob(os.path.join(tmp, '*_clean.collapsed'))
+            self.assertEqual(len(collapsed), 1)
+            with open(collapsed[0]) as f:
+                self.assertIn('busy', f.read())
+        self.assertFalse(profiler.enabled)
+
+    def test_sampler_survives_short_stages(self):
+        import threading
+        profiler = Profiler()
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler.enable(tmp, interval=0.0001)
+
+            def work():
+                for _ in range(300):
+                    with profiler.stage('download'):
+                        pass
+            threads = [threading.Thread(target=work) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertTrue(profiler.sampler.is_alive())
+            profiler.disable()
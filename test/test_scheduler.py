@@ -0,0 +1,66 @@
+import unittest, os, tempfile
+from datetime import datetime
+from core.scheduler import VideoScheduler
+from core.utils import OperateDB
+
+NOW = datetime(2024, 6, 1).timestamp()
+
+
+def make_video(video_id, upload_date='20240501', view_count=1000, duration=600, channel='channel1'):
+    return {'id': video_id, 'upload_date': upload_date, 'view_count': view_count,
+            'duration': duration, 'playlist_uploader_id': channel}
+
+
+class TestVideoScheduler(unittest.TestCase):
+    def test_priority_order(self):
+        scheduler = VideoScheduler(fair=False, now=NOW)
+        videos = [make_video('old', upload_date='20200101'),
+                  make_video('new_popular', upload_date='20240530', view_count=100000),
+                  make_video('new', upload_date='20240530')]
+        scheduled, deferred = scheduler.plan(videos)
+        self.assertEqual(scheduled, ['new_popular', 'new', 'old'])
+        self.assertEqual(deferred, [])
+
+    def test_channel_fairness(self):
+        videos = [make_video(f'a{i}', view_count=100000 - i) for i in range(3)]
+        videos.append(make_video('b0', view_count=10, channel='channel2'))
+        scheduled, _ = VideoScheduler(now=NOW).plan(videos)
+        self.assertEqual(scheduled, ['a0', 'b0', 'a1', 'a2'])
+        scheduled, _ = VideoScheduler(fair=False, now=NOW).plan([dict(video) for video in videos])
+        self.assertEqual(scheduled[-1], 'b0')
+
+    def test_budget(self):
+        scheduler = VideoScheduler(fair=False, budget_usd=0.1, now=NOW, weights={'duration': 0})
+        cost = scheduler.estimate_cost(make_video('x', duration=600))
+        # Whisper 10 分鐘 $0.06 + gpt-3.5-turbo 的 token
+        self.assertAlmostEqual(cost, 0.06 + (2300 * 0.5 + 2000 * 1.5) / 1_000_000)
+        videos = [make_video('first', upload_date='20240530', duration=600),
+                  make_video('long', upload_date='20240520', duration=3600),
+                  make_video('short', upload_date='20240101', duration=300)]
+        scheduled, deferred = scheduler.plan(videos)
+        # 超過預算的長片延後，後面放得進預算的短片仍會處理
+        self.assertEqual(scheduled, ['first', 'short'])
+        self.assertEqual(deferred, ['long'])
+
+    def test_no_transcription_cost(self):
+        video = make_video('x', duration=600)
+        self.assertLess(VideoScheduler(subtitle_source=None).estimate_cost(video),
+                        VideoScheduler(subtitle_source='mp3').estimate_cost(video))
+        scheduler = VideoScheduler(subtitle_source='both')
+        self.assertTrue(scheduler.needs_transcription(video))
+        self.assertFalse(scheduler.needs_transcription(dict(video, subtitle_langs='', auto_caption_langs='en')))
+
+    def test_schedule_from_db(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'yt_info.db')
+            db = OperateDB(db_path)
+            db.save_new_yt_info([{'id': 'video1', 'upload_date': '20240101', 'view_count': 10, 'duration': 60},
+                                 {'id': 'video2', 'upload_date': '20240530', 'view_count': 5000, 'duration': 60}], 'playlist')
+            db.close()
+            scheduled, _ = VideoScheduler(now=NOW).schedule({'video1', 'video2', 'unknown'}, db_path)
+            self.assertEqual(scheduled[:2], ['video2', 'video1'])
+            self.assertEqual(scheduled[2], 'unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest, os, tempfile
+from core.search_index import SearchIndex
+from core.content_store import ContentHook
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.index = SearchIndex(':memory:')
+        self.index.cursor.execute("CREATE TABLE videos (id TEXT PRIMARY KEY, title TEXT)")
+        self.index.cursor.execute("INSERT INTO videos VALUES ('video1', 'Resume Writing Tips')")
+        self.index.add('video1', 'transcription', 'Today we talk about resume writing for career changers.')
+        self.index.add('video2', 'article', 'video2: A guide to data analysis interviews.')
+
+    def tearDown(self):
+        self.index.close()
+
+    def test_search(self):
+        results = self.index.search('resume career')
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['video_id'], 'video1')
+        self.assertEqual(results[0]['title'], 'Resume Writing Tips')
+        self.assertIn('[resume]', results[0]['snippet'])
+
+        # '-' 不會被當成 FTS5 語法
+        results = self.index.search('data-analysis')
+        self.assertEqual([result['video_id'] for result in results], ['video2'])
+        results = self.index.search('interviews')
+        self.assertEqual(results[0]['video_id'], 'video2')
+        self.assertIsNone(results[0]['title'])
+        self.assertEqual(self.index.search('interviews', kind='transcription'), [])
+
+    def test_add_replaces_previous_text(self):
+        self.index.add('video1', 'transcription', 'Nothing about that any more.')
+        self.assertEqual(self.index.search('resume'), [])
+        self.assertEqual(self.index.count(), 2)
+
+    def test_remove(self):
+        self.index.remove('video1')
+        self.assertEqual(self.index.search('resume'), [])
+        self.assertEqual(self.index.count(), 1)
+        self.index.cursor.execute("SELECT video_id, kind FROM content_fts_keys")
+        self.assertEqual(self.index.cursor.fetchall(), [('video2', 'article')])
+
+    def test_upgrade_old_index(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'yt_info.db')
+            index = SearchIndex(db_path)
+            index.add('video1', 'subtitle', 'hello world')
+            # 模擬沒有對照表的舊版索引
+            index.cursor.execute("DROP TABLE content_fts_keys")
+            index.conn.commit()
+            index.close()
+
+            index = SearchIndex(db_path)
+            index.add('video1', 'subtitle', 'goodbye')
+            self.assertEqual(index.count(), 1)
+            self.assertEqual(index.search('hello'), [])
+            index.close()
+
+    def test_raw_query(self):
+        self.assertEqual(len(self.index.search('resume OR interviews', raw=True)), 2)
+        with self.assertRaises(ValueError):
+            self.index.search('"unbalanced', raw=True)
+
+    def test_without_videos_table(self):
+        index = SearchIndex(':memory:')
+        index.add('video1', 'subtitle', 'hello world')
+        self.assertEqual(index.search('hello')[0]['title'], None)
+        index.close()
+
+
+class TestContentHookIndex(unittest.TestCase):
+    def test_persist_updates_index(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            hook = ContentHook()
+            hook.enable(os.path.join(tmp, 'yt_info.db'), store=False, index=True)
+            hook.persist('video1', 'transcription', 'machine learning basics')
+            self.assertEqual(hook.get_index().search('learning')[0]['video_id'], 'video1')
+            self.assertNotIn('store', hook.handles[os.getpid()])
+            hook.disable()
@@ -0,0 +1,162 @@
+import unittest, os, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+from core.service import JobManager, create_app
+from core.utils import db_pool, PooledDB
+
+try:
+    from fastapi.testclient import TestClient
+except ImportError:
+    TestClient = None
+
+VIDEO_ID = 'g0RWoZnOANM'
+
+
+class TestJobManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manager = JobManager(output_dir=self.tmp.name, workers=2, client=MagicMock(), use_cache=False)
+
+    def tearDown(self):
+        self.manager.shutdown()
+        self.tmp.cleanup()
+
+    def write_article(self, video_id, force=False):
+        path = self.manager.generator.article_path(video_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f'{video_id}: article\n')
+        return path
+
+    @patch('core.service.MediaOperations')
+    def test_submit_and_result(self, mock_media):
+        mock_media.return_value.fetch_media.return_value = 'mp3'
+        self.manager.generator.generate = MagicMock(side_effect=self.write_article)
+
+        job = self.manager.submit(VIDEO_ID)
+        self.assertEqual(job['status'], 'queued')
+        self.manager.executor.shutdown(wait=True)
+
+        job = self.manager.get(job['id'])
+        self.assertEqual(job['status'], 'done')
+        mock_media.return_value.transcribe.assert_called_once_with(VIDEO_ID)
+        mock_media.return_value.clean_downloaded_subtitle.assert_not_called()
+        self.assertEqual(self.manager.result(job['id']), f'{VIDEO_ID}: article\n')
+        # 共用同一個 recognizer，不會每個 job 重建 client
+        self.assertIs(mock_media.call_args.kwargs['recognizer'], self.manager.recognizer)
+
+    @patch('core.service.MediaOperations')
+    def test_job_error(self, mock_media):
+        mock_media.return_value.fetch_media.return_value = None
+        job = self.manager.submit(VIDEO_ID, subtitle_source='subtitle')
+        self.manager.executor.shutdown(wait=True)
+
+        job = self.manager.get(job['id'])
+        self.assertEqual(job['status'], 'error')
+        self.assertEqual(job['stage'], 'fetch')
+        self.assertIsNone(self.manager.result(job['id']))
+
+    @patch('core.service.MediaOperations')
+    def test_submit_duplicate_video(self, mock_media):
+        started = threading.Event()
+        release = threading.Event()
+
+        def fetch_media(video_id):
+            started.set()
+            release.wait(5)
+            return 'mp3'
+
+        mock_media.return_value.fetch_media.side_effect = fetch_media
+        self.manager.generator.generate = MagicMock(side_effect=self.write_article)
+
+        job = self.manager.submit(VIDEO_ID)
+        self.assertTrue(started.wait(5))
+        # 執行中的影片再次提交時回傳同一個 job
+        self.assertEqual(self.manager.submit(VIDEO_ID, force=True)['id'], job['id'])
+        self.assertEqual(len(self.manager.list()), 1)
+        release.set()
+        self.manager.executor.shutdown(wait=True)
+
+        self.assertEqual(mock_media.return_value.fetch_media.call_count, 1)
+        self.manager.generator.generate.assert_called_once()
+        self.assertEqual(self.manager.active, {})
+        # 結束後可以重新提交
+        self.manager.executor = ThreadPoolExecutor(max_workers=1)
+        self.assertNotEqual(self.manager.submit(VIDEO_ID)['id'], job['id'])
+        self.manager.executor.shutdown(wait=True)
+
+    def test_get_missing_job(self):
+        self.assertIsNone(self.manager.get('missing'))
+        self.assertEqual(self.manager.list(), [])
+
+    def test_invalid_video_id(self):
+        for video_id in ['', 'abc', 'g0RWoZnOANM/../x', 'g0RWoZnOANM1']:
+            with self.assertRaises(ValueError):
+                self.manager.submit(video_id)
+        self.assertEqual(self.manager.list(), [])
+
+    def test_prune_finished_jobs(self):
+        self.manager.max_jobs = 3
+        now = time.time()
+        self.manager.jobs = {
+            'expired': {'id': 'expired', 'finished': now - self.manager.job_ttl - 1},
+            'old': {'id': 'old', 'finished': now - 10},
+            'new': {'id': 'new', 'finished': now - 5},
+            'running': {'id': 'running', 'finished': None},
+        }
+        self.manager.prune()
+        self.assertEqual(sorted(self.manager.jobs), ['new', 'running'])
+
+    def test_pooled_db_connection(self):
+        db_path = os.path.join(self.tmp.name, 'yt_info.db')
+        db = db_pool.connect(db_path)
+        self.assertIsInstance(db, PooledDB)
+        db.close()
+        # 同一個 thread 重複使用同一個連線
+        self.assertIs(db_pool.connect(db_path), db)
+
+
+@unittest.skipIf(TestClient is None, 'fastapi is not installed')
+class TestServiceApp(unittest.TestCase):
+    def setUp(self):
+        self.manager = MagicMock()
+        self.client = TestClient(create_app(self.manager))
+
+    def test_submit_job(self):
+        self.manager.submit.return_value = {'id': 'job1', 'status': 'queued'}
+        response = self.client.post('/jobs', json={'video_id': VIDEO_ID, 'force': True})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {'id': 'job1', 'status': 'queued'})
+        self.manager.submit.assert_called_once_with(VIDEO_ID, None, True)
+
+    def test_submit_invalid_job(self):
+        response = self.client.post('/jobs', json={'video_id': VIDEO_ID, 'subtitle_source': 'wav'})
+        self.assertEqual(response.status_code, 422)
+        self.manager.submit.side_effect = ValueError('Invalid video_id')
+        response = self.client.post('/jobs', json={'video_id': ''})
+        self.assertEqual(response.status_code, 422)
+
+    def test_get_job_and_result(self):
+        self.manager.get.return_value = None
+        self.assertEqual(self.client.get('/jobs/missing').status_code, 404)
+        self.assertEqual(self.client.get('/jobs/missing/result').status_code, 404)
+
+        self.manager.get.return_value = {'id': 'job1', 'status': 'running'}
+        self.assertEqual(self.client.get('/jobs/job1').json()['status'], 'running')
+        self.assertEqual(self.client.get('/jobs/job1/result').status_code, 409)
+
+        self.manager.get.return_value = {'id': 'job1', 'status': 'done'}
+        self.manager.result.return_value = f'{VIDEO_ID}: article\n'
+        response = self.client.get('/jobs/job1/result')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.text, f'{VIDEO_ID}: article\n')
+
+    def test_list_jobs_and_metrics(self):
+        self.manager.list.return_value = [{'id': 'job1'}]
+        self.assertEqual(self.client.get('/jobs').json(), [{'id': 'job1'}])
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
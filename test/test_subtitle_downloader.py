@@ -1,6 +1,7 @@
-import unittest, os
+import unittest, os, tempfile
 from unittest.mock import patch, mock_open, MagicMock
 from core.subtitle_downloader import MediaOperations
+from core.utils import MediaDownloader
 
 import unittest
 from unittest.mock import patch, MagicMock, mock_open
@@ -12,7 +13,11 @@ import os
 class TestMediaOperations(unittest.TestCase):
 
     def setUp(self):
-        self.media_ops = MediaOperations(channel_url='', output_dir='test_output/', download_mode='mp3')
+        self.tmp = tempfile.TemporaryDirectory()
+        self.media_ops = MediaOperations(channel_url='', output_dir=self.tmp.name + '/', download_mode='mp3')
+
+    def tearDown(self):
+        self.tmp.cleanup()
 
     @patch('core.subtitle_downloader.MediaDownloader')
     @patch('core.subtitle_downloader.WhisperRecognizer')
@@ -27,12 +32,12 @@ class TestMediaOperations(unittest.TestCase):
 
         # 斷言
         mock_downloader_instance.download_audio.assert_called_once_with(video_id="OZmoqGIjWus", download_type='mp3')
-        mock_whisper_instance.transcribe_audio.assert_called_once_with("OZmoqGIjWus")
+        mock_whisper_instance.transcribe_audio.assert_called_once_with("OZmoqGIjWus", self.media_ops.output_dir)
         self.assertEqual(result, "Mocked transcription")
     if None:
         @patch.object(MediaOperations, 'download_audio_and_transcribe')
         @patch('core.subtitle_downloader.MediaDownloader')
-        @patch('core.subtitle_downloader.OperateDB')
+        @patch('core.utils.OperateDB')
         @patch('core.subtitle_downloader.find_files')
         @patch('core.subtitle_downloader.clean_subtitles')
         def test_download_single_subtitles_both(self, mock_clean_subtitles, mock_find_files, mock_operate_db, mock_downloader, mock_download_audio_and_transcribe):
@@ -43,13 +48,13 @@ class TestMediaOperations(unittest.TestCase):
 
             result = self.media_ops.download_single_subtitles('test_video_id', download_mode='both')
 
-            mock_find_files.assert_called_once_with('test_output//subtitle', ['test_video_id', 'vtt'])
+            mock_find_files.assert_called_once_with(self.media_ops.output_dir + '/subtitle', ['test_video_id', 'vtt'])
             mock_clean_subtitles.assert_called_once_with(file_path='test_output/subtitles/test_video_id.vtt', output_dir='test_output/adress_subtitles')
             mock_db_instance.update_value.assert_called_once_with('test_video_id', 'has_address_subtitles', 'Done')
             mock_db_instance.close.assert_called_once()
 
     @patch('core.subtitle_downloader.MediaDownloader')
-    @patch('core.subtitle_downloader.OperateDB')
+    @patch('core.utils.OperateDB')
     @patch('core.subtitle_downloader.find_files')
     @patch('core.subtitle_downloader.clean_subtitles')
     def test_download_single_subtitles_subtitle(self, mock_clean_subtitles, mock_find_files, mock_operate_db, mock_downloader):
@@ -58,7 +63,7 @@ class TestMediaOperations(unittest.TestCase):
         result = self.media_ops.download_single_subtitles('test_video_id', download_mode = 'subtitle')
 
         mock_db_instance = mock_operate_db.return_value
-        mock_find_files.assert_called_once_with('test_output//subtitle', ['test_video_id', 'vtt'])
+        mock_find_files.assert_called_once_with(self.media_ops.output_dir + '/subtitle', ['test_video_id', 'vtt'])
         #mock_clean_subtitles.assert_called_once_with(file_path='output/subtitle/test_video_id.vtt', output_dir='output/adress_subtitles')
         mock_db_instance.close.assert_called_once()
 
@@ -86,6 +91,85 @@ class TestMediaOperations(unittest.TestCase):
         self.media_ops.download_subtitles(video_id)
         
         mock_download_single_subtitles.assert_called_once_with(video_id, self.media_ops.download_mode)
-    
 
-  
\ No newline at end of file
+    @patch.object(MediaOperations, 'download_single_subtitles')
+    @patch('core.utils.OperateDB')
+    @patch('core.subtitle_downloader.MediaDownloader')
+    def test_download_subtitles_probe(self, mock_downloader, mock_operate_db, mock_download_single_subtitles):
+        self.media_ops.download_mode = 'subtitle'
+        mock_operate_db.return_value.get_subtitle_langs.return_value = {'video1': {'manual': [], 'auto': ['en']}}
+        mock_downloader.return_value.probe_subtitles.return_value = {'video2': {'manual': [], 'auto': []}}
+        mock_downloader.return_value.find_downloaded.return_value = None
+        mock_downloader.select_available.side_effect = lambda langs: (langs['auto'] or None, 'auto' if langs['auto'] else None)
+        self.media_ops.download_subtitles(['video1', 'video2'])
+
+        mock_downloader.return_value.probe_subtitles.assert_called_once_with(['video2'])
+        mock_operate_db.return_value.save_subtitle_langs.assert_called_once_with({'video2': {'manual': [], 'auto': []}})
+        mock_download_single_subtitles.assert_any_call('video1', 'subtitle', available=(['en'], 'auto'))
+        mock_download_single_subtitles.assert_any_call('video2', 'subtitle', available=(None, None))
+
+    @patch('core.subtitle_downloader.MediaDownloader')
+    def test_existing_transcription_skips_download(self, mock_downloader):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.media_ops.output_dir = tmp
+            os.makedirs(os.path.join(tmp, 'transcriptions'))
+            with open(os.path.join(tmp, 'transcriptions', 'video1.txt'), 'w', encoding='utf-8') as f:
+                f.write('transcript')
+            self.assertEqual(self.media_ops.download_audio_and_transcribe('video1'), 'transcript')
+        mock_downloader.assert_not_called()
+
+    def test_force_ignores_existing_transcription(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.media_ops.output_dir = tmp
+            os.makedirs(os.path.join(tmp, 'transcriptions'))
+            with open(os.path.join(tmp, 'transcriptions', 'video1.txt'), 'w', encoding='utf-8') as f:
+                f.write('transcript')
+            self.media_ops.force = True
+            self.assertIsNone(self.media_ops.existing_transcription('video1'))
+            self.assertTrue(self.media_ops.get_downloader().force)
+
+    @patch('core.subtitle_downloader.MediaOperations.probe_subtitles', return_value={})
+    @patch('core.subtitle_downloader.MediaDownloader')
+    def test_fetch_media(self, mock_downloader, mock_probe):
+        mock_downloader_instance = mock_downloader.return_value
+        mock_downloader_instance.check_and_download_subtitles.return_value = {'state': 'NotFound'}
+        mock_downloader_instance.download_audio.return_value = MagicMock(returncode=0)
+
+        self.media_ops.download_mode = 'subtitle'
+        self.assertIsNone(self.media_ops.fetch_media('test_video_id'))
+        self.media_ops.download_mode = 'both'
+        self.assertEqual(self.media_ops.fetch_media('test_video_id'), 'mp3')
+        mock_downloader_instance.check_and_download_subtitles.return_value = {'state': 'Done'}
+        self.assertEqual(self.media_ops.fetch_media('test_video_id'), 'subtitle')
+
+    @patch('core.subtitle_downloader.MediaOperations.probe_subtitles')
+    @patch('core.subtitle_downloader.MediaDownloader')
+    def test_fetch_media_uses_probe(self, mock_downloader, mock_probe):
+        mock_probe.return_value = {'test_video_id': {'manual': [], 'auto': ['en']}}
+        mock_downloader.select_available = MediaDownloader.select_available
+        mock_downloader.return_value.check_and_download_subtitles.return_value = {'state': 'Done'}
+        self.media_ops.download_mode = 'subtitle'
+        self.assertEqual(self.media_ops.fetch_media('test_video_id'), 'subtitle')
+        mock_probe.assert_called_once_with(['test_video_id'])
+        mock_downloader.return_value.check_and_download_subtitles.assert_called_once_with('test_video_id', 0, (['en'], 'auto'))
+
+    @patch('core.utils.OperateDB')
+    @patch('core.subtitle_downloader.MediaDownloader')
+    def test_fetch_media_uses_probe_cache(self, mock_downloader, mock_operate_db):
+        mock_operate_db.return_value.get_subtitle_langs.return_value = {}
+        mock_downloader.return_value.probe_subtitles.return_value = {'video1': {'manual': ['en'], 'auto': []},
+                                                                     'video2': {'manual': [], 'auto': []}}
+        mock_downloader.return_value.find_downloaded.return_value = None
+        mock_downloader.return_value.check_and_download_subtitles.return_value = {'state': 'Done'}
+        mock_downloader.select_available = MediaDownloader.select_available
+        self.media_ops.download_mode = 'subtitle'
+        self.media_ops.probe_subtitles(['video1', 'video2'])
+        mock_operate_db.reset_mock()
+
+        self.assertEqual(self.media_ops.fetch_media('video1'), 'subtitle')
+        self.assertEqual(self.media_ops.fetch_media('video2'), 'subtitle')
+        # 批次 probe 的結果留在記憶體中，fetch 時不再查 DB 或 yt-dlp
+        mock_operate_db.assert_not_called()
+        mock_downloader.return_value.probe_subtitles.assert_called_once_with(['video1', 'video2'])
+        mock_downloader.return_value.check_and_download_subtitles.assert_any_call('video1', 0, (['en'], 'manual'))
+        mock_downloader.return_value.check_and_download_subtitles.assert_any_call('video2', 0, (None, None))
@@ -1,8 +1,11 @@
 import unittest
 from core.utils import fetch_youtube_playlist, OperateDB,  MediaDownloader, WhisperRecognizer
 from core.utils import fetch_youtube_playlist, classify_videos, clean_subtitles, find_files, ensure_directory_exists
+from core.utils import clean_subtitles_batch
+from core.logger import get_logger
+import tempfile, time
 from unittest.mock import patch, mock_open
-import sqlite3, os
+import sqlite3, os, json
 from unittest.mock import MagicMock
 
 # coverage run --source=core.utils -m unittest discover -s test
@@ -146,6 +149,11 @@ class TestOperateDB(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.db.get_video_ids({})
     
+    def test_get_values(self):
+        values = self.db.get_values(['test_video_id', 'missing_id'], ['has_subtitles', 'title'])
+        self.assertEqual(values, {'test_video_id': {'has_subtitles': 'No', 'title': 'Test Video'}})
+        self.assertEqual(self.db.get_values([], ['has_subtitles']), {})
+
     def test_update_value(self):
         # Positive test case
         self.db.cursor.execute("INSERT INTO videos (id, has_subtitles) VALUES ('1', 'No')")
@@ -157,6 +165,39 @@ class TestOperateDB(unittest.TestCase):
         # Negative test case - Non-existent ID
         with self.assertRaises(sqlite3.Error):
             self.db.update_value('100', 'has_sutitles', 'Yes')
+    def test_update_values(self):
+        self.db.cursor.execute("INSERT INTO videos (id, has_address_subtitles) VALUES ('1', 'No')")
+        self.db.update_values(['1', 'test_video_id'], 'has_address_subtitles', 'Done')
+        self.assertEqual(self.db.get_video_ids({'has_address_subtitles': 'Done'}), {'1', 'test_video_id'})
+
+    def test_save_subtitle_langs(self):
+        self.assertEqual(self.db.get_subtitle_langs(['test_video_id']), {})
+        self.db.save_subtitle_langs({'test_video_id': {'manual': ['en', 'zh-TW'], 'auto': []}})
+        self.assertEqual(self.db.get_subtitle_langs(['test_video_id']),
+                         {'test_video_id': {'manual': ['en', 'zh-TW'], 'auto': []}})
+
+    def test_empty_subtitle_langs_expire(self):
+        self.db.save_subtitle_langs({'test_video_id': {'manual': [], 'auto': []}})
+        self.assertEqual(self.db.get_subtitle_langs(['test_video_id']), {'test_video_id': {'manual': [], 'auto': []}})
+        # 沒有字幕的結果過期後重新查詢
+        self.assertEqual(self.db.get_subtitle_langs(['test_video_id'], empty_ttl=-1), {})
+        self.db.save_subtitle_langs({'test_video_id': {'manual': ['en'], 'auto': []}})
+        self.assertEqual(self.db.get_subtitle_langs(['test_video_id'], empty_ttl=-1), {'test_video_id': {'manual': ['en'], 'auto': []}})
+
+    def test_save_subtitle_langs_empty_db(self):
+        # 全新的 yt_info.db 沒有 videos table，--video_id 的影片也沒有資料
+        with tempfile.TemporaryDirectory() as tmp:
+            db = OperateDB(os.path.join(tmp, 'yt_info.db'))
+            self.assertEqual(db.get_subtitle_langs(['video1']), {})
+            db.save_subtitle_langs({'video1': {'manual': [], 'auto': ['en']}})
+            self.assertEqual(db.get_subtitle_langs(['video1']), {'video1': {'manual': [], 'auto': ['en']}})
+            self.assertEqual(db.get_values(['video1'], ['has_address_subtitles']), {'video1': {'has_address_subtitles': 'No'}})
+            db.close()
+
+    def test_save_subtitle_langs_missing_row(self):
+        self.db.save_subtitle_langs({'new_video_id': {'manual': ['en'], 'auto': []}})
+        self.assertEqual(self.db.get_subtitle_langs(['new_video_id', 'test_video_id']),
+                         {'new_video_id': {'manual': ['en'], 'auto': []}})
     def test_close(self):
         # Test the close method
         self.db.close()
@@ -192,15 +233,22 @@ class TestClassifyVideos(unittest.TestCase):
         self.assertEqual(existing_data, [])
 
 class TestMediaDownloader(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        # 等背景 thread 寫完 logs/yt_dlp.jsonl 再刪除暫存資料夾
+        get_logger(f'{self.tmp.name}/logs').flush()
+        self.tmp.cleanup()
 
     def test_select_subtitle_lang_positive(self):
-        downloader = MediaDownloader()
+        downloader = MediaDownloader(output_dir=self.tmp.name)
         subtitles = ['en', 'zh-TW', 'es']
         result = downloader.select_subtitle_lang(subtitles)
         self.assertEqual(result, 'en')
 
     def test_select_subtitle_lang_negative(self):
-        downloader = MediaDownloader()
+        downloader = MediaDownloader(output_dir=self.tmp.name)
         subtitles = ['fr', 'de', 'it']
         result = downloader.select_subtitle_lang(subtitles)
         self.assertEqual('fr', result)
@@ -212,7 +260,7 @@ class TestMediaDownloader(unittest.TestCase):
         mock_result.returncode = 1
         mock_subprocess.return_value = mock_result
         
-        downloader = MediaDownloader()
+        downloader = MediaDownloader(output_dir=self.tmp.name)
         manual_subs, subtitle_type = downloader.check_subtitle_available('video_id', 1)
         
         self.assertEqual(manual_subs, None)
@@ -225,7 +273,7 @@ class TestMediaDownloader(unittest.TestCase):
         mock_result.returncode = 0
         mock_subprocess.return_value = mock_result
         
-        downloader = MediaDownloader()
+        downloader = MediaDownloader(output_dir=self.tmp.name)
         manual_subs, subtitle_type = downloader.check_subtitle_available('video_id', 1)
         
         self.assertEqual(manual_subs, ['zh-TW', 'en'])
@@ -238,7 +286,7 @@ class TestMediaDownloader(unittest.TestCase):
         mock_result.returncode = 0
         mock_subprocess.return_value = mock_result
 
-        downloader = MediaDownloader()
+        downloader = MediaDownloader(output_dir=self.tmp.name)
         manual_subs, subtitle_type = downloader.check_subtitle_available('video_id', 1)
         self.assertEqual(manual_subs, ['en'])
         self.assertEqual(subtitle_type, 'auto')
@@ -250,7 +298,7 @@ class TestMediaDownloader(unittest.TestCase):
         mock_result.returncode = 0
         mock_subprocess.return_value = mock_result
 
-        downloader = MediaDownloader()
+        downloader = MediaDownloader(output_dir=self.tmp.name)
         with self.assertRaises(ValueError):
             downloader.check_subtitle_available('video_id', 1)
 
@@ -261,7 +309,7 @@ class TestMediaDownloader(unittest.TestCase):
         mock_result.returncode = 0
         mock_subprocess.return_value = mock_result
 
-        downloader = MediaDownloader()
+        downloader = MediaDownloader(output_dir=self.tmp.name)
         manual_subs, subtitle_type = downloader.check_subtitle_available('video_id', 1)
         self.assertEqual(manual_subs, None)
         self.assertEqual(subtitle_type, None)
@@ -269,37 +317,127 @@ class TestMediaDownloader(unittest.TestCase):
     @patch('subprocess.run')
     def test_download_audio_subtitle_positive(self, mock_subprocess):
         mock_subprocess.return_value.returncode = 0
-        downloader = MediaDownloader()
+        downloader = MediaDownloader(output_dir=self.tmp.name)
         result = downloader.download_audio('video_id', download_type='subtitle', download_lang='en', subtitle_type='manual')
         self.assertEqual(result.returncode, 0)
 
     @patch('subprocess.run')
     def test_download_audio_subtitle_negative(self, mock_subprocess):
         mock_subprocess.return_value.returncode = 1
-        downloader = MediaDownloader()
+        downloader = MediaDownloader(output_dir=self.tmp.name)
         result = downloader.download_audio('video_id', download_type='subtitle', download_lang='en', subtitle_type='manual')
         self.assertNotEqual(result.returncode, 0)
     
     @patch('subprocess.run')
     def test_download_audio_mp3_positive(self, mock_subprocess):
         mock_subprocess.return_value.returncode = 0
-        downloader = MediaDownloader()
+        downloader = MediaDownloader(output_dir=self.tmp.name)
         result = downloader.download_audio('video_id', download_type='mp3', download_lang='en', subtitle_type='manual')
         self.assertEqual(result.returncode, 0)
 
     @patch('subprocess.run')
     def test_download_audio_mp3_negative(self, mock_subprocess):
         mock_subprocess.return_value.returncode = 1
-        downloader = MediaDownloader()
+        downloader = MediaDownloader(output_dir=self.tmp.name)
         result = downloader.download_audio('video_id', download_type='mp3', download_lang='en', subtitle_type='manual')
         self.assertNotEqual(result.returncode, 0)
 
+    @patch('subprocess.run')
+    def test_download_audio_skips_existing(self, mock_subprocess):
+        with tempfile.TemporaryDirectory() as tmp:
+            downloader = MediaDownloader(output_dir=tmp)
+            os.makedirs(os.path.join(tmp, 'mp3'))
+            mp3_path = os.path.join(tmp, 'mp3', 'video1.mp3')
+            with open(mp3_path, 'wb') as f:
+                f.write(b'ID3\x04\x00' + b'\x00' * 10)
+            result = downloader.download_audio('video1', download_type='mp3')
+            self.assertEqual(result.returncode, 0)
+            mock_subprocess.assert_not_called()
+
+            # 錯誤的檔案會重新下載
+            with open(mp3_path, 'wb') as f:
+                f.write(b'<html>')
+            mock_subprocess.return_value = MagicMock(returncode=1, stdout='', stderr='')
+            downloader.download_audio('video1', download_type='mp3')
+            mock_subprocess.assert_called_once()
+            self.assertFalse(os.path.exists(mp3_path))
+
+            # --force subtitle 時即使檔案完整也重新下載
+            with open(mp3_path, 'wb') as f:
+                f.write(b'ID3\x04\x00' + b'\x00' * 10)
+            downloader.force = True
+            self.assertIsNone(downloader.find_downloaded('video1', 'mp3'))
+            downloader.download_audio('video1', download_type='mp3')
+            self.assertEqual(mock_subprocess.call_count, 2)
+            # 下載失敗時保留舊檔
+            self.assertTrue(os.path.exists(mp3_path))
+            downloader.logger.flush()
+
+    @patch('subprocess.run')
+    def test_download_audio_renames_after_success(self, mock_subprocess):
+        with tempfile.TemporaryDirectory() as tmp:
+            downloader = MediaDownloader(output_dir=tmp)
+            mp3_path = os.path.join(tmp, 'mp3', 'video1.mp3')
+
+            def download(returncode):
+                def run(command, **kwargs):
+                    # yt-dlp 寫到 -o 指定的暫存資料夾
+                    part_path = command[command.index('-o') + 1].replace('%(id)s.%(ext)s', 'video1.mp3')
+                    os.makedirs(os.path.dirname(part_path), exist_ok=True)
+                    with open(part_path, 'wb') as f:
+                        f.write(b'ID3\x04\x00')
+                    return MagicMock(returncode=returncode, stdout='', stderr='')
+                return run
+
+            # 中斷的下載不會出現在正式位置，暫存檔也會被刪除
+            mock_subprocess.side_effect = download(1)
+            downloader.download_audio('video1', download_type='mp3')
+            self.assertFalse(os.path.exists(mp3_path))
+            self.assertEqual(downloader.part_files('video1', 'mp3'), [])
+
+            mock_subprocess.side_effect = download(0)
+            downloader.download_audio('video1', download_type='mp3')
+            self.assertEqual(downloader.find_downloaded('video1', 'mp3'), mp3_path)
+            self.assertEqual(downloader.part_files('video1', 'mp3'), [])
+            downloader.logger.flush()
+
+    @patch('core.utils.metrics')
+    @patch('subprocess.run')
+    def test_download_counts_only_new_bytes(self, mock_subprocess, mock_metrics):
+        with tempfile.TemporaryDirectory() as tmp:
+            downloader = MediaDownloader(output_dir=tmp)
+            os.makedirs(os.path.join(tmp, 'subtitle'))
+            with open(os.path.join(tmp, 'subtitle', 'video1.fr.vtt'), 'w', encoding='utf-8') as f:
+                f.write('WEBVTT\n\nexisting')
+
+            def download(*args, **kwargs):
+                with open(os.path.join(tmp, 'subtitle', 'video1.en.vtt'), 'w', encoding='utf-8') as f:
+                    f.write('WEBVTT\n')
+                return MagicMock(returncode=0, stdout='', stderr='')
+            mock_subprocess.side_effect = download
+            downloader.download_audio('video1', download_type='subtitle', download_lang='en')
+            mock_metrics.inc.assert_any_call('bytes_total', 7, stage='download_subtitle')
+            byte_calls = [c for c in mock_metrics.inc.call_args_list if c.args[0] == 'bytes_total']
+            self.assertEqual(len(byte_calls), 1)
+            downloader.logger.flush()
+
+    def test_find_downloaded_subtitle(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            downloader = MediaDownloader(output_dir=tmp)
+            os.makedirs(os.path.join(tmp, 'subtitle'))
+            with open(os.path.join(tmp, 'subtitle', 'video1.en.vtt'), 'w', encoding='utf-8') as f:
+                f.write('WEBVTT\n\n')
+            open(os.path.join(tmp, 'subtitle', 'video2.en.vtt'), 'w').close()
+            self.assertEqual(downloader.find_downloaded('video1', 'subtitle'), os.path.join(tmp, 'subtitle', 'video1.en.vtt'))
+            self.assertIsNone(downloader.find_downloaded('video1', 'subtitle', 'zh-TW'))
+            self.assertIsNone(downloader.find_downloaded('video2', 'subtitle'))
+
     @patch('core.utils.OperateDB')
     @patch('core.utils.MediaDownloader.download_audio')
     @patch('core.utils.MediaDownloader.select_subtitle_lang')
     @patch('core.utils.MediaDownloader.check_subtitle_available')
     def test_check_and_download_subtitles(self, mock_check_subtitle_available, mock_select_subtitle_lang, mock_download_audio, mock_operate_db):
-        self.downloader = MediaDownloader()
+        self.downloader = MediaDownloader(output_dir=self.tmp.name)
         # Mock OperateDB instance
         mock_db_instance = MagicMock()
         mock_operate_db.return_value = mock_db_instance
@@ -338,6 +476,31 @@ class TestMediaDownloader(unittest.TestCase):
         #mock_db_instance.close.assert_called_once()
         #mock_db_instance.close.reset_mock()  # Reset mock for the next test
 
+    @patch('subprocess.run')
+    def test_probe_subtitles(self, mock_subprocess):
+        lines = [
+            json.dumps({'id': 'video1', 'subtitles': {'en': [{'ext': 'vtt'}], 'fr': [{'ext': 'srv1'}]},
+                        'automatic_captions': {'en': [{'ext': 'vtt'}]}}),
+            json.dumps({'id': 'video2', 'subtitles': {}, 'automatic_captions': {}}),
+        ]
+        mock_subprocess.return_value = MagicMock(returncode=1, stdout='\n'.join(lines), stderr='video3: unavailable')
+        downloader = MediaDownloader(output_dir=self.tmp.name)
+        probe = downloader.probe_subtitles(['video1', 'video2', 'video3'])
+
+        mock_subprocess.assert_called_once()
+        self.assertEqual(probe, {'video1': {'manual': ['en'], 'auto': ['en']},
+                                 'video2': {'manual': [], 'auto': []}})
+        self.assertEqual(MediaDownloader.select_available(probe['video1']), (['en'], 'manual'))
+        self.assertEqual(MediaDownloader.select_available(probe['video2']), (None, None))
+
+    @patch('core.utils.OperateDB')
+    @patch('core.utils.MediaDownloader.check_subtitle_available')
+    def test_check_and_download_subtitles_with_probe(self, mock_check_subtitle_available, mock_operate_db):
+        downloader = MediaDownloader(output_dir=self.tmp.name)
+        result = downloader.check_and_download_subtitles('video1', 0, available=(None, None))
+        self.assertEqual(result, {'state': 'NotFound'})
+        mock_check_subtitle_available.assert_not_called()
+
 class TestWhisperRecognizer(unittest.TestCase):
 
     @patch.dict(os.environ, {"OPENAI_API_KEY": "fake_api_key"})
@@ -365,15 +528,56 @@ class TestWhisperRecognizer(unittest.TestCase):
 class TestCleanSubtitles(unittest.TestCase):
 
     def test_clean_subtitles(self):
-        file_path = "output/test/test_subtitles.txt"
-        output_dir = "output/test"
-        with patch('builtins.open', mock_open(read_data="00:00:01.000 --> 00:00:05.000\nHello <c>world</c>\n")) as mock_file:
-            clean_subtitles(file_path, output_dir)
-            mock_file.assert_called_with(file_path, 'w', encoding='utf-8')
+        with tempfile.TemporaryDirectory() as tmp:
+            output_dir = os.path.join(tmp, 'test')
+            file_path = os.path.join(output_dir, 'test_subtitles.txt')
+            with patch('builtins.open', mock_open(read_data="00:00:01.000 --> 00:00:05.000\nHello <c>world</c>\n")) as mock_file:
+                clean_subtitles(file_path, output_dir)
+                mock_file.assert_called_with(file_path, 'w', encoding='utf-8')
             # Add assertions to check the cleaned subtitles file content and its correctness
 
     # Add more positive and negative test cases for clean_subtitles function
 
+class TestCleanSubtitlesBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.tmp.name, 'subtitle')
+        self.output_dir = os.path.join(self.tmp.name, 'adress_subtitles')
+        os.makedirs(self.input_dir)
+        for video_id in ['video1', 'video2', 'video3']:
+            with open(os.path.join(self.input_dir, f'{video_id}.en.vtt'), 'w', encoding='utf-8') as f:
+                f.write(f"WEBVTT\n\n00:00:01.000 --> 00:00:05.000\nHello {video_id}\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_clean_subtitles_batch(self):
+        video_ids = clean_subtitles_batch(self.input_dir, self.output_dir, workers=2, chunk_size=2)
+        self.assertEqual(video_ids, ['video1', 'video2', 'video3'])
+        with open(os.path.join(self.output_dir, 'video2.en.txt'), encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'Hello video2')
+
+        # 輸出比輸入新的檔案會跳過
+        future = time.time() + 10
+        os.utime(os.path.join(self.input_dir, 'video3.en.vtt'), (future, future))
+        self.assertEqual(clean_subtitles_batch(self.input_dir, self.output_dir, workers=2), ['video3'])
+        self.assertEqual(len(clean_subtitles_batch(self.input_dir, self.output_dir, workers=2, force=True)), 3)
+
+    def test_clean_subtitles_batch_persists_in_parent(self):
+        from core import utils
+        from core.content_store import ContentHook
+        hook = ContentHook()
+        hook.enable(os.path.join(self.tmp.name, 'yt_info.db'))
+        original, utils.content_hook = utils.content_hook, hook
+        try:
+            # 子 process 不寫入 DB，結果由主 process 寫入
+            clean_subtitles_batch(self.input_dir, self.output_dir, workers=2, chunk_size=1)
+            for video_id in ['video1', 'video2', 'video3']:
+                self.assertEqual(hook.get_store().get(video_id, 'subtitle'), f'Hello {video_id}')
+        finally:
+            utils.content_hook = original
+            hook.disable()
+
 class TestFileFunctions(unittest.TestCase):
 
     @patch('os.walk')